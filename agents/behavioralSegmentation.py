@@ -1,20 +1,41 @@
 from spade.agent import Agent
-from spade.behaviour import CyclicBehaviour
+from communication.transport import TransportBehaviour
 from spade.message import Message
 import json
 import asyncio
 import os
 import joblib
 import lightgbm as lgb
+import numpy as np
+from communication.appliance_payload import decode_appliances, encode_appliances
+from communication.shared_payload import StalePayloadError, is_current, is_handle, resolve_array
 
 # Behavioral Segmentation Agent: Prioritizes appliance usage
 class BehavioralSegmentationAgent(Agent):
-    class SegmentationBehaviour(CyclicBehaviour):
+    class SegmentationBehaviour(TransportBehaviour):
         async def on_start(self):
             project_dir = os.path.dirname(os.path.dirname(__file__))
             model_filename = os.path.join(project_dir, "models", "lightgbm_ranker_model.pkl")
             self.model = joblib.load(model_filename)
 
+        def rank_fleet(self, fleet):
+            """Ranks every house's appliances in one model call. Returns (houses x appliances) appliance IDs."""
+            durations = resolve_array(fleet["appliance_duration"])
+            powers = resolve_array(fleet["appliance_power"])
+            houses, appliances = powers.shape
+            dataset = np.column_stack([
+                powers.ravel(),
+                np.repeat(resolve_array(fleet["temperature"]), appliances),
+                durations.ravel(),
+                np.repeat(resolve_array(fleet["holiday"]), appliances)
+            ])
+            # The dataset is a copy; if a slot was overwritten while it was built, the copy may be torn
+            if not all(is_current(fleet[key]) for key in ("appliance_duration", "appliance_power", "temperature", "holiday") if is_handle(fleet[key])):
+                raise StalePayloadError("Fleet columns were overwritten while being read")
+            priorities = self.model.predict(dataset).reshape(houses, appliances)
+            order = np.argsort(-priorities, axis=1, kind="stable")
+            return np.asarray(fleet["appliance_ids"])[order]
+
         async def run(self):
             await asyncio.sleep(5)
             print("[BehavioralSegmentationAgent] Waiting for appliance data...")
@@ -28,24 +49,31 @@ class BehavioralSegmentationAgent(Agent):
 
                         print(f"[BehavioralSegmentationAgent] Received data: {data}")
                         
-                        dataset = [
-                            [
-                                appliance["power_consumption"], 
-                                data["temperature"], 
-                                appliance["duration"], 
-                                data["holiday"]
-                            ] 
-                            for appliance in data["appliances"]
-                        ]
-                        
+                        # Columnar payload: one feature column per array, no per-appliance dicts
+                        ids, durations, powers = decode_appliances(data["appliances"])
+                        count = len(ids)
+                        dataset = np.column_stack([
+                            powers,
+                            np.full(count, data["temperature"]),
+                            durations,
+                            np.full(count, data["holiday"])
+                        ])
+
                         priorities = self.model.predict(dataset)
-                        for i, _ in enumerate(data["appliances"]):
-                            data["appliances"][i]["priority"] = priorities[i]
+                        order = np.argsort(-priorities, kind="stable")
+                        result = {"prioritized_appliances": encode_appliances(
+                            ids[order], durations[order], powers[order], priority=priorities[order]
+                        )}
+
+                        fleet = data.get("fleet")
+                        if fleet:
+                            try:
+                                result["fleet_priority_order"] = self.rank_fleet(fleet).tolist()
+                            except StalePayloadError as e:
+                                print(f"[BehavioralSegmentationAgent] Skipping fleet ranking: {e}")
 
-                        prioritized_appliances = sorted(data["appliances"], key=lambda x: x["priority"], reverse=True)
-                        
                         response = Message(to="facilitating@localhost")
-                        response.body = json.dumps({"prioritized_appliances": prioritized_appliances})
+                        response.body = json.dumps(result)
                         await self.send(response)
                         print(f"[BehavioralSegmentationAgent] Sent appliance priority list to FacilitatingAgent: {response.body}")
                 
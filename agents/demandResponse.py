@@ -1,43 +1,37 @@
 from spade.agent import Agent
-from spade.behaviour import CyclicBehaviour
+from communication.transport import TransportBehaviour
 from spade.message import Message
 import json
-from datetime import datetime
-import time
+from simulation import clock
 import asyncio
 import os
 import tensorflow as tf
-import numpy as np
+from simulation.features import TARIFF_BY_HOUR_OF_WEEK, hour_of_week
+from communication.shared_payload import resolve_array, is_handle, is_current, StalePayloadError
 
 
 # Function to determine the current energy rate based on timestamp
 def get_energy_rate(timestamp):
-    # Convert timestamp to datetime object
-    current_time = datetime.fromtimestamp(timestamp)
+    # Time-of-use rates are precomputed per hour of the week
+    return float(TARIFF_BY_HOUR_OF_WEEK[hour_of_week(timestamp)])
 
-    # Ultra-low rate: 11 PM to 7 AM
-    if current_time.hour >= 23 or current_time.hour < 7:
-        return 0.028  # 2.8¢ per kWh
-
-    # Weekend off-peak: 7 AM to 11 PM on weekends
-    elif current_time.weekday() in [5, 6]:  # Saturday or Sunday
-        if 7 <= current_time.hour < 23:
-            return 0.076  # 7.6¢ per kWh
-        else:
-            return 0.028  # 2.8¢ per kWh (Ultra-low during off-peak hours)
-
-    # Weekday mid-peak: 7 AM to 4 PM, 9 PM to 11 PM
-    elif current_time.weekday() in [0, 1, 2, 3, 4]:  # Monday to Friday
-        if 7 <= current_time.hour < 16 or 21 <= current_time.hour < 23:
-            return 0.122  # 12.2¢ per kWh (Mid-peak)
-        elif 16 <= current_time.hour < 21:
-            return 0.284  # 28.4¢ per kWh (On-peak)
-    
-    return 0.028  # Default to ultra-low rate
+def grid_peak_ratio(aggregates):
+    """Current hourly mean of the grid's demand series relative to today's maximum, from the Grid's resampler summary."""
+    try:
+        hourly = aggregates["1h"]
+        daily = aggregates["1d"]
+        series = next(iter(hourly)) # Demand is the first series in both Grid modes
+        hour_mean = hourly[series]["mean"]
+        day_max = daily[series]["max"]
+    except (KeyError, TypeError, StopIteration):
+        return None
+    if hour_mean is None or not day_max:
+        return None
+    return hour_mean / day_max
 
 # Demand Response Agent: Manages energy curtailment based on grid demand
 class DemandResponseAgent(Agent):
-    class DRBehaviour(CyclicBehaviour):
+    class DRBehaviour(TransportBehaviour):
         async def on_start(self):
             # Load the trained LSTM model when the agent starts
             project_dir = os.path.dirname(os.path.dirname(__file__))
@@ -58,23 +52,30 @@ class DemandResponseAgent(Agent):
                         print("[DemandResponseAgent] No grid data received")
                     else:
                         print(f"[DemandResponseAgent] Received grid data")
-                        test_sample_supply = np.array(data["test_sample_supply"])
-                        test_sample_demand = np.array(data["test_sample_demand"])
+                        # Zero-copy views into the Grid's shared-memory ring (or inline lists)
+                        test_sample_supply = resolve_array(data["test_sample_supply"])
+                        test_sample_demand = resolve_array(data["test_sample_demand"])
 
                         predicted_demand = self.model_demand.predict(test_sample_demand)[0][0]
                         predicted_supply = self.model_supply.predict(test_sample_supply)[0][0]
+
+                        # Discard the prediction if the Grid reused a slot while the models were reading it
+                        for sample in (data["test_sample_supply"], data["test_sample_demand"]):
+                            if is_handle(sample) and not is_current(sample):
+                                raise StalePayloadError("Grid sample was overwritten during prediction")
                         
                         predicted_demand = predicted_demand * 4924.1 + 13673.1
                         predicted_supply = predicted_supply * 20667
 
-                        timestamp = time.mktime(datetime.now().timetuple())
+                        timestamp = int(clock.time())
                         energy_rate = get_energy_rate(timestamp) * 10
                         
                         curtailment = 0
                         if predicted_demand > predicted_supply:
                             curtailment = (predicted_demand - predicted_supply) * 0.1  # 10% curtailment
                         
-                        market_value = get_energy_rate(datetime.now().timestamp())
+                        market_value = get_energy_rate(clock.time())
+                        peak_ratio = grid_peak_ratio(data.get("aggregates"))
                         
                         response = Message(to="facilitating@localhost")
                         response.body = json.dumps({
@@ -83,6 +84,7 @@ class DemandResponseAgent(Agent):
                             "market_value" : market_value,
                             "curtailment": curtailment,
                             "energy_rate": energy_rate,
+                            "grid_peak_ratio": peak_ratio,
                             "recommended_appliance_behaviour": [
                                 "Reduce air conditioning usage", "Delay dishwasher cycle", "Limit electric heating between peak hours"
                             ]
@@ -1,14 +1,76 @@
 import json
-from datetime import datetime
 import asyncio
-import time
+import heapq
+import os
+from simulation import clock
 from spade.agent import Agent
-from spade.behaviour import CyclicBehaviour
+from communication.transport import TransportBehaviour
 from spade.message import Message
+from utils.timer_wheel import TimerWheel
+from communication.shared_payload import contains_handle
+
+FRESHNESS_WINDOW = 30 # Seconds a dependency stays valid after it was received
+MIN_UPDATE_INTERVAL = 5 # Ignore repeat messages from the same agent within this window
+RECEIVE_TIMEOUT = 60 # Upper bound on how long the loop waits for a message
+SNAPSHOT_PATH = "facilitator_snapshot.json" # Dependency slots persisted for warm restarts
+SNAPSHOT_INTERVAL = 10 # Seconds between snapshots (only written if a slot changed)
+METRICS_INTERVAL = 60 # Seconds between bundle queue latency reports
+MAX_BATCH = 32 # Queued messages applied per loop before bundles are sent
+
+# Bundle priorities (lower is sent first)
+PRIORITY_AUCTION = 0 # Negotiation bundles while an auction is bidding/revealing
+PRIORITY_UPSTREAM = 1 # Agents whose output negotiation needs for its bid
+PRIORITY_NORMAL = 2
+AUCTION_UPSTREAM = ("prediction", "demandresponse")
+
+class BundleScheduler:
+    """Priority queue of agents waiting for a bundle, with per-priority queue latency."""
+    def __init__(self):
+        self.heap = []
+        self.queued = {} # agent -> (priority, enqueued_at) of its live entry
+        self.sequence = 0
+        self.latency = {priority: {"count": 0, "total": 0.0, "max": 0.0}
+                        for priority in (PRIORITY_AUCTION, PRIORITY_UPSTREAM, PRIORITY_NORMAL)}
+
+    def __len__(self):
+        return len(self.queued)
+
+    def push(self, agent, priority):
+        # An agent is queued once; a later, more urgent request promotes it
+        current = self.queued.get(agent)
+        if current is not None and current[0] <= priority:
+            return
+        enqueued_at = current[1] if current is not None else clock.monotonic()
+        self.queued[agent] = (priority, enqueued_at)
+        self.sequence += 1
+        heapq.heappush(self.heap, (priority, self.sequence, agent))
+
+    def pop(self):
+        while self.heap:
+            priority, _, agent = heapq.heappop(self.heap)
+            entry = self.queued.get(agent)
+            if entry is None or entry[0] != priority:
+                continue  # Superseded by a promotion
+            del self.queued[agent]
+            waited = clock.monotonic() - entry[1]
+            stats = self.latency[priority]
+            stats["count"] += 1
+            stats["total"] += waited
+            stats["max"] = max(stats["max"], waited)
+            return agent
+        return None
+
+    def report(self):
+        lines = []
+        for priority, stats in self.latency.items():
+            if stats["count"]:
+                mean_ms = stats["total"] / stats["count"] * 1000
+                lines.append(f"P{priority}: n={stats['count']} mean={mean_ms:.2f}ms max={stats['max'] * 1000:.2f}ms")
+        return ", ".join(lines) if lines else "no bundles sent"
 
 # Define the FacilitatingAgent class as before
 class FacilitatingAgent(Agent):
-    class MultiAgentHandler(CyclicBehaviour):
+    class MultiAgentHandler(TransportBehaviour):
         async def on_start(self):
             self.dependencies = {
                 "gui": ["house"],
@@ -19,96 +81,226 @@ class FacilitatingAgent(Agent):
                 "grid" : [],
                 "house" : []
             }
-            self.last_message = {agent: {"time": datetime.now(), "msg": None} for agent in self.dependencies}
+            # Reverse index so an update only touches the agents that depend on it
+            self.dependents = {agent: [] for agent in self.dependencies}
+            for agent, dependencies in self.dependencies.items():
+                for dependency in dependencies:
+                    self.dependents[dependency].append(agent)
+
+            # Staleness is tracked by expiry timers on the monotonic clock instead of
+            # comparing timestamps for every dependency on every loop
+            self.wheel = TimerWheel(clock=clock.monotonic)
+            self.last_message = {agent: {"time": None, "msg": None, "version": 0, "fresh": False, "timer": None} for agent in self.dependencies}
+            self.unresolved = {agent: set(dependencies) for agent, dependencies in self.dependencies.items()}
+            self.scheduler = BundleScheduler()
+            self.auction_window = None # Latest timings reported by the negotiation agent
             self.startup = True
+            self.wheel.schedule(METRICS_INTERVAL, self.on_metrics_due)
+
+            # Warm restart: pick up where the previous instance left off
+            self.snapshot_version = 0
+            self.snapshot_due = False
+            self.restore_snapshot()
+            self.wheel.schedule(SNAPSHOT_INTERVAL, self.on_snapshot_due)
+
+        async def on_end(self):
+            self.save_snapshot()
+
+        def on_metrics_due(self):
+            print(f"[FacilitatingAgent] Bundle queue latency: {self.scheduler.report()}")
+            self.wheel.schedule(METRICS_INTERVAL, self.on_metrics_due)
+
+        def auction_active(self):
+            # Bidding or reveal window of EnergyVickreyAuction, from the last phase update
+            window = self.auction_window
+            return bool(window) and window.get("bidding_start", 0) != 0 and clock.time() <= window.get("reveal_end", 0)
+
+        def priority_of(self, agent):
+            if not self.auction_active():
+                return PRIORITY_NORMAL
+            if agent == "negotiation":
+                return PRIORITY_AUCTION
+            if agent in AUCTION_UPSTREAM:
+                return PRIORITY_UPSTREAM
+            return PRIORITY_NORMAL
+
+        def on_snapshot_due(self):
+            self.snapshot_due = True
+            self.wheel.schedule(SNAPSHOT_INTERVAL, self.on_snapshot_due)
+
+        def save_snapshot(self):
+            """Writes the dependency slots, their versions and ages to SNAPSHOT_PATH."""
+            version = sum(slot["version"] for slot in self.last_message.values())
+            if version == self.snapshot_version:
+                return  # Nothing changed since the last snapshot
+            now = clock.monotonic()
+            # Shared-memory handles point into segments named after the producer's pid, which are
+            # gone after a restart (or reused by a new producer), so messages carrying them are not saved
+            snapshot = {
+                "written_at": clock.time(),
+                "slots": {
+                    agent: {"version": slot["version"], "age": now - slot["time"], "msg": slot["msg"]}
+                    for agent, slot in self.last_message.items()
+                    if slot["time"] is not None and not contains_handle(slot["msg"])
+                }
+            }
+            try:
+                temp_path = SNAPSHOT_PATH + ".tmp"
+                with open(temp_path, "w") as snapshot_file:
+                    json.dump(snapshot, snapshot_file, separators=(",", ":"))
+                os.replace(temp_path, SNAPSHOT_PATH)  # Atomic, a crash never leaves a half-written snapshot
+                self.snapshot_version = version
+            except (OSError, TypeError, ValueError) as e:
+                print(f"[FacilitatingAgent] Failed to write snapshot: {e}")
+
+        def restore_snapshot(self):
+            """Reloads slots from SNAPSHOT_PATH, ageing them by the time the agent was down."""
+            if not os.path.exists(SNAPSHOT_PATH):
+                return
+            try:
+                with open(SNAPSHOT_PATH, "r") as snapshot_file:
+                    snapshot = json.load(snapshot_file)
+                downtime = max(clock.time() - snapshot["written_at"], 0)
+                slots = snapshot["slots"]
+            except (OSError, KeyError, TypeError, json.JSONDecodeError) as e:
+                print(f"[FacilitatingAgent] Ignoring unreadable snapshot: {e}")
+                return
+
+            now = clock.monotonic()
+            for agent, saved in slots.items():
+                if agent not in self.last_message or contains_handle(saved["msg"]):
+                    continue # Unknown agent, or handles from an older snapshot that may no longer resolve
+                age = saved["age"] + downtime
+                slot = self.last_message[agent]
+                slot["time"] = now - age
+                slot["msg"] = saved["msg"]
+                slot["version"] = saved["version"]
+                if age < FRESHNESS_WINDOW:
+                    slot["fresh"] = True
+                    slot["timer"] = self.wheel.schedule(FRESHNESS_WINDOW - age, self.on_dependency_expired, agent)
+                    for dependent in self.dependents[agent]:
+                        self.unresolved[dependent].discard(agent)
+                print(f"[FacilitatingAgent] Restored {agent} (version {saved['version']}, age {age:.1f}s)")
+
+            negotiation = self.last_message["negotiation"]["msg"]
+            if isinstance(negotiation, dict) and "auction_phase" in negotiation:
+                self.auction_window = negotiation
+
+            self.snapshot_version = sum(slot["version"] for slot in self.last_message.values())
+            for agent, dependencies in self.dependencies.items():
+                if dependencies and not self.unresolved[agent]:
+                    self.on_dependencies_satisfied(agent)
+
+        def on_dependency_expired(self, dependency):
+            slot = self.last_message[dependency]
+            slot["fresh"] = False
+            slot["timer"] = None
+            print(f"[FacilitatingAgent] {dependency} data expired.")
+            for agent in self.dependents[dependency]:
+                self.unresolved[agent].add(dependency)
+                print(f"[FacilitatingAgent] Awaiting dependencies for agent {agent}: {sorted(self.unresolved[agent])}")
+
+        def on_dependencies_satisfied(self, agent):
+            print(f"[FacilitatingAgent] Dependencies resolved for {agent}, sending message...")
+            self.scheduler.push(agent, self.priority_of(agent))
+
+        def update_dependency(self, dependency, body):
+            slot = self.last_message[dependency]
+            now = clock.monotonic()
+            if slot["time"] is not None and now - slot["time"] <= MIN_UPDATE_INTERVAL:
+                return False
+
+            slot["time"] = now
+            slot["msg"] = body
+            slot["version"] += 1
+            self.wheel.cancel(slot["timer"])
+            slot["timer"] = self.wheel.schedule(FRESHNESS_WINDOW, self.on_dependency_expired, dependency)
+            slot["fresh"] = True
+
+            # New data for a dependency re-sends the bundle of every agent it completes
+            for agent in self.dependents[dependency]:
+                self.unresolved[agent].discard(dependency)
+                if not self.unresolved[agent]:
+                    self.on_dependencies_satisfied(agent)
+            return True
+
+        async def send_bundle(self, agent):
+            agent_address = f"{agent}@localhost"
+            dict = {}
+            for dependency in self.dependencies[agent]:
+                dict[dependency] = self.last_message[dependency]["msg"]
+
+            try:
+                json_dump = json.dumps(dict)
+                response = Message(to=agent_address, body=json_dump)
+                await self.send(response)
+                print(f"[FacilitatingAgent] Sent message to {agent}")
+            except (TypeError, ValueError) as e:
+                print(f"[FacilitatingAgent] Invalid message format for {agent}: {e}")
+
+        async def send_ready(self):
+            # Most urgent first; an auction-phase negotiation bundle never waits behind the GUI
+            while len(self.scheduler):
+                agent = self.scheduler.pop()
+                if agent is not None and not self.unresolved[agent]:
+                    await self.send_bundle(agent)
+
+        def handle_message(self, msg):
+            sender = str(msg.sender)  # Sender's JID
+            print(f"[FacilitatingAgent] Received message from {sender}: {msg.body}")
+
+            agent = sender.split("@")[0]
+            if agent not in self.last_message:
+                print(f"[FacilitatingAgent] Message from unknown agent: {sender}")
+                return
+            try:
+                body = json.loads(msg.body)
+            except json.JSONDecodeError:
+                print(f"[FacilitatingAgent] Invalid message format: {msg.body}")
+                return
+
+            if agent == "negotiation" and isinstance(body, dict) and "auction_phase" in body:
+                # Phase changes are never rate limited, they drive the scheduling priorities
+                self.auction_window = body
+                print(f"[FacilitatingAgent] Auction phase update: {body['auction_phase']} (active: {self.auction_active()})")
+
+            if self.update_dependency(agent, body):
+                print(f"[FacilitatingAgent] {agent} message received.")
+            else:
+                print(f"[FacilitatingAgent] !!Timeout: {sender}!!")
 
         async def run(self):
-            def time_from_now(message_timing):
-                return (datetime.now() - message_timing["time"]).total_seconds()
-            
-            # Wait for messages from any agent
-            msg = await self.receive(timeout=60)  # Timeout in seconds
+            # Bundles restored from a snapshot go out before the first wait
+            await self.send_ready()
+
+            # Wait for messages from any agent, but never past the next expiry
+            timeout = self.wheel.time_until_next(limit=RECEIVE_TIMEOUT)
+            msg = await self.receive(timeout=max(timeout, self.wheel.tick))  # Timeout in seconds
             if msg:
-                sender = str(msg.sender)  # Sender's JID
-                if sender != "grid@localhost":
-                    print(f"[FacilitatingAgent] Received message from {sender}: {msg.body}")
-                else:
-                    print(f"[FacilitatingAgent] Recieved message from grid@localhost: [Data too large]")
-                # Example: Handle based on sender
-                if sender == "prediction@localhost" and time_from_now(self.last_message["prediction"]) > 5:
-                    print("[FacilitatingAgent] Prediction received.")
-                    self.last_message["prediction"]["time"] = datetime.now()
-                    self.last_message["prediction"]["msg"] = json.loads(msg.body)
-
-                elif sender == "demandresponse@localhost" and time_from_now(self.last_message["demandresponse"]) > 5:
-                    print("[FacilitatingAgent] Demand response received.")
-                    self.last_message["demandresponse"]["time"] = datetime.now()
-                    self.last_message["demandresponse"]["msg"] = json.loads(msg.body)
-
-                elif sender == "negotiation@localhost" and time_from_now(self.last_message["negotiation"]) > 5:
-                    print("[FacilitatingAgent] Negotiation message received.")
-                    self.last_message["negotiation"]["time"] = datetime.now()
-                    self.last_message["negotiation"]["msg"] = json.loads(msg.body)
-
-                elif sender == "behavioralsegmentation@localhost" and time_from_now(self.last_message["behavioralsegmentation"]) > 5:
-                    print("[FacilitatingAgent] Behavioral segmentation message received.")
-                    self.last_message["behavioralsegmentation"]["time"] = datetime.now()
-                    self.last_message["behavioralsegmentation"]["msg"] = json.loads(msg.body)
-
-                elif sender == "house@localhost" and time_from_now(self.last_message["house"]) > 5:
-                    print("[FacilitatingAgent] House status received.")
-                    self.last_message["house"]["time"] = datetime.now()
-                    self.last_message["house"]["msg"] = json.loads(msg.body)
-
-                elif sender == "grid@localhost" and time_from_now(self.last_message["grid"]) > 5:
-                    print("[FacilitatingAgent] Grid status received.")
-                    self.last_message["grid"]["time"] = datetime.now()
-                    self.last_message["grid"]["msg"] = json.loads(msg.body)
-                
-                elif sender == "gui@localhost" and time_from_now(self.last_message["gui"]) > 5:
-                    print("[FacilitatingAgent] Grid status received.")
-                    self.last_message["gui"]["time"] = datetime.now()
-                    self.last_message["gui"]["msg"] = json.loads(msg.body)
-
-                else:
-                    print(f"[FacilitatingAgent] !!Timeout: {sender}!!")
+                self.handle_message(msg)
+                # Apply whatever else is already queued so bundles go out in priority order
+                handled = 1
+                while handled < MAX_BATCH and self.mailbox_size() > 0:
+                    queued = await self.receive()
+                    if queued is None:
+                        break
+                    self.handle_message(queued)
+                    handled += 1
 
             else:
                 print("[FacilitatingAgent] No message received.")
 
-            # Update dependencies and send responses if needed
-            for agent in self.dependencies:
-                
-                unresolved_dependencies = []
-                for dependency in self.dependencies[agent]:
-                    if time_from_now(self.last_message[dependency]) > 30:
-                        unresolved_dependencies.append(dependency)
-
-                if len(self.dependencies[agent]) != 0:
-                    if len(unresolved_dependencies) == 0:
-                        print(f"[FacilitatingAgent] Dependencies resolved for {agent}, sending message...")
-
-                        agent_address = f"{agent}@localhost"
-                        dict = {}
-                        for dependency in self.dependencies[agent]:
-                            dict[dependency] = self.last_message[dependency]["msg"]
-
-                        try:
-                            json_dump = json.dumps(dict)
-                            response = Message(to=agent_address, body=json_dump)
-                            await self.send(response)
-                            print(f"[FacilitatingAgent] Sent message to {agent}")
-                        except json.JSONDecodeError:
-                            print(f"[FacilitatingAgent] Invalid message format: {msg.body}")
-                    else:
-                        print(f"[FacilitatingAgent] Awaiting dependencies for agent {agent}:")
-                        for dependency in unresolved_dependencies:
-                            print(dependency)
-                else:
-                    print(f"[FacilitatingAgent] {agent} has no dependencies.")
+            # Fire expiry timers that came due while waiting
+            self.wheel.advance()
+
+            # Send bundles for every agent whose inputs just became ready
+            await self.send_ready()
+
+            if self.snapshot_due:
+                self.snapshot_due = False
+                self.save_snapshot()
 
     async def setup(self):
         print("[FacilitatingAgent] Started")
         handler = self.MultiAgentHandler()
         self.add_behaviour(handler)
-
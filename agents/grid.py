@@ -1,31 +1,94 @@
 from spade.agent import Agent
-from spade.behaviour import CyclicBehaviour
+from communication.transport import TransportBehaviour
 from spade.message import Message
 import json
-import numpy as np
-import asyncio
 import os
+import math
+import sqlite3
+from communication.shared_payload import SharedArrayRing
+from utils.test_sets import load_test_set
+from simulation.ieso_replay import IESOReplay
+from simulation.series_store import SeriesStore
+from simulation import clock
+from utils.resampler import MultiResolutionResampler, RESOLUTIONS
+from trading.phase import Cadence
+from agents.facilitating import FRESHNESS_WINDOW, MIN_UPDATE_INTERVAL
+
+# Test sample windows travel out of band; the message only carries their handles
+# "testset" steps through the saved test windows every 5 s; "replay" streams the raw IESO series
+GRID_MODE = os.getenv("GRID_MODE", "testset")
+GRID_REPLAY_COMPRESSION = float(os.getenv("GRID_REPLAY_COMPRESSION", "1440")) # 1440 = one simulated day per minute
+# Replay from the series store kept up to date by simulation.ieso_feed instead of the static XML snapshots
+GRID_REPLAY_STORE = os.getenv("GRID_REPLAY_STORE")
+DB_NAME = "energy_data.db"
+IDLE_INTERVAL = 15 # Test-set mode: seconds between updates while no auction is running
+ACTIVE_INTERVAL = 2 # ... and while one is
+# Replay mode: at most one message per facilitator update interval, whatever the compression; the facilitator
+# drops faster updates anyway, and the ring's writes stay bounded by this rate
+REPLAY_SEND_INTERVAL = MIN_UPDATE_INTERVAL
+PHASE_WAKEUPS = 8 # Extra test-set ticks per window from the cadence waking early at phase changes and boundaries
+# Two windows written per message; a handle the facilitator forwards for FRESHNESS_WINDOW s must not be overwritten
+GRID_PAYLOAD_SLOTS = 2 * (math.ceil(FRESHNESS_WINDOW / min(ACTIVE_INTERVAL, REPLAY_SEND_INTERVAL)) + PHASE_WAKEUPS)
+
+def initialize_aggregates_table(db_name):
+    """Creates the table for closed resampler buckets if it doesn't exist."""
+    conn = sqlite3.connect(db_name)
+    cursor = conn.cursor()
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS grid_aggregates (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp REAL,     -- Bucket start (Unix timestamp)
+            resolution TEXT,    -- '5m', '15m', '1h', '1d'
+            series TEXT,
+            mean REAL, min REAL, max REAL, sum REAL, count INTEGER
+        )
+    """)
+    conn.commit()
+    conn.close()
 
 # Negotiation Agent: Facilitates peer-to-peer energy trading
 class Grid(Agent):
-    class GridBehavior(CyclicBehaviour):
+    class GridBehavior(TransportBehaviour):
         async def on_start(self):
             self.grid_demand = 0
             self.idx = 24
-            project_dir = os.path.dirname(os.path.dirname(__file__))
-            data_path_demand = os.path.join(project_dir,"models", "energy_X_test_demand_set.npz")
-            data_path_supply = os.path.join(project_dir,"models", "energy_X_test_supply_set.npz")
-            data_demand = np.load(data_path_demand)
-            data_supply = np.load(data_path_supply)
+            # Read-only memmaps shared by every Grid instance; windows below are views
+            data_demand = load_test_set("energy_X_test_demand_set")
+            data_supply = load_test_set("energy_X_test_supply_set")
             self.X_test_supply = data_supply["X_test"]
             self.Y_test_supply = data_supply["y_test"]
             self.X_test_demand = data_demand["X_test"]
             self.Y_test_demand = data_demand["y_test"]    
 
+            window_bytes = max(self.X_test_supply[:24].nbytes, self.X_test_demand[:24].nbytes)
+            self.payload_ring = SharedArrayRing(f"grid_payload_{os.getpid()}", window_bytes, GRID_PAYLOAD_SLOTS)
+
+            self.replay = None
+            if GRID_MODE == "replay":
+                store = SeriesStore(GRID_REPLAY_STORE) if GRID_REPLAY_STORE else None
+                self.replay = IESOReplay(compression=GRID_REPLAY_COMPRESSION, store=store)
+                self.resampler = self.replay.resampler # Fed every 5-minute sample by the replay
+                self.last_replay_send = None # clock.monotonic() of the last replay message
+                print(f"[Grid] Replaying IESO data at {GRID_REPLAY_COMPRESSION:g}x")
+            else:
+                self.resampler = MultiResolutionResampler(["demand", "supply"])
+
+            self.cadence = Cadence(IDLE_INTERVAL, ACTIVE_INTERVAL)
+            self.db_name = DB_NAME
+            initialize_aggregates_table(self.db_name)
+            self.persisted_until = {resolution: -1 for resolution in RESOLUTIONS} # Last bucket start written per resolution
+
+        async def on_end(self):
+            self.payload_ring.close()
+
         async def run(self):
-            await asyncio.sleep(5)
+            if self.replay is not None:
+                await self.send_replay_hour()
+                return
+
+            await self.cadence.sleep()
             print("[Grid] Sending Grid Demand and Supply Data")
-            msg = await self.receive(timeout=5)
+            msg = await self.receive() # Drain without blocking; the cadence sets the pace
             
             test_sample_supply = self.X_test_supply[self.idx-24:self.idx]
             test_sample_demand = self.X_test_demand[self.idx-24:self.idx]
@@ -33,6 +96,8 @@ class Grid(Agent):
             actual_supply = self.Y_test_supply[self.idx]
             actual_demand = self.Y_test_demand[self.idx]
             
+            self.resampler.update(clock.time(), [float(actual_demand[0]), float(actual_supply[0])])
+
             # Ensure index stays between 24 and the length of the array
             self.idx = (self.idx + 1) % len(self.X_test_supply)
             if self.idx < 24:
@@ -42,12 +107,59 @@ class Grid(Agent):
             response.body = json.dumps({
                 "grid_demand": actual_demand.tolist(),
                 "grid_supply": actual_supply.tolist(),
-                "test_sample_supply": test_sample_supply.tolist(),
-                "test_sample_demand": test_sample_demand.tolist()
+                "test_sample_supply": self.payload_ring.write(test_sample_supply),
+                "test_sample_demand": self.payload_ring.write(test_sample_demand),
+                "aggregates": self.resampler.summary()
             })
             
             await self.send(response)
             print("[Grid] Sent grid demand data to FacilitatingAgent")
+            self.persist_aggregates()
+
+        async def send_replay_hour(self):
+            # Wakes once per simulated hour, as soon as the replay has a full 24 h window
+            test_sample_demand, test_sample_supply = await self.replay.next_hour()
+            now = clock.monotonic()
+            if self.last_replay_send is not None and now - self.last_replay_send < REPLAY_SEND_INTERVAL:
+                self.persist_aggregates() # Hours in between only feed the aggregates
+                return
+            self.last_replay_send = now
+            actual_demand, actual_supply = self.replay.latest_hour()
+
+            response = Message(to="facilitating@localhost")
+            response.body = json.dumps({
+                "grid_demand": [actual_demand],
+                "grid_supply": [actual_supply],
+                "test_sample_supply": self.payload_ring.write(test_sample_supply),
+                "test_sample_demand": self.payload_ring.write(test_sample_demand),
+                "replay_time": self.replay.simulated_time(),
+                "aggregates": self.resampler.summary()
+            })
+
+            await self.send(response)
+            print("[Grid] Sent replayed grid data to FacilitatingAgent")
+            self.persist_aggregates()
+
+        def persist_aggregates(self):
+            """Writes the resampler buckets closed since the last call to grid_aggregates."""
+            rows = []
+            for resolution in RESOLUTIONS:
+                closed = self.resampler.closed_since(resolution, self.persisted_until[resolution])
+                if closed:
+                    self.persisted_until[resolution] = closed[-1][0]
+                    rows.extend((start, resolution, *values) for start, *values in closed)
+            if not rows:
+                return
+            try:
+                conn = sqlite3.connect(self.db_name)
+                conn.executemany(
+                    "INSERT INTO grid_aggregates (timestamp, resolution, series, mean, min, max, sum, count) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    rows
+                )
+                conn.commit()
+                conn.close()
+            except sqlite3.Error as e:
+                print(f"[Grid] Error persisting aggregates: {e}")
 
     async def setup(self):
         print("[House] Started")
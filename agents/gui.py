@@ -1,10 +1,14 @@
 from spade.agent import Agent
-from spade.behaviour import CyclicBehaviour
+from communication.transport import TransportBehaviour
 from spade.message import Message
 import json
 import sqlite3
-import time
-import asyncio
+from agents.facilitating import FRESHNESS_WINDOW
+from simulation import clock
+from trading.phase import Cadence
+
+IDLE_INTERVAL = FRESHNESS_WINDOW / 2 # Seconds between strategy updates while no auction is running; the facilitator drops older ones
+ACTIVE_INTERVAL = 5 # ... and while one is
 
 class GUIAgent(Agent):
     def __init__(self, jid, password):
@@ -30,18 +34,24 @@ class GUIAgent(Agent):
 
     def store_data(self, table, value):
         """Inserts data into the corresponding table."""
-        timestamp = time.time()
+        timestamp = clock.time()
         conn = sqlite3.connect(self.db_name)
         cursor = conn.cursor()
         cursor.execute(f"INSERT INTO {table} (timestamp, value) VALUES (?, ?)", (timestamp, value))
         conn.commit()
         conn.close()
 
-    class guiBehaviour(CyclicBehaviour):
+    class guiBehaviour(TransportBehaviour):
+        async def on_start(self):
+            self.cadence = Cadence(IDLE_INTERVAL, ACTIVE_INTERVAL)
+
         async def run(self):
             print("[GUI] Waiting for data...")
-            msg = await self.receive(timeout=30)
-            await asyncio.sleep(5)
+            await self.cadence.sleep()
+            # Newest bundle, without blocking; the cadence sets the pace and older bundles are superseded
+            msg = None
+            while self.mailbox_size() > 0:
+                msg = await self.receive()
             if msg:
                 try:
                     data = json.loads(msg.body)
@@ -1,91 +1,73 @@
 from spade.agent import Agent
-from spade.behaviour import CyclicBehaviour
+from communication.transport import TransportBehaviour
 from spade.message import Message
 import json
 import os
-import asyncio
-import numpy as np
-import random
 import math
+from utils.test_sets import load_test_set
+from simulation.house_fleet import HouseFleet
+from simulation.features import get_feature_table
+from communication.shared_payload import SharedArrayRing
+from trading.phase import Cadence
+from agents.facilitating import FRESHNESS_WINDOW
+
+HOUSE_FLEET_SIZE = int(os.getenv("HOUSE_FLEET_SIZE", "1")) # Number of simulated houses
+HOUSE_FLEET_SEED = int(os.getenv("HOUSE_FLEET_SEED", "5014"))
+FLEET_SHARED_MEMORY_THRESHOLD = 1000 # Larger fleets send their columns out of band
+IDLE_INTERVAL = 15 # Seconds between updates while no auction is running
+ACTIVE_INTERVAL = 2 # ... and while one is
+FLEET_COLUMNS = 7 # Arrays written to the ring per tick (HouseFleet.step batch)
+PHASE_WAKEUPS = 8 # Extra ticks per window from the cadence waking early at phase changes and boundaries
+# The facilitator forwards a handle for FRESHNESS_WINDOW s, so its slot must outlive every tick written meanwhile
+FLEET_RING_SLOTS = FLEET_COLUMNS * (math.ceil(FRESHNESS_WINDOW / ACTIVE_INTERVAL) + PHASE_WAKEUPS)
 
 # Function to create pretend temperature
 def temperature_model(time_step: int):
     """
-    Simulates temperature variation based on a time step.
+    Simulated temperature at a time step, looked up in the shared feature table.
     :param time_step: Integer representing time (e.g., hours, days, etc.)
     :return: Simulated temperature value.
     """
-    base_temp = 20  # Base temperature in degrees Celsius
-    amplitude = 10  # Maximum deviation from the base temp
-    period = 24  # Period of temperature cycle (e.g., daily cycle)
-    
-    # Sinusoidal variation to model day/night cycle
-    temp_variation = amplitude * math.sin((2 * math.pi * time_step) / period)
-    
-    # Add some randomness to simulate real-world variation
-    noise = random.uniform(-2, 2)
-    
-    return base_temp + temp_variation + noise
+    return float(get_feature_table().temperature_at(time_step))
 
 def holiday_model(time_step: int):
-    return time_step % 4
+    return int(get_feature_table().holiday_at(time_step))
 
 # Negotiation Agent: Facilitates peer-to-peer energy trading
 class House(Agent):
-    class HouseStatus(CyclicBehaviour):
+    class HouseStatus(TransportBehaviour):
         async def on_start(self):
-            self.idx = 0
-            project_dir = os.path.dirname(os.path.dirname(__file__))
-            data_path = os.path.join(project_dir,"models", "energy_test_set.npz")
-            data = np.load(data_path)
+            # Read-only memmap shared by every House instance in the process
+            data = load_test_set("energy_test_set")
             self.X_test = data["X_test"]
             self.Y_test = data["y_test"]
 
-        async def run(self):
-            await asyncio.sleep(5)
-            print("[House] Sending current consumption and production data...")
-            msg = await self.receive(timeout=5)
+            # Every simulated house advances in one vectorized step
+            self.fleet = HouseFleet(self.X_test, self.Y_test, HOUSE_FLEET_SIZE, seed=HOUSE_FLEET_SEED)
+            self.payload_ring = None
+            if HOUSE_FLEET_SIZE >= FLEET_SHARED_MEMORY_THRESHOLD:
+                column_bytes = self.fleet.power.nbytes
+                self.payload_ring = SharedArrayRing(f"house_fleet_{os.getpid()}", column_bytes, FLEET_RING_SLOTS)
+            self.cadence = Cadence(IDLE_INTERVAL, ACTIVE_INTERVAL)
 
-            test_sample = self.X_test[self.idx].reshape(1, self.X_test.shape[1], 1)
-            actual_values = self.Y_test[self.idx]
-            
-            current_production = actual_values[0]
-            current_demand = actual_values[1]
+        async def on_end(self):
+            if self.payload_ring is not None:
+                self.payload_ring.close()
 
-            temperature = temperature_model(self.idx)
-            holiday = holiday_model(self.idx)
-            power_per_device = current_demand/5
+        async def run(self):
+            await self.cadence.sleep()
+            print("[House] Sending current consumption and production data...")
+            msg = await self.receive() # Drain without blocking; the cadence sets the pace
 
-            self.idx = (self.idx + 1) % len(self.X_test)
+            batch = self.fleet.step()
 
             response = Message(to="facilitating@localhost")
-
-            response.body = json.dumps({
-                    "current_demand": current_demand,
-                    "current_production": current_production,
-                    "temperature" : temperature,
-                    "holiday" : holiday,
-                    "test_sample": test_sample.tolist(),  # Convert NumPy array to a Python list
-                    "appliances": [
-                        {"item": "Blender", 
-                         "duration":random.randint(0, 200), 
-                         "power_consumption":power_per_device},
-                        {"item": "Game System", 
-                         "duration":random.randint(0, 200), 
-                         "power_consumption":power_per_device},
-                        {"item": "TV", 
-                         "duration":random.randint(0, 200), 
-                         "power_consumption":power_per_device},
-                        {"item": "Heater", 
-                         "duration":random.randint(0, 200), 
-                         "power_consumption":power_per_device},
-                        {"item": "Washing Machine", 
-                         "duration":random.randint(0, 200), 
-                         "power_consumption":power_per_device}
-                    ]
-                })
+            response.body = json.dumps(self.fleet.to_message(batch, self.payload_ring))
             await self.send(response)
-            print(f"[House] Sent current data to FacilitatingAgent: {response.body}")
+            if HOUSE_FLEET_SIZE == 1:
+                print(f"[House] Sent current data to FacilitatingAgent: {response.body}")
+            else:
+                print(f"[House] Sent data for {HOUSE_FLEET_SIZE} houses to FacilitatingAgent ({len(response.body)} bytes)")
 
     async def setup(self):
         print("[House] Started")
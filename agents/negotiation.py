@@ -1,14 +1,25 @@
 from spade.agent import Agent
-from spade.behaviour import CyclicBehaviour
+from communication.transport import TransportBehaviour
 from spade.behaviour import PeriodicBehaviour
 from spade.template import Template
 from spade.message import Message
-from web3 import Web3
+from web3 import Web3, AsyncWeb3
 import json
 import os
-from dotenv import load_dotenv # pip install python-dotenv
 import asyncio
-import time # Use time for timestamping
+from simulation import clock # Simulation clock for timestamps and auction phases
+from simulation.auction import SimulatedChain, SimulatedVickreyAuction, AsyncSimulatedChain, AsyncSimulatedAuction
+from trading import strategy as strategy_params
+from trading.phase import Cadence, get_phase_feed
+from trading.auction_tracker import AuctionTracker
+from trading.wallet import WalletLedger
+from trading.tx_manager import TransactionManager
+from trading.bid_prep import BidPreparer, sealed_bid
+from trading.house_pool import HousePool
+from trading.client import RPC_POOL_SIZE, ContractError, get_client
+from trading.phase_scheduler import PhaseScheduler
+from communication.shared_payload import StalePayloadError
+from eth_account import Account
 import sqlite3 # Import sqlite3
 from datetime import datetime, timedelta
 
@@ -16,6 +27,12 @@ from datetime import datetime, timedelta
 DB_NAME = "energy_data.db" # Use the same DB name
 SUMMARY_LOG_INTERVAL = 45 # Log summary every 45 seconds
 
+# --- Blockchain RPC Configuration ---
+RECEIPT_POLL_LATENCY = 0.5 # Seconds between new-block checks for pending receipts; the event loop keeps running in between
+IDLE_INTERVAL = 10 # Seconds between trading cycles while no auction is running
+ACTIVE_INTERVAL = 1 # ... and during bidding/reveal, so deadlines are not missed
+HOUSE_FLEET_SIZE = int(os.getenv("HOUSE_FLEET_SIZE", "1")) # Same setting as the House agent; houses 1.. trade from the pool
+
 # --- Helper Function for DB Logging ---
 def log_blockchain_event(db_name, timestamp, agent_account, event_type, energy_kwh, price_eth, balance_eth, counterparty=None, status="Success", auction_id=None):
     """Logs blockchain-related events to the database."""
@@ -71,7 +88,7 @@ def initialize_trade_summary_table(db_name):
         
 # Negotiation Agent: Facilitates peer-to-peer energy trading
 class NegotiationAgent(Agent):
-    class TradingBehaviour(CyclicBehaviour):
+    class TradingBehaviour(TransportBehaviour):
         async def log_trade_summary(self, db_name, timestamp, total_bought, total_sold):
             """Logs the cumulative trade summary to the database."""
             try:
@@ -89,7 +106,7 @@ class NegotiationAgent(Agent):
         async def call_trade_summary(self):
             try:
                 self.log_trade_summary(
-                    self.db_name, time.time(),
+                    self.db_name, clock.time(),
                     self.total_energy_bought, self.total_energy_sold
                 )
             except Exception as e:
@@ -104,95 +121,116 @@ class NegotiationAgent(Agent):
             initialize_trade_summary_table(self.db_name) # Create the trade summary table
             # --- End Database Init ---
 
-            # Connect to local blockchain (Ganache)
-            self.web3 = Web3(Web3.HTTPProvider("http://127.0.0.1:8545"))
-            if not self.web3.is_connected():
+            self.bid_amount = 0 # In Wei for contract calls
+            self.nonce = "mainhouse" # Make sure this nonce is unique if multiple bidders use same value
+            self.private_key = None # Signing key for pre-signed bids; without one the node's unlocked account is used
+            self.contract_abi = None # Parsed ABI with precomputed event topics (trading.client), not for the simulated auction
+            self.reported_phase = None # Last auction state sent to the FacilitatingAgent
+            self.phase_feed = get_phase_feed() # Other agents in this process pace themselves on it
+            self.cadence = Cadence(IDLE_INTERVAL, ACTIVE_INTERVAL, self.phase_feed)
+
+            if clock.get_clock().virtual:
+                # Block timestamps must follow virtual time, so trade against the in-memory auction model
+                chain = SimulatedChain()
+                self.web3 = AsyncSimulatedChain(chain)
+                self.auction_contract = AsyncSimulatedAuction(SimulatedVickreyAuction(chain))
+                self.accounts = await self.web3.eth.accounts
+                self.account = self.accounts[0]
+                print(f"[NegotiationAgent] Virtual clock: using simulated auction with account {self.account}")
+                await self.start_chain_services()
+                await self.log_current_balance("Init")
+                return
+
+            # Connect to local blockchain (Ganache) over the process's pooled keep-alive HTTP session.
+            # Every RPC is awaited, so a round-trip or receipt wait no longer stalls the other agents
+            client = get_client()
+            self.web3 = await client.async_web3()
+            if not await self.web3.is_connected():
                  print("[NegotiationAgent] ERROR: Failed to connect to the blockchain")
                  # Optionally stop the agent or handle the error robustly
                  await self.agent.stop()
                  return
-            print(f"[NegotiationAgent] Ganache connected: {self.web3.is_connected()}")
-
+            print("[NegotiationAgent] Ganache connected")
 
-            # Load environment variables from the .env file
-            load_dotenv()
-
-            # Load contract address dynamically
-            project_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__))) # Use abspath for reliability
-            env_path = os.path.join(project_dir, "blockchain", ".env")
-            load_dotenv(dotenv_path=env_path) # Explicitly provide path
-
-            contract_address = os.getenv("CONTRACT_ADDRESS")
-            if not contract_address:
-                print("[NegotiationAgent] ERROR: Contract address not found in .env file.")
-                await self.agent.stop()
-                return
-
-            # Ensure the contract is deployed
+            # Contract address from blockchain/.env, ABI from the build artifact and the deployment check,
+            # each loaded once per process by the shared client
             try:
-                code = self.web3.eth.get_code(contract_address)
-                if code == b'0x' or code == b'':
-                     print(f"[NegotiationAgent] ERROR: Contract address {contract_address} is invalid or contract not deployed.")
-                     await self.agent.stop()
-                     return
-            except Exception as e:
-                 print(f"[NegotiationAgent] ERROR checking contract code: {e}")
-                 await self.agent.stop()
-                 return
-
-
-            # Load the contract ABI dynamically
-            contract_path = os.path.join(project_dir, "blockchain", "build", "contracts", "EnergyVickreyAuction.json")
-            if not os.path.exists(contract_path):
-                print(f"[NegotiationAgent] ERROR: Contract ABI file not found at {contract_path}")
+                self.auction_contract = await client.async_contract()
+                self.contract_abi = client.abi
+            except ContractError as e:
+                print(f"[NegotiationAgent] ERROR: {e}")
                 await self.agent.stop()
                 return
-
-            try:
-                with open(contract_path, "r") as abi_file:
-                    contract_data = json.load(abi_file)
-            except json.JSONDecodeError:
-                 print(f"[NegotiationAgent] ERROR: Could not decode JSON from ABI file {contract_path}")
-                 await self.agent.stop()
-                 return
-
-            # Validate ABI structure
-            if 'abi' not in contract_data or not isinstance(contract_data['abi'], list):
-                print("[NegotiationAgent] ERROR: ABI is missing or invalid in the contract JSON file.")
+            except Exception as e:
+                print(f"[NegotiationAgent] ERROR checking contract code: {e}")
                 await self.agent.stop()
                 return
 
-            contract_abi = contract_data['abi']
-
-
-            # Initialize the contract
-            self.auction_contract = self.web3.eth.contract(address=contract_address, abi=contract_abi)
-
             # Define bidder accounts (from Ganache)
-            self.accounts = self.web3.eth.accounts
-            if not self.accounts:
+            self.accounts = await self.web3.eth.accounts
+            # With a key in blockchain/.env the agent signs its own transactions, so bids can be signed ahead of time
+            self.private_key = os.getenv("TRADING_PRIVATE_KEY")
+            if self.private_key:
+                self.account = Account.from_key(self.private_key).address
+            elif not self.accounts:
                  print("[NegotiationAgent] ERROR: No accounts found in Ganache. Is it running?")
                  await self.agent.stop()
                  return
-            self.account = self.accounts[0] # Use the first account as this agent's identity
+            else:
+                self.account = self.accounts[0] # Use the first account as this agent's identity
             print(f"[NegotiationAgent] Using account: {self.account}")
-
-            self.bid_amount = 0 # In Wei for contract calls
-            self.nonce = "mainhouse" # Make sure this nonce is unique if multiple bidders use same value
+            await self.start_chain_services()
 
             # --- Initial Balance Log ---
             await self.log_current_balance("Init")
             # --- End Initial Balance Log ---
 
 
+        async def start_chain_services(self):
+            # Transactions are sent with locally allocated nonces; receipts come from one block watcher
+            self.tx_manager = TransactionManager(self.web3, poll_interval=RECEIPT_POLL_LATENCY)
+            # Bids and reveals signed before their phase opens
+            self.bid_prep = None
+            if self.private_key:
+                self.bid_prep = BidPreparer(self.web3, self.auction_contract, self.tx_manager, self.private_key, self.nonce)
+            # Auction phase from contract logs instead of polling the timings every cycle
+            self.tracker = AuctionTracker(self.web3, self.auction_contract, self.phase_feed, self.contract_abi)
+            # Bid, reveal and close at set offsets into each phase, on chain time estimated from block timestamps
+            self.scheduler = PhaseScheduler(self.tracker)
+            self.tx_manager.block_listeners.append(self.scheduler.observe_block)
+            # Balance kept locally from our receipts and the auction's payouts
+            self.ledger = WalletLedger(self.web3, self.account, self.tracker)
+            # The fleet's other houses trade from their own seed-derived keys, funded from this account
+            # before the ledger's first balance read
+            self.pool = None
+            if HOUSE_FLEET_SIZE > 1:
+                virtual = clock.get_clock().virtual # The simulated chain takes unsigned sends
+                try:
+                    self.pool = HousePool(self.web3, self.auction_contract, self.tx_manager, HOUSE_FLEET_SIZE, self.tracker,
+                                          RPC_POOL_SIZE, sign=not virtual, seed=os.getenv("HOUSE_KEY_SEED"))
+                    await self.pool.fund(self.account, self.private_key)
+                except Exception as e:
+                    print(f"[NegotiationAgent] ERROR setting up the house pool: {e}")
+            await self.ledger.reconcile()
+            await self.tracker.refresh()
+            self.tracker_task = asyncio.create_task(self.tracker.run())
+
+        async def on_end(self):
+            if getattr(self, "tracker_task", None):
+                self.tracker_task.cancel()
+            if getattr(self, "tx_manager", None):
+                await self.tx_manager.stop()
+            # Close the pooled HTTP session
+            if isinstance(getattr(self, "web3", None), AsyncWeb3):
+                await get_client().close()
+
         async def log_current_balance(self, event_suffix="Update"):
-            """Queries and logs the agent's current ETH balance."""
+            """Logs the agent's current ETH balance."""
             try:
-                balance_wei = self.web3.eth.get_balance(self.account)
-                balance_eth = self.web3.from_wei(balance_wei, "ether")
+                balance_eth = await self.ledger.balance_eth()
                 log_blockchain_event(
                     db_name=self.db_name,
-                    timestamp=time.time(),
+                    timestamp=clock.time(),
                     agent_account=self.account,
                     event_type=f"Balance {event_suffix}",
                     energy_kwh=None,
@@ -208,7 +246,7 @@ class NegotiationAgent(Agent):
                 try:
                     log_blockchain_event(
                         db_name=self.db_name,
-                        timestamp=time.time(),
+                        timestamp=clock.time(),
                         agent_account=self.account,
                         event_type=f"Balance {event_suffix}",
                         energy_kwh=None, price_eth=None, balance_eth=None,
@@ -222,38 +260,38 @@ class NegotiationAgent(Agent):
             self.bid_amount = price_wei
 
         async def create_sealed_bid(self, value_wei, nonce): # Expect Wei
-            # Change to match contract's keccak256(abi.encodePacked()) format
-            encoded = Web3.solidity_keccak(['uint256', 'string'], [value_wei, nonce])
-            return encoded
+            return sealed_bid(value_wei, nonce)
 
-        async def get_auction_timings(self):
-            # Add error handling
+        async def prepare_bids(self, market_price_eth_per_kwh, amount_kwh, strategy):
+            """Signs the bid at each strategy's price before bidding opens (only with TRADING_PRIVATE_KEY)."""
+            if self.bid_prep is None:
+                return
+            # The live bid is rounded to the same grid, so a price move of up to two steps still hits a signed one
+            value = strategy_params.bid_value_wei(market_price_eth_per_kwh, amount_kwh, strategy)
+            step = strategy_params.BID_STEP_WEI
+            candidates = [v for v in (value, value + step, value - step, value + 2 * step, value - 2 * step) if v > 0]
             try:
-                bidding_start = self.auction_contract.functions.biddingStart().call()
-                reveal_start = self.auction_contract.functions.biddingEnd().call() # This is biddingEnd in contract
-                reveal_end = self.auction_contract.functions.revealEnd().call()
-                return bidding_start, reveal_start, reveal_end
+                await self.bid_prep.prepare_bids(candidates)
             except Exception as e:
-                print(f"[NegotiationAgent] Error getting auction timings: {e}")
-                return 0, 0, 0 # Return defaults indicating no active auction / error
-
-        async def wait_until(self, target_timestamp):
-            # Simplified wait logic
-            if not target_timestamp or target_timestamp == 0:
-                print("[NegotiationAgent] Invalid target timestamp for wait_until.")
-                return # Don't wait if timestamp is invalid
-
-            target_dt = datetime.fromtimestamp(target_timestamp)
-            current_dt = datetime.now()
-            wait_seconds = (target_dt - current_dt).total_seconds()
-
-            if wait_seconds > 0:
-                print(f"[NegotiationAgent] Waiting for {wait_seconds:.2f} seconds until {target_dt}...")
-                await asyncio.sleep(wait_seconds + 1) # Add a small buffer
-                print("[NegotiationAgent] Wait finished.")
-            else:
-                 print("[NegotiationAgent] Target time already passed, proceeding immediately.")
-            return
+                print(f"[NegotiationAgent] Failed to prepare bids: {e}")
+
+        async def prepare_reveal(self):
+            """Signs the reveal of the bid just placed, to be sent when the reveal phase opens."""
+            try:
+                await self.bid_prep.prepare_reveal(self.bid_amount)
+            except Exception as e:
+                print(f"[NegotiationAgent] Failed to prepare reveal: {e}")
+
+        async def transact(self, function, params, cache_gas=True):
+            """Sends a contract transaction from the agent's account and waits for its receipt;
+            signed locally when TRADING_PRIVATE_KEY is set."""
+            if self.bid_prep is not None:
+                return await (await self.bid_prep.send(function, params, cache_gas))
+            return await self.tx_manager.transact(function, {"from": self.account, **params}, cache_gas=cache_gas)
+
+        async def get_auction_timings(self):
+            # Cached by the tracker from the contract's events; no RPC
+            return self.tracker.timings()
 
         async def start_auction(self, energy_amount_kwh):
             print(f"[NegotiationAgent] Attempting to start auction for {energy_amount_kwh} kWh...")
@@ -262,7 +300,7 @@ class NegotiationAgent(Agent):
             try:
                 # Check if an auction is already running (based on biddingStart time)
                 current_bidding_start, _, current_reveal_end = await self.get_auction_timings()
-                now = time.time()
+                now = clock.time()
                 if current_bidding_start != 0 and now < current_reveal_end:
                      print("[NegotiationAgent] Cannot start new auction, another is in progress.")
                      # Maybe log this state?
@@ -272,24 +310,23 @@ class NegotiationAgent(Agent):
                 # Convert energy_amount_kwh to the unit expected by the contract if necessary
                 contract_energy_unit = int(energy_amount_kwh) # Assuming contract takes integer kWh for now
 
-                tx = self.auction_contract.functions.startAuction(contract_energy_unit).transact({
-                    'from': self.account,
-                    'gas': 3000000,
-                    'gasPrice': self.web3.to_wei('20', 'gwei') # Adjust gas as needed
-                })
-                receipt = self.web3.eth.wait_for_transaction_receipt(tx)
+                # Gas is estimated each time: startAuction clears the previous round's bidders
+                receipt = await self.transact(self.auction_contract.functions.startAuction(contract_energy_unit), {
+                    'gasPrice': self.web3.to_wei('20', 'gwei') # Adjust gas price as needed
+                }, cache_gas=False)
+                self.tracker.apply_receipt(receipt)
                 print(f"[NegotiationAgent] Auction started successfully! Tx: {receipt.transactionHash.hex()}")
 
                 # Log Auction Start event
-                await self.log_current_balance("Post-AuctionStart") # Log balance after TX cost
+                self.ledger.apply_receipt(receipt) # Balance after TX cost
                 log_blockchain_event(
                     db_name=self.db_name,
-                    timestamp=time.time(),
+                    timestamp=clock.time(),
                     agent_account=self.account,
                     event_type="Auction Start",
                     energy_kwh=energy_amount_kwh,
                     price_eth=None,
-                    balance_eth=float(self.web3.from_wei(self.web3.eth.get_balance(self.account), "ether")),
+                    balance_eth=await self.ledger.balance_eth(),
                     counterparty=None,
                     status="Success"
                 )
@@ -298,15 +335,15 @@ class NegotiationAgent(Agent):
             except Exception as e:
                 print(f"[NegotiationAgent] Failed to start auction: {e}")
                 # Log Failure
-                await self.log_current_balance("Post-AuctionStartFail")
+                self.ledger.invalidate() # The outcome is unknown; read the chain for this row
                 log_blockchain_event(
                     db_name=self.db_name,
-                    timestamp=time.time(),
+                    timestamp=clock.time(),
                     agent_account=self.account,
                     event_type="Auction Start",
                     energy_kwh=energy_amount_kwh,
                     price_eth=None,
-                    balance_eth=float(self.web3.from_wei(self.web3.eth.get_balance(self.account), "ether")), # Log balance even on fail
+                    balance_eth=await self.ledger.balance_eth(), # Log balance even on fail
                     status="Failed"
                 )
                 return False # Indicate failure
@@ -316,79 +353,86 @@ class NegotiationAgent(Agent):
             self.set_bid_amount(price_wei) # Store the bid amount (in Wei)
             print(f"[NegotiationAgent] Attempting to bid {self.web3.from_wei(price_wei, 'ether')} ETH...")
             try:
-                sealed_bid = await self.create_sealed_bid(self.bid_amount, self.nonce)
-                tx = self.auction_contract.functions.bid(sealed_bid).transact({
-                    "from": self.account,
-                    "value": self.bid_amount, # The actual value sent with the bid (for deposit)
-                    "gas": 3000000 # Adjust gas
-                })
-                receipt = self.web3.eth.wait_for_transaction_receipt(tx)
+                if self.bid_prep is not None:
+                    # Usually signed while the auction was expected: just eth_sendRawTransaction
+                    receipt = await (await self.bid_prep.send_bid(self.bid_amount))
+                else:
+                    sealed = await self.create_sealed_bid(self.bid_amount, self.nonce)
+                    receipt = await self.tx_manager.transact(self.auction_contract.functions.bid(sealed), {
+                        "from": self.account,
+                        "value": self.bid_amount # The actual value sent with the bid (for deposit)
+                    })
+                self.tracker.apply_receipt(receipt)
                 print(f"[NegotiationAgent] Bid placed successfully by {self.account}. Tx: {receipt.transactionHash.hex()}")
 
                 # Log Bid event (balance will decrease due to gas + value sent)
-                await self.log_current_balance("Post-Bid")
+                self.ledger.apply_receipt(receipt, self.bid_amount)
                 log_blockchain_event(
                     db_name=self.db_name,
-                    timestamp=time.time(),
+                    timestamp=clock.time(),
                     agent_account=self.account,
                     event_type="Bid",
                     energy_kwh=None, # Energy amount not relevant for bid itself
                     price_eth=float(self.web3.from_wei(self.bid_amount, "ether")), # Log the bid price
-                    balance_eth=float(self.web3.from_wei(self.web3.eth.get_balance(self.account), "ether")),
+                    balance_eth=await self.ledger.balance_eth(),
                     status="Success"
                 )
+                return True
 
             except Exception as e:
                 print(f"[NegotiationAgent] Failed to place bid for {self.account}: {e}")
                  # Log Failure
-                await self.log_current_balance("Post-BidFail")
+                self.ledger.invalidate() # The outcome is unknown; read the chain for this row
                 log_blockchain_event(
                     db_name=self.db_name,
-                    timestamp=time.time(),
+                    timestamp=clock.time(),
                     agent_account=self.account,
                     event_type="Bid",
                     energy_kwh=None,
                     price_eth=float(self.web3.from_wei(self.bid_amount, "ether")),
-                    balance_eth=float(self.web3.from_wei(self.web3.eth.get_balance(self.account), "ether")),
+                    balance_eth=await self.ledger.balance_eth(),
                     status="Failed"
                 )
+                return False
 
 
         async def reveal(self):
             print(f"[NegotiationAgent] Attempting to reveal bid: {self.web3.from_wei(self.bid_amount, 'ether')} ETH, Nonce: {self.nonce}")
             try:
-                tx = self.auction_contract.functions.reveal(self.bid_amount, self.nonce).transact({
-                    'from': self.account,
-                    "gas": 3000000 # Adjust gas
-                })
-                receipt = self.web3.eth.wait_for_transaction_receipt(tx)
+                if self.bid_prep is not None:
+                    receipt = await (await self.bid_prep.send_reveal(self.bid_amount)) # Signed when the bid was mined
+                else:
+                    receipt = await self.tx_manager.transact(self.auction_contract.functions.reveal(self.bid_amount, self.nonce), {
+                        'from': self.account
+                    })
+                self.tracker.apply_receipt(receipt)
                 print(f"[NegotiationAgent] Bid revealed successfully by {self.account}! Tx: {receipt.transactionHash.hex()}")
 
-                # Log Reveal event (balance changes due to gas, maybe refund if overbid?)
-                await self.log_current_balance("Post-Reveal")
+                # Log Reveal event (balance changes due to gas; deposits come back when the auction closes)
+                self.ledger.apply_receipt(receipt)
                 log_blockchain_event(
                     db_name=self.db_name,
-                    timestamp=time.time(),
+                    timestamp=clock.time(),
                     agent_account=self.account,
                     event_type="Reveal",
                     energy_kwh=None,
                     price_eth=float(self.web3.from_wei(self.bid_amount, "ether")), # Log revealed amount
-                    balance_eth=float(self.web3.from_wei(self.web3.eth.get_balance(self.account), "ether")),
+                    balance_eth=await self.ledger.balance_eth(),
                     status="Success"
                 )
 
             except Exception as e:
                 print(f"[NegotiationAgent] Failed to reveal bid for {self.account}: {e}")
                 # Log Failure
-                await self.log_current_balance("Post-RevealFail")
+                self.ledger.invalidate() # The outcome is unknown; read the chain for this row
                 log_blockchain_event(
                     db_name=self.db_name,
-                    timestamp=time.time(),
+                    timestamp=clock.time(),
                     agent_account=self.account,
                     event_type="Reveal",
                     energy_kwh=None,
                     price_eth=float(self.web3.from_wei(self.bid_amount, "ether")),
-                    balance_eth=float(self.web3.from_wei(self.web3.eth.get_balance(self.account), "ether")),
+                    balance_eth=await self.ledger.balance_eth(),
                     status="Failed"
                 )
 
@@ -396,21 +440,15 @@ class NegotiationAgent(Agent):
             # Close the auction and log the outcome
             print("[NegotiationAgent] Attempting to close auction...")
             try:
-                tx = self.auction_contract.functions.closeAuction().transact({
-                    "from": self.account, # Usually only auctioneer or anyone can close? Check contract logic.
-                    "gas": 3000000 # Adjust gas
-                })
-                receipt = self.web3.eth.wait_for_transaction_receipt(tx)
+                # Gas is estimated each time: closeAuction refunds every bidder
+                receipt = await self.transact(self.auction_contract.functions.closeAuction(), {}, cache_gas=False)
+                self.ledger.apply_receipt(receipt)
+                self.tracker.apply_receipt(receipt) # The ledger credits the payout from the AuctionClosed log
                 print(f"[NegotiationAgent] closeAuction transaction successful. Tx: {receipt.transactionHash.hex()}")
 
-                # --- Query Results AFTER closing ---
-                # It might take a block for state changes like winner/price to finalize
-                await asyncio.sleep(2) # Small delay to allow state update
-
-                winner = self.auction_contract.functions.highestBidder().call()
-                final_price_wei = self.auction_contract.functions.secondHighestBid().call() # Vickrey price
+                # --- Results from the AuctionClosed event in the receipt ---
+                winner, final_price_wei, energy_kwh = self.tracker.last_result # Vickrey price = 2nd highest bid
                 final_price_eth = self.web3.from_wei(final_price_wei, "ether")
-                energy_kwh = self.auction_contract.functions.energyAmount().call() # Assuming this returns kWh
 
                 print(f"[NegotiationAgent] Auction Closed Results:")
                 print(f"  - Winner: {winner}")
@@ -418,8 +456,7 @@ class NegotiationAgent(Agent):
                 print(f"  - Final Price (2nd Highest Bid): {final_price_eth} ETH ({final_price_wei} Wei)")
 
                 # --- Log Auction Outcome ---
-                await self.log_current_balance("Post-Close") # Log balance after potential payout/refund + gas
-                current_balance_eth = float(self.web3.from_wei(self.web3.eth.get_balance(self.account), "ether"))
+                current_balance_eth = await self.ledger.balance_eth()
 
                 event_type = "Auction End" # Generic end event
                 log_energy = energy_kwh
@@ -443,7 +480,7 @@ class NegotiationAgent(Agent):
 
                 log_blockchain_event(
                     db_name=self.db_name,
-                    timestamp=time.time(),
+                    timestamp=clock.time(),
                     agent_account=self.account,
                     event_type=event_type,
                     energy_kwh=log_energy,
@@ -458,15 +495,15 @@ class NegotiationAgent(Agent):
             except Exception as e:
                 print(f"[NegotiationAgent] Failed to close auction or log outcome: {e}")
                 # Log Failure
-                await self.log_current_balance("Post-CloseFail")
+                self.ledger.invalidate() # The outcome is unknown; read the chain for this row
                 try:
                      log_blockchain_event(
                         db_name=self.db_name,
-                        timestamp=time.time(),
+                        timestamp=clock.time(),
                         agent_account=self.account,
                         event_type="Auction End", # Generic failure event
                         energy_kwh=None, price_eth=None,
-                        balance_eth=float(self.web3.from_wei(self.web3.eth.get_balance(self.account), "ether")),
+                        balance_eth=await self.ledger.balance_eth(),
                         status="Failed"
                     )
                 except Exception as log_e:
@@ -475,7 +512,7 @@ class NegotiationAgent(Agent):
 
         async def current_auction_state(self, bidding_start, bidding_end, reveal_end):
             # Returns state index: -1 No Auction, 0 Pre-Bidding, 1 Bidding, 2 Reveal, 3 Post-Reveal/Closing
-            current_time = time.time() # Use time.time() for consistency with logs
+            current_time = self.scheduler.chain_time() # Estimated block time (trading.phase_scheduler)
 
             if bidding_start == 0: # No auction initialized or last one fully ended
                 print("[NegotiationAgent] State: No active auction.")
@@ -494,26 +531,46 @@ class NegotiationAgent(Agent):
                 return 3
 
 
+        async def report_auction_phase(self, state, bidding_start, bidding_end, reveal_end):
+            """Publishes the phase to this process's agents and tells the FacilitatingAgent about changes."""
+            self.phase_feed.publish_state(state, bidding_start, bidding_end, reveal_end)
+            if state == self.reported_phase:
+                return
+            response = Message(to="facilitating@localhost")
+            response.body = json.dumps({
+                "auction_phase": state,
+                "bidding_start": bidding_start,
+                "bidding_end": bidding_end,
+                "reveal_end": reveal_end
+            })
+            await self.send(response)
+            self.reported_phase = state
+            print(f"[NegotiationAgent] Reported auction phase {state} to FacilitatingAgent")
+
         async def run(self):
             print("[NegotiationAgent] Behaviour loop started. Waiting for data...")
-            await asyncio.sleep(5) # Initial wait before checking messages
 
             try:
                 # Check auction status periodically regardless of messages
                 bidding_start, bidding_end, reveal_end = await self.get_auction_timings()
                 current_state = await self.current_auction_state(bidding_start, bidding_end, reveal_end)
+                await self.report_auction_phase(current_state, bidding_start, bidding_end, reveal_end)
 
                 # --- Automatic Closing Logic ---
                 if current_state == 3: # If auction is past reveal end, try to close it
+                    # closeAuction needs a block timestamp past revealEnd: wait out the close margin
+                    await self.scheduler.wait("close")
                     print("[NegotiationAgent] Auction period ended, attempting to close...")
                     await self.close()
-                    # After closing, timings should reset (bidding_start becomes 0),
-                    # so the state will become -1 in the next loop iteration.
-                    await asyncio.sleep(10) # Wait a bit after closing before next loop
+                    # A successful close is applied from its receipt, so the state is already -1;
+                    # otherwise give the tracker a cycle to see who closed it
+                    if self.tracker.state() == 3:
+                        await self.cadence.sleep()
                     return # End current run cycle after closing attempt
 
                 # --- Receive Message and React ---
-                msg = await self.receive(timeout=15) # Shorter timeout to allow periodic checks
+                # Short while an auction is live, and over by the time the next bid/reveal/close window opens
+                msg = await self.receive(timeout=self.cadence.interval(self.scheduler.next_action_delay()))
 
                 if msg:
                     print(f"[NegotiationAgent] Received message from {msg.sender}")
@@ -562,22 +619,23 @@ class NegotiationAgent(Agent):
                         current_demand = house_data["current_demand"]
                         market_price_eth_per_kwh = demand_response_data["market_value"]
                         strategy = gui_data["strategy"]
+                        if self.pool is not None and house_data.get("fleet"):
+                            try:
+                                self.pool.update(house_data["fleet"], market_price_eth_per_kwh, strategy)
+                            except StalePayloadError as e:
+                                print(f"[NegotiationAgent] Skipping fleet update: {e}")
                         energy_delta_kwh = current_prod - current_demand
                         print(f"[NegotiationAgent] Calculated Energy Delta: {energy_delta_kwh:.2f} kWh")
 
                         # Decide whether to Buy or Sell based on delta
-                        if energy_delta_kwh < -0.1: # Need to buy (added small threshold)
+                        if energy_delta_kwh < -strategy_params.BUY_THRESHOLD: # Need to buy (added small threshold)
                             print("[NegotiationAgent] Energy deficit detected. Looking to buy.")
                             amount_to_buy_kwh = abs(energy_delta_kwh) # Try to buy the deficit
 
-                            if current_state == 1: # Only bid if currently in bidding phase
+                            if current_state == 1 and self.scheduler.due("bid"): # Only bid inside the bid window
                                 print("[NegotiationAgent] In bidding phase. Calculating bid...")
-                                bid_price_eth_per_kwh = market_price_eth_per_kwh
-                                if strategy == "aggressive":
-                                    bid_price_eth_per_kwh *= 1.05 # Bid 5% above market
-                                elif strategy == "conservative":
-                                    bid_price_eth_per_kwh *= 0.90 # Bid 10% below market
-                                # Neutral strategy bids at market price
+                                # Aggressive bids 5% above market, conservative 10% below, neutral at market
+                                bid_price_eth_per_kwh = strategy_params.bid_price(market_price_eth_per_kwh, strategy)
 
                                 # Convert total price to Wei for the bid amount AND the value field
                                 # NOTE: Vickrey means you bid your TRUE valuation. The *value* sent might
@@ -591,11 +649,12 @@ class NegotiationAgent(Agent):
                                 bid_amount_wei = self.web3.to_wei(bid_price_eth_per_kwh, "ether") # Bid is per unit? Contract dependent!
                                 # *** CHECK YOUR CONTRACT: Does bid() take price per unit or total value? Does reveal() take price per unit or total? ***
                                 # Assuming reveal() takes total value bid:
-                                total_value_bid_wei = self.web3.to_wei(bid_price_eth_per_kwh * amount_to_buy_kwh + 0.1, "ether")
+                                total_value_bid_wei = strategy_params.bid_value_wei(market_price_eth_per_kwh, amount_to_buy_kwh, strategy) # On the prepared grid
                                 self.total_energy_bought += total_bid_value_eth
-                                await self.bid(total_value_bid_wei) # Pass total WEI value you are bidding
+                                if await self.bid(total_value_bid_wei) and self.bid_prep is not None: # Pass total WEI value you are bidding
+                                    await self.prepare_reveal()
 
-                            elif current_state == 2: # Reveal phase
+                            elif current_state == 2 and self.scheduler.due("reveal"): # Reveal phase
                                 print("[NegotiationAgent] In reveal phase. Attempting to reveal previous bid...")
                                 # Need to ensure self.bid_amount was set correctly in the bidding phase run
                                 if self.bid_amount > 0:
@@ -604,22 +663,18 @@ class NegotiationAgent(Agent):
                                     print("[NegotiationAgent] No bid amount stored from bidding phase to reveal.")
 
                             else:
-                                print(f"[NegotiationAgent] Not in Bidding or Reveal phase (State: {current_state}). Cannot act.")
+                                print(f"[NegotiationAgent] No bid or reveal window open (State: {current_state}). Cannot act.")
+                                if current_state in (-1, 0):
+                                    await self.prepare_bids(market_price_eth_per_kwh, amount_to_buy_kwh, strategy)
 
 
-                        elif energy_delta_kwh > 0.1: # Have surplus to sell (added threshold)
+                        elif energy_delta_kwh > strategy_params.SELL_THRESHOLD: # Have surplus to sell (added threshold)
                             print("[NegotiationAgent] Energy surplus detected. Considering selling.")
 
                             if current_state == -1: # Only start auction if none is active
                                 print("[NegotiationAgent] No active auction. Calculating sell amount...")
-                                sell_fraction = 0.5 # Neutral default
-                                if strategy == "aggressive":
-                                    sell_fraction = 0.75
-                                elif strategy == "conservative":
-                                    sell_fraction = 0.25
-
-                                amount_to_sell_kwh = energy_delta_kwh * sell_fraction
-                                if amount_to_sell_kwh > 0.01: # Minimum amount to auction
+                                amount_to_sell_kwh = strategy_params.sell_amount(energy_delta_kwh, strategy)
+                                if amount_to_sell_kwh > strategy_params.MIN_SELL_AMOUNT: # Minimum amount to auction
                                     await self.start_auction(amount_to_sell_kwh)
                                     self.total_energy_sold  += amount_to_sell_kwh
                                 else:
@@ -633,9 +688,14 @@ class NegotiationAgent(Agent):
                 else:
                     print("[NegotiationAgent] No message received in this cycle.")
                     # Agent can still perform actions based on time/state even without messages
-                    if current_state == 2 and self.bid_amount > 0:
+                    if current_state == 2 and self.bid_amount > 0 and self.scheduler.due("reveal"):
                         print("[NegotiationAgent] In reveal phase (no message). Attempting reveal.")
                         await self.reveal()
+
+                pool_state = self.scheduler.due_state()
+                if self.pool is not None and pool_state is not None:
+                    # After this house's own action, so the pool sees an auction it just started
+                    await self.pool.step(pool_state)
                 
                 await self.call_trade_summary()
 
@@ -652,8 +712,8 @@ class NegotiationAgent(Agent):
                 # Log error to DB?
                 await asyncio.sleep(10) # Wait after error before next loop
 
-            # Wait before the next loop iteration regardless of messages/actions
-            await asyncio.sleep(5)
+            # Wait before the next loop iteration regardless of messages/actions; a phase change or the next action window cuts it short
+            await self.cadence.sleep(self.scheduler.next_action_delay())
 
 
     async def setup(self):
@@ -1,8 +1,8 @@
 from spade.agent import Agent
-from spade.behaviour import CyclicBehaviour
+from communication.transport import TransportBehaviour
 from spade.message import Message
 import json
-import time
+from simulation import clock
 import asyncio
 import os
 import tensorflow as tf
@@ -48,7 +48,7 @@ def log_prediction(db_name, timestamp, demand, production):
 
 # Prediction Agent: Forecasts energy demand and production
 class PredictionAgent(Agent):
-    class PredictBehaviour(CyclicBehaviour):
+    class PredictBehaviour(TransportBehaviour):
         async def on_start(self):
             # Load the trained LSTM model when the agent starts
             try:
@@ -119,7 +119,7 @@ class PredictionAgent(Agent):
 
 
                         # --- Log Prediction to Database ---
-                        current_timestamp = time.time()
+                        current_timestamp = clock.time()
                         log_prediction(DB_NAME, current_timestamp, predicted_demand, predicted_production)
                         print("[PredictionAgent] Prediction logged to database.")
 
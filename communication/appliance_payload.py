@@ -0,0 +1,37 @@
+import numpy as np
+
+# Columnar appliance payload.
+# Appliance names are interned to small integer IDs shared by every agent, and
+# a house's appliances travel as parallel arrays instead of one dict per
+# appliance with the key strings repeated:
+#   {"ids": [0, 1, ...], "duration": [...], "power_consumption": [...]}
+# Fleet batches use the same IDs with one (houses x appliances) matrix per field.
+
+APPLIANCE_NAMES = ("Blender", "Game System", "TV", "Heater", "Washing Machine")
+APPLIANCE_IDS = {name: i for i, name in enumerate(APPLIANCE_NAMES)}
+
+def encode_appliances(ids, durations, powers, **extra_columns):
+    """Builds the columnar payload; extra columns (e.g. priority) are added as-is."""
+    payload = {
+        "ids": np.asarray(ids).tolist(),
+        "duration": np.asarray(durations).tolist(),
+        "power_consumption": np.asarray(powers).tolist(),
+    }
+    for key, values in extra_columns.items():
+        payload[key] = np.asarray(values).tolist()
+    return payload
+
+def decode_appliances(payload):
+    """Returns (ids, durations, powers) arrays from a columnar payload or the older list of dicts."""
+    if isinstance(payload, dict):
+        return (np.asarray(payload["ids"], dtype=np.int64),
+                np.asarray(payload["duration"], dtype=np.float64),
+                np.asarray(payload["power_consumption"], dtype=np.float64))
+    # Row format: [{"item": ..., "duration": ..., "power_consumption": ...}, ...]
+    ids = np.fromiter((APPLIANCE_IDS[row["item"]] for row in payload), dtype=np.int64, count=len(payload))
+    durations = np.fromiter((row["duration"] for row in payload), dtype=np.float64, count=len(payload))
+    powers = np.fromiter((row["power_consumption"] for row in payload), dtype=np.float64, count=len(payload))
+    return ids, durations, powers
+
+def appliance_names(ids):
+    return [APPLIANCE_NAMES[i] for i in np.asarray(ids).ravel()]
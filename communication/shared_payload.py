@@ -0,0 +1,131 @@
+from multiprocessing import shared_memory, resource_tracker
+import numpy as np
+
+# Out-of-band channel for large NumPy payloads.
+# A producer owns one shared-memory segment split into a ring of fixed-size
+# slots and writes each array into the next slot. The message only carries a
+# small handle (segment, slot, offset, shape, dtype, generation); consumers map
+# the segment once and read the array in place. Every slot has a generation
+# counter in the segment header: it is odd while a write is in progress and
+# bumped again when done, so a handle whose generation no longer matches
+# points at data that has since been overwritten.
+
+HEADER_ALIGN = 64
+
+# One mapping per segment per process, shared by producers and consumers
+_segments = {}
+
+class StalePayloadError(Exception):
+    """Raised when the slot a handle points to has been overwritten."""
+
+
+def _header(shm, num_slots):
+    return np.ndarray((num_slots,), dtype=np.uint64, buffer=shm.buf)
+
+
+class SharedArrayRing:
+    def __init__(self, name, slot_bytes, num_slots=16):
+        self.name = name
+        self.num_slots = num_slots
+        self.slot_bytes = slot_bytes
+        self.data_offset = -(-num_slots * 8 // HEADER_ALIGN) * HEADER_ALIGN
+        size = self.data_offset + num_slots * slot_bytes
+        try:
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            # Left behind by a producer that did not shut down cleanly
+            stale = shared_memory.SharedMemory(name=name)
+            stale.close()
+            stale.unlink()
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        self.generations = _header(self.shm, num_slots)
+        self.generations[:] = 0
+        self.next_slot = 0
+        _segments[name] = (self.shm, num_slots)
+
+    def write(self, array):
+        """Copies `array` into the next slot and returns a JSON-serializable handle to it."""
+        array = np.ascontiguousarray(array)
+        if array.nbytes > self.slot_bytes:
+            raise ValueError(f"Array of {array.nbytes} bytes does not fit in a {self.slot_bytes} byte slot")
+
+        slot = self.next_slot
+        self.next_slot = (slot + 1) % self.num_slots
+        offset = self.data_offset + slot * self.slot_bytes
+
+        generation = int(self.generations[slot])
+        self.generations[slot] = generation + 1  # Odd while the slot is being written
+        target = np.ndarray(array.shape, dtype=array.dtype, buffer=self.shm.buf, offset=offset)
+        target[...] = array
+        del target
+        generation += 2
+        self.generations[slot] = generation
+
+        return {
+            "segment": self.name,
+            "slot": slot,
+            "offset": offset,
+            "shape": list(array.shape),
+            "dtype": array.dtype.str,
+            "generation": generation,
+            "num_slots": self.num_slots,
+        }
+
+    def close(self):
+        _segments.pop(self.name, None)
+        del self.generations
+        try:
+            self.shm.close()
+        except BufferError:
+            pass  # A consumer in this process still holds a view; the mapping goes away with it
+        self.shm.unlink()
+
+
+def attach(segment, num_slots):
+    """Maps a producer's segment into this process (once) and returns it."""
+    if segment not in _segments:
+        shm = shared_memory.SharedMemory(name=segment)
+        # The producer owns the segment; stop this process's resource tracker
+        # from unlinking it when the consumer exits
+        try:
+            resource_tracker.unregister(shm._name, "shared_memory")
+        except Exception:
+            pass
+        _segments[segment] = (shm, num_slots)
+    return _segments[segment][0]
+
+
+def is_current(handle):
+    """True while the slot still holds the data the handle was issued for."""
+    shm = attach(handle["segment"], handle["num_slots"])
+    return int(_header(shm, handle["num_slots"])[handle["slot"]]) == handle["generation"]
+
+
+def read(handle):
+    """Returns a read-only zero-copy view of the array behind `handle`."""
+    if not is_current(handle):
+        raise StalePayloadError(f"Slot {handle['slot']} of {handle['segment']} was overwritten")
+    shm = _segments[handle["segment"]][0]
+    view = np.ndarray(tuple(handle["shape"]), dtype=np.dtype(handle["dtype"]), buffer=shm.buf, offset=handle["offset"])
+    view.flags.writeable = False
+    return view
+
+
+def is_handle(value):
+    return isinstance(value, dict) and "segment" in value and "generation" in value
+
+
+def contains_handle(value):
+    """True if a message body holds a handle anywhere in its nested dicts and lists."""
+    if isinstance(value, dict):
+        return is_handle(value) or any(contains_handle(item) for item in value.values())
+    if isinstance(value, list):
+        return any(isinstance(item, (dict, list)) and contains_handle(item) for item in value)
+    return False
+
+
+def resolve_array(value):
+    """Accepts either a shared-memory handle or an inline (list) array."""
+    if is_handle(value):
+        return read(value)
+    return np.asarray(value)
@@ -1,6 +1,5 @@
 import subprocess
 import time
-import asyncio
 import os
 from agents.behavioralSegmentation import BehavioralSegmentationAgent
 from agents.demandResponse import DemandResponseAgent
@@ -10,6 +9,19 @@ from agents.prediction import PredictionAgent
 from agents.gui import GUIAgent
 from agents.grid import Grid
 from agents.house import House
+from communication.transport import attach_transport
+from simulation import clock
+from utils.loop_monitor import LoopLagMonitor
+from trading.client import BLOCKCHAIN_DIR, PROJECT_DIR
+
+# 'inprocess' routes messages between agents in this process over an in-memory bus,
+# 'xmpp' sends everything through the SPADE server
+MAS_TRANSPORT = os.getenv("MAS_TRANSPORT", "inprocess")
+# With MAS_CLOCK=virtual the agents run on a discrete-event clock for this many simulated seconds
+SIMULATION_DURATION = float(os.getenv("SIMULATION_DURATION", str(7 * 24 * 3600)))
+# MAS_LOOP_MONITOR=1 prints event-loop lag every LOOP_MONITOR_INTERVAL seconds (real time)
+MAS_LOOP_MONITOR = os.getenv("MAS_LOOP_MONITOR", "0") == "1"
+LOOP_MONITOR_INTERVAL = 60
 
 def start_spade():
     print("🟡 Starting SPADE server in a new PowerShell window...")
@@ -47,8 +59,8 @@ def start_ganache():
 def deploy_smart_contract():
     """Deploys the smart contract using Truffle in a separate PowerShell window."""
     print("🟡 Deploying the smart contract...")
-    project_root = os.path.dirname(os.path.dirname(__file__))
-    blockchain_dir = os.path.join(project_root,"5014-Project", "blockchain")
+    project_root = PROJECT_DIR
+    blockchain_dir = BLOCKCHAIN_DIR # Where the agents read blockchain/.env and the ABI from (trading.client)
     print(f"   Running deployment from project root: {project_root}")
     print(f"   Expecting 'blockchain' directory at: {blockchain_dir}")
 
@@ -102,6 +114,16 @@ async def main():
     prediction_agent = PredictionAgent("prediction@localhost", "password")
     facilitating_agent = FacilitatingAgent("facilitating@localhost", "password")
 
+    agents = [
+        gui, house, grid, behavioral_segmentation_agent, demand_response_agent,
+        negotiation_agent, prediction_agent, facilitating_agent
+    ]
+    if clock.get_clock().virtual and MAS_TRANSPORT != "inprocess":
+        print("❌ The virtual clock needs MAS_TRANSPORT=inprocess; XMPP round trips run on real time.")
+        return
+    transport = attach_transport(agents, mode=MAS_TRANSPORT)
+    print(f"🟡 Using {transport.name} transport for agent messages")
+
     await gui.start()
     await house.start()
     await grid.start()
@@ -112,22 +134,39 @@ async def main():
     await facilitating_agent.start()
     print("✅ All agents started!")
 
+    if MAS_LOOP_MONITOR and not clock.get_clock().virtual:
+        LoopLagMonitor(report_interval=LOOP_MONITOR_INTERVAL).start()
+
+    if clock.get_clock().virtual:
+        # Agents are connected; from here idle time is skipped instead of waited for
+        clock.get_clock().warp()
+        print(f"🟡 Simulating {SIMULATION_DURATION / 3600:g} h on the virtual clock from {clock.now()}...")
+        await clock.sleep(SIMULATION_DURATION)
+        for agent in agents:
+            await agent.stop()
+        print(f"✅ Simulation finished at {clock.now()}")
+
 if __name__ == "__main__":
     print("🚀 Launching the Multi-Agent System...")
 
     spade_process = start_spade()     # Start SPADE server
     streamlit_process = start_streamlit()  # Start Streamlit UI
-    ganache_process = start_ganache()  # Start Ganache CLI
-    deployment_process = deploy_smart_contract()  # Deploy the smart contract
-    smart_grid_process = start_smart_grid() # Simulate neighbours on the Smart-Grid
+    ganache_process = deployment_process = None
+    if clock.get_clock().virtual:
+        # The NegotiationAgent trades on the in-memory auction model; Ganache and smart_grid.py run on real time
+        print("🟡 Virtual clock: not starting Ganache, the contract deployment or the Smart-Grid")
+    else:
+        ganache_process = start_ganache()  # Start Ganache CLI
+        deployment_process = deploy_smart_contract()  # Deploy the smart contract
+        smart_grid_process = start_smart_grid() # Simulate neighbours on the Smart-Grid
 
     print("🟡 Running Multi-Agent System...")
     try:
-        asyncio.run(main())
+        clock.run(main())
     except KeyboardInterrupt:
         print("🛑 Shutting down processes...")
         spade_process.terminate()
         streamlit_process.terminate()
-        ganache_process.terminate()
-        deployment_process.terminate()
+        if ganache_process:
+            ganache_process.terminate()
         print("✅ Cleanup complete. Exiting.")
@@ -0,0 +1,367 @@
+import itertools
+import os
+from types import SimpleNamespace
+from web3 import Web3
+from simulation import clock
+
+# In-memory stand-in for Ganache and the EnergyVickreyAuction contract.
+# Under the virtual clock block.timestamp has to follow simulated time, which a
+# real chain cannot do, so the NegotiationAgent trades against this model
+# instead. It mirrors the contract's phases, checks, payouts and refunds, and
+# exposes the subset of the web3 API the agent uses:
+#   chain.eth.get_balance / wait_for_transaction_receipt / accounts
+#   chain.eth.filter / get_filter_changes (logs arrive already decoded)
+#   chain.eth.get_transaction_count / get_block / get_transaction_receipt
+#   chain.eth.send_transaction({"from": ..., "to": ..., "value": ...}) (plain transfers)
+#   auction.functions.<name>(*args).call() / .transact({"from": ..., "value": ...})
+# AsyncSimulatedChain / AsyncSimulatedAuction give the same model the AsyncWeb3
+# shape (awaitable calls) used by the NegotiationAgent.
+
+BIDDING_TIME = int(os.getenv("BIDDING_TIME", "20")) # Seconds, as deployed by the migration
+REVEAL_TIME = int(os.getenv("REVEAL_TIME", "10"))
+NUM_ACCOUNTS = 10
+STARTING_BALANCE = Web3.to_wei(100, "ether") # Ganache default
+GAS_USED = 100000 # Flat gas per transaction
+DEFAULT_GAS_PRICE = Web3.to_wei(20, "gwei")
+ZERO_ADDRESS = "0x0000000000000000000000000000000000000000"
+
+class SimulatedRevert(Exception):
+    pass
+
+
+class SimulatedChain:
+    def __init__(self, num_accounts=NUM_ACCOUNTS, sim_clock=None):
+        self.clock = sim_clock or clock.get_clock() # Source of block.timestamp
+        self.accounts = [Web3.to_checksum_address(f"0x{i + 1:040x}") for i in range(num_accounts)]
+        self.balances = {account: STARTING_BALANCE for account in self.accounts}
+        self.receipts = {}
+        self.block_number = 0
+        self.logs = [] # Decoded event logs of every mined transaction
+        self.pending_logs = [] # Emitted by the transaction being executed
+        self.filters = {} # filter id -> [address, index of the next unseen log]
+        self.blocks = [] # (transaction hash, timestamp) of each block (one transaction per block)
+        self.nonces = {account: 0 for account in self.accounts}
+        self.tx_counter = itertools.count(1)
+        self.eth = self # web3-style access: chain.eth.get_balance(...)
+
+    def is_connected(self):
+        return True
+
+    @staticmethod
+    def from_wei(value, unit):
+        return Web3.from_wei(value, unit)
+
+    @staticmethod
+    def to_wei(value, unit):
+        return Web3.to_wei(value, unit)
+
+    def block_timestamp(self):
+        return int(self.clock.time())
+
+    def get_balance(self, account):
+        return self.balances.get(account, 0)
+
+    def get_code(self, address):
+        return b"\x01"
+
+    def wait_for_transaction_receipt(self, tx_hash):
+        return self.receipts[tx_hash]
+
+    def emit(self, address, event, args):
+        self.pending_logs.append({"address": address, "event": event, "args": args})
+
+    def filter(self, params):
+        filter_id = hex(len(self.filters) + 1)
+        self.filters[filter_id] = [params.get("address"), len(self.logs)]
+        return SimpleNamespace(filter_id=filter_id)
+
+    def get_filter_changes(self, filter_id):
+        address, start = self.filters[filter_id]
+        self.filters[filter_id][1] = len(self.logs)
+        return [log for log in self.logs[start:] if address is None or log["address"] == address]
+
+    def get_block(self, number):
+        tx_hash, timestamp = self.blocks[number - 1]
+        return {"number": number, "timestamp": timestamp, "transactions": [tx_hash]}
+
+    @property
+    def gas_price(self):
+        return DEFAULT_GAS_PRICE
+
+    def get_transaction_count(self, account, block_identifier=None):
+        return self.nonces.get(account, 0)
+
+    def send_transaction(self, transaction):
+        """A plain ETH transfer (e.g. funding the house pool's accounts)."""
+        def transfer(sender, value):
+            self.balances[transaction["to"]] = self.balances.get(transaction["to"], 0) + value
+            self.nonces.setdefault(transaction["to"], 0)
+        return self.execute(transaction, transfer)
+
+    def get_transaction_receipt(self, tx_hash):
+        return self.receipts[tx_hash]
+
+    def execute(self, transaction, function):
+        """Runs a state-changing call as one mined transaction; reverts leave the state untouched."""
+        sender = transaction["from"]
+        value = transaction.get("value", 0)
+        gas_cost = GAS_USED * transaction.get("gasPrice", DEFAULT_GAS_PRICE)
+        if self.balances.get(sender, 0) < value + gas_cost:
+            raise SimulatedRevert("sender doesn't have enough funds to send tx")
+        self.pending_logs = []
+        function(sender, value)
+        self.balances[sender] -= value + gas_cost
+        self.nonces[sender] += 1
+
+        self.block_number += 1
+        tx_hash = next(self.tx_counter).to_bytes(32, "big")
+        self.blocks.append((tx_hash, self.block_timestamp()))
+        for index, log in enumerate(self.pending_logs):
+            log.update(blockNumber=self.block_number, logIndex=index, transactionHash=tx_hash)
+        if self.filters: # Nobody reads the logs otherwise; long headless runs would only accumulate them
+            self.logs.extend(self.pending_logs)
+        self.receipts[tx_hash] = SimpleNamespace(
+            transactionHash=tx_hash, blockNumber=self.block_number, status=1,
+            gasUsed=GAS_USED, effectiveGasPrice=gas_cost // GAS_USED, logs=self.pending_logs
+        )
+        self.pending_logs = []
+        return tx_hash
+
+
+class _ContractCall:
+    def __init__(self, auction, name, args):
+        self.auction = auction
+        self.name = name
+        self.args = args
+
+    @property
+    def fn_name(self):
+        return self.name
+
+    @property
+    def address(self):
+        return self.auction.address
+
+    def call(self, transaction=None, block_identifier=None):
+        return getattr(self.auction, self.name)(*self.args)
+
+    def estimate_gas(self, transaction=None):
+        return GAS_USED
+
+    def transact(self, transaction):
+        method = getattr(self.auction, f"_{self.name}")
+        return self.auction.chain.execute(transaction, lambda sender, value: method(sender, value, *self.args))
+
+
+class _AsyncContractCall(_ContractCall):
+    async def call(self, transaction=None, block_identifier=None):
+        return super().call(transaction, block_identifier)
+
+    async def transact(self, transaction):
+        return super().transact(transaction)
+
+    async def estimate_gas(self, transaction=None):
+        return super().estimate_gas(transaction)
+
+
+class _Functions:
+    def __init__(self, auction, call_type=_ContractCall):
+        self.auction = auction
+        self.call_type = call_type
+
+    def __getattr__(self, name):
+        return lambda *args: self.call_type(self.auction, name, args)
+
+
+class SimulatedVickreyAuction:
+    def __init__(self, chain, bidding_duration=BIDDING_TIME, reveal_duration=REVEAL_TIME):
+        self.chain = chain
+        self.address = Web3.to_checksum_address(f"0x{0xa0c710:040x}")
+        self.functions = _Functions(self)
+
+        self._seller = chain.accounts[0]
+        self._bidding_duration = bidding_duration
+        self._reveal_duration = reveal_duration
+        self._bidding_start = 0
+        self._bidding_end = 0
+        self._reveal_end = 0
+        self._ended = True
+        self._bids = {} # bidder -> [sealed bid, deposit]
+        self._bidders = []
+        self._highest_bidder = ZERO_ADDRESS
+        self._highest_bid = 0
+        self._second_highest_bid = 0
+        self._energy_amount = 0
+
+    # --- Read functions ---
+    def seller(self): return self._seller
+    def biddingStart(self): return self._bidding_start
+    def biddingEnd(self): return self._bidding_end
+    def revealEnd(self): return self._reveal_end
+    def biddingDuration(self): return self._bidding_duration
+    def revealDuration(self): return self._reveal_duration
+    def ended(self): return self._ended
+    def highestBidder(self): return self._highest_bidder
+    def highestBid(self): return self._highest_bid
+    def secondHighestBid(self): return self._second_highest_bid
+    def energyAmount(self): return self._energy_amount
+    def getBidders(self): return list(self._bidders)
+
+    def getBidDeposits(self):
+        return list(self._bidders), [self._bids[bidder][1] for bidder in self._bidders]
+
+    # --- State-changing functions: (sender, value, *args) ---
+    def _require(self, condition, message):
+        if not condition:
+            raise SimulatedRevert(message)
+
+    def _emit(self, event, **args):
+        self.chain.emit(self.address, event, args)
+
+    def _startAuction(self, sender, value, energy_amount):
+        self._require(self._ended, "Auction must be closed first")
+        self._bidders = []
+        self._highest_bidder = ZERO_ADDRESS
+        self._highest_bid = 0
+        self._second_highest_bid = 0
+        self._seller = sender
+        self._energy_amount = energy_amount
+        self._bidding_start = self.chain.block_timestamp()
+        self._bidding_end = self._bidding_start + self._bidding_duration
+        self._reveal_end = self._bidding_end + self._reveal_duration
+        self._ended = False
+        self._emit("AuctionStarted", seller=sender, energyAmount=energy_amount, biddingEnd=self._bidding_end, revealEnd=self._reveal_end)
+
+    def _bid(self, sender, value, sealed_bid):
+        now = self.chain.block_timestamp()
+        self._require(now >= self._bidding_start, "Auction phase has not started yet")
+        self._require(now < self._bidding_end, "Auction phase has ended")
+        self._require(not self._ended, "Auction already closed")
+        previous = self._bids.get(sender)
+        self._require(previous is None or previous[0] is None or previous[1] == 0, "Bidder has already placed a bid this round")
+        self._require(value > 0, "Deposit must be greater than 0")
+        if sender not in self._bidders:
+            self._bidders.append(sender)
+        self._bids[sender] = [bytes(sealed_bid), value]
+        self._emit("BidPlaced", bidder=sender, deposit=value)
+
+    def _reveal(self, sender, value, bid_value, nonce):
+        now = self.chain.block_timestamp()
+        self._require(now >= self._bidding_end, "Auction phase has not started yet")
+        self._require(now < self._reveal_end, "Auction phase has ended")
+        self._require(not self._ended, "Auction already closed")
+        bid = self._bids.get(sender)
+        self._require(bid is not None and bid[0] is not None, "No unrevealed bid found for this address")
+        self._require(bid[0] == bytes(Web3.solidity_keccak(["uint256", "string"], [bid_value, nonce])), "Invalid bid reveal: Hash mismatch")
+        self._require(bid[1] >= bid_value, "Deposit is less than revealed bid value")
+        if bid_value > self._highest_bid:
+            self._second_highest_bid = self._highest_bid
+            self._highest_bid = bid_value
+            self._highest_bidder = sender
+        elif bid_value > self._second_highest_bid:
+            self._second_highest_bid = bid_value
+        bid[0] = None
+        self._emit("BidRevealed", bidder=sender, value=bid_value)
+
+    def _closeAuction(self, sender, value):
+        self._require(self.chain.block_timestamp() >= self._reveal_end, "Auction phase has not started yet")
+        self._require(not self._ended, "Auction already closed")
+        self._ended = True
+        winner = self._highest_bidder
+        winning_price = self._second_highest_bid
+        balances = self.chain.balances
+        if winner != ZERO_ADDRESS:
+            balances[self._seller] += winning_price
+            balances[winner] += self._bids[winner][1] - winning_price
+            self._bids[winner][1] = 0
+        else:
+            winning_price = 0
+        for bidder in self._bidders:
+            if bidder != winner and self._bids[bidder][1] > 0:
+                balances[bidder] += self._bids[bidder][1]
+                self._bids[bidder][1] = 0
+        self._emit("AuctionClosed", winner=winner, winningPrice=winning_price, energyAmount=self._energy_amount)
+        self._bidding_start = 0
+
+    def _resetAuction(self, sender, value, bidding_duration, reveal_duration):
+        self._require(sender == self._seller, "Only the current seller can perform this action")
+        self._require(self._ended, "Auction must be closed first")
+        self._bidding_duration = bidding_duration
+        self._reveal_duration = reveal_duration
+        self._bidding_start = 0
+        self._bidders = []
+        self._highest_bidder = ZERO_ADDRESS
+        self._highest_bid = 0
+        self._second_highest_bid = 0
+        self._emit("AuctionReset", newBiddingDuration=bidding_duration, newRevealDuration=reveal_duration)
+
+
+class AsyncSimulatedChain:
+    """AsyncWeb3-style view of a SimulatedChain."""
+    def __init__(self, chain):
+        self.chain = chain
+        self.eth = self
+
+    async def is_connected(self):
+        return True
+
+    @staticmethod
+    def from_wei(value, unit):
+        return Web3.from_wei(value, unit)
+
+    @staticmethod
+    def to_wei(value, unit):
+        return Web3.to_wei(value, unit)
+
+    @property
+    def accounts(self):
+        async def accounts():
+            return list(self.chain.accounts)
+        return accounts()
+
+    async def get_balance(self, account, block_identifier=None):
+        return self.chain.get_balance(account)
+
+    async def get_code(self, address):
+        return self.chain.get_code(address)
+
+    async def wait_for_transaction_receipt(self, tx_hash, timeout=120, poll_latency=0.1):
+        return self.chain.wait_for_transaction_receipt(tx_hash)
+
+    @property
+    def block_number(self):
+        async def block_number():
+            return self.chain.block_number
+        return block_number()
+
+    async def filter(self, params):
+        return self.chain.filter(params)
+
+    async def get_filter_changes(self, filter_id):
+        return self.chain.get_filter_changes(filter_id)
+
+    async def get_block(self, number):
+        return self.chain.get_block(number)
+
+    @property
+    def gas_price(self):
+        async def gas_price():
+            return DEFAULT_GAS_PRICE
+        return gas_price()
+
+    async def get_transaction_count(self, account, block_identifier=None):
+        return self.chain.get_transaction_count(account)
+
+    async def get_transaction_receipt(self, tx_hash):
+        return self.chain.get_transaction_receipt(tx_hash)
+
+    async def send_transaction(self, transaction):
+        return self.chain.send_transaction(transaction)
+
+
+class AsyncSimulatedAuction:
+    """AsyncWeb3-style view of a SimulatedVickreyAuction: functions.<name>(*args).call()/.transact() are awaitable."""
+    def __init__(self, auction):
+        self.auction = auction
+        self.address = auction.address
+        self.functions = _Functions(auction, _AsyncContractCall)
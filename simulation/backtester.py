@@ -0,0 +1,181 @@
+"""Strategy backtest over the auction rounds recorded in energy_data.db.
+
+The NegotiationAgent's blockchain_log and the PredictionAgent's predictions
+tables are loaded once into NumPy arrays, one entry per auction round, and
+every strategy of a parameter grid is replayed against them in a single
+broadcast pass (strategies x rounds): no chain, agents or per-round loop.
+
+Per round the log gives the energy auctioned, the clearing price
+(secondHighestBid, on 'Auction Buy'/'Auction Sell' rows) and the house's own
+last bid. A strategy's bid is the logged bid rescaled from the logged
+strategy's multiplier to its own, so the deficit and market price behind it
+are kept; it wins when it beats the best rival bid and pays that bid (second
+price). On the selling side the house offers its forecast surplus at the
+round's start times the strategy's sell fraction, sold at the round's
+clearing price per kWh when the round had a winner and the strategy did not
+buy in it.
+
+Run from the project root, e.g.:
+    python -m simulation.backtester
+    python -m simulation.backtester --multiplier 0.8 0.9 1.0 1.1 1.2 --sell-fraction 0.25 0.5 0.75
+Logs written before the bid deposit margin existed need --logged-margin 0.
+"""
+import argparse
+import csv
+import itertools
+import sqlite3
+import time
+from collections import namedtuple
+import numpy as np
+from trading import strategy as strategy_params
+
+DB_NAME = "energy_data.db"
+DEFAULT_OUTPUT = "backtest_results.csv"
+CLOSE_EVENTS = ("Auction Buy", "Auction Sell", "Auction End (No Winner)") # Rows written when a round closes
+
+Rounds = namedtuple("Rounds", "start end energy clearing rival bid surplus")
+GridPoint = namedtuple("GridPoint", "name multiplier sell_fraction")
+
+def load_rounds(db_name=DB_NAME, account=None):
+    """Reads the logged rounds into arrays (one entry per closed round)."""
+    conn = sqlite3.connect(db_name)
+    try:
+        query = "SELECT timestamp, event_type, energy_kwh, price_eth FROM blockchain_log WHERE status = 'Success'"
+        params = ()
+        if account:
+            query += " AND agent_account = ?"
+            params = (account,)
+        log = conn.execute(query + " ORDER BY timestamp", params).fetchall()
+        predictions = conn.execute(
+            "SELECT timestamp, predicted_demand, predicted_production FROM predictions ORDER BY timestamp").fetchall()
+    finally:
+        conn.close()
+
+    timestamps = np.array([row[0] for row in log], dtype=float)
+    events = np.array([row[1] for row in log], dtype=object)
+    energy = np.array([row[2] for row in log], dtype=float) # NULL -> nan
+    price = np.array([row[3] for row in log], dtype=float)
+
+    closes = np.flatnonzero(np.isin(events, CLOSE_EVENTS))
+    end = timestamps[closes]
+    start = np.concatenate([timestamps[:1], end[:-1]])[:len(end)]
+
+    # The house's last bid before each close; bids after the last close belong to no finished round
+    bids = np.flatnonzero(events == "Bid")
+    bid_round = np.searchsorted(end, timestamps[bids])
+    bids, bid_round = bids[bid_round < len(end)], bid_round[bid_round < len(end)]
+    bid = np.full(len(end), np.nan)
+    rounds_with_bid, last = np.unique(bid_round[::-1], return_index=True)
+    bid[rounds_with_bid] = price[bids[::-1][last]]
+
+    # Best rival bid: the second price when the house won; when another bidder won,
+    # at least the second price and at least the house's own (losing) bid
+    event = events[closes]
+    clearing = np.where(event == "Auction End (No Winner)", 0.0, np.nan_to_num(price[closes]))
+    rival = np.where(event == "Auction Sell", np.fmax(clearing, bid), clearing)
+
+    # Forecast surplus when each round opened (latest prediction at or before its start)
+    forecast = np.array(predictions, dtype=float).reshape(-1, 3)
+    surplus = np.full(len(end), np.nan)
+    known = np.searchsorted(forecast[:, 0], start, side="right") - 1
+    has_forecast = known >= 0
+    surplus[has_forecast] = forecast[known[has_forecast], 2] - forecast[known[has_forecast], 1]
+
+    return Rounds(start, end, np.nan_to_num(energy[closes]), clearing, rival, bid, surplus)
+
+def strategy_grid(multipliers=None, sell_fractions=None):
+    """The named strategies, or every combination of the given multipliers and sell fractions."""
+    if not multipliers and not sell_fractions:
+        return [GridPoint(name, strategy_params.BID_MULTIPLIER[name], strategy_params.SELL_FRACTION[name])
+                for name in strategy_params.STRATEGIES]
+    multipliers = multipliers or [strategy_params.BID_MULTIPLIER[strategy_params.DEFAULT_STRATEGY]]
+    sell_fractions = sell_fractions or [strategy_params.SELL_FRACTION[strategy_params.DEFAULT_STRATEGY]]
+    return [GridPoint(f"x{multiplier:g}/sell{fraction:g}", multiplier, fraction)
+            for multiplier, fraction in itertools.product(multipliers, sell_fractions)]
+
+def backtest(rounds, grid, logged_strategy=strategy_params.DEFAULT_STRATEGY,
+             logged_margin=strategy_params.BID_DEPOSIT_MARGIN):
+    """Replays every grid point over every round at once. Returns one result dict per grid point."""
+    multiplier = np.array([point.multiplier for point in grid])[:, None] # (strategies, 1)
+    sell_fraction = np.array([point.sell_fraction for point in grid])[:, None]
+
+    # Buying: rescale the logged bid (margin + multiplier * market price * deficit) to each multiplier
+    has_bid = ~np.isnan(rounds.bid)
+    logged_multiplier = strategy_params.BID_MULTIPLIER[logged_strategy]
+    base = (np.nan_to_num(rounds.bid) - logged_margin) / logged_multiplier
+    bids = strategy_params.BID_DEPOSIT_MARGIN + base * multiplier # (strategies, rounds)
+    wins = has_bid & (bids > rounds.rival)
+    cost = (wins * rounds.rival).sum(axis=1)
+    energy_bought = (wins * rounds.energy).sum(axis=1)
+
+    # Selling: forecast surplus times the sell fraction, at the round's clearing price per kWh.
+    # The agent bids only on a deficit and sells only on a surplus, so a round it bought in sells nothing
+    surplus = np.nan_to_num(rounds.surplus)
+    unit_price = np.divide(rounds.clearing, rounds.energy, out=np.zeros_like(rounds.clearing), where=rounds.energy > 0)
+    offered = surplus * sell_fraction
+    sold = ~wins & (surplus > strategy_params.SELL_THRESHOLD) & (offered > strategy_params.MIN_SELL_AMOUNT) & (unit_price > 0)
+    energy_sold = np.where(sold, offered, 0).sum(axis=1)
+    revenue = np.where(sold, offered * unit_price, 0).sum(axis=1)
+
+    rounds_bid = int(has_bid.sum())
+    results = []
+    for i, point in enumerate(grid):
+        results.append({
+            "strategy": point.name,
+            "multiplier": point.multiplier,
+            "sell_fraction": point.sell_fraction,
+            "rounds": len(rounds.end),
+            "rounds_bid": rounds_bid,
+            "wins": int(wins[i].sum()),
+            "win_rate": round(float(wins[i].sum()) / rounds_bid, 4) if rounds_bid else 0.0,
+            "cost_eth": round(float(cost[i]), 6),
+            "energy_bought_kwh": round(float(energy_bought[i]), 6),
+            "rounds_sold": int(sold[i].sum()),
+            "energy_sold_kwh": round(float(energy_sold[i]), 6),
+            "revenue_eth": round(float(revenue[i]), 6),
+            "net_eth": round(float(revenue[i] - cost[i]), 6),
+        })
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Backtest trading strategies over the logged auction rounds.")
+    parser.add_argument("--db", default=DB_NAME)
+    parser.add_argument("--account", help="Only rows logged by this agent account")
+    parser.add_argument("--multiplier", nargs="+", type=float, help="Bid multipliers to test (default: the named strategies)")
+    parser.add_argument("--sell-fraction", nargs="+", type=float, help="Sell fractions to test")
+    parser.add_argument("--logged-strategy", choices=strategy_params.STRATEGIES, default=strategy_params.DEFAULT_STRATEGY,
+                        help="Strategy the logged bids were placed with")
+    parser.add_argument("--logged-margin", type=float, default=strategy_params.BID_DEPOSIT_MARGIN,
+                        help="Deposit margin (ETH) included in the logged bids")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    args = parser.parse_args()
+
+    rounds = load_rounds(args.db, args.account)
+    if not len(rounds.end):
+        print(f"[Backtester] No closed auction rounds in {args.db}")
+        return
+    logged_bids = rounds.bid[~np.isnan(rounds.bid)]
+    if (logged_bids < args.logged_margin).any():
+        print(f"[Backtester] WARNING: logged bids below the {args.logged_margin} ETH margin; "
+              "were they placed before the margin existed (--logged-margin 0)?")
+
+    grid = strategy_grid(args.multiplier, args.sell_fraction)
+    started = time.perf_counter()
+    results = backtest(rounds, grid, args.logged_strategy, args.logged_margin)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    with open(args.output, "w", newline="") as results_file:
+        writer = csv.DictWriter(results_file, fieldnames=list(results[0]))
+        writer.writeheader()
+        writer.writerows(results)
+
+    columns = ["strategy", "rounds_bid", "wins", "win_rate", "cost_eth", "energy_bought_kwh",
+               "rounds_sold", "revenue_eth", "net_eth"]
+    widths = [max(len(column), 12) + 2 for column in columns]
+    print("".join(f"{column:>{width}}" for column, width in zip(columns, widths)))
+    for row in results:
+        print("".join(f"{row[column]:>{width}}" for column, width in zip(columns, widths)))
+    print(f"Replayed {len(rounds.end)} rounds x {len(grid)} strategies in {elapsed_ms:.1f} ms, results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
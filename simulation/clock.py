@@ -0,0 +1,162 @@
+import asyncio
+import os
+import selectors
+import time as _time
+from datetime import datetime
+
+# Simulation clock shared by every agent.
+# "wall" reads the system clock. "virtual" is a discrete-event clock: the event
+# loop's selector never blocks while timers are pending, it jumps virtual time
+# straight to the next one instead, so asyncio.sleep() and receive(timeout=...)
+# cost nothing and weeks of interaction run as fast as the event queue drains.
+# Agents read time through this module (time(), monotonic(), now()) so logs,
+# tariffs and auction phases follow whichever clock is active.
+# Virtual time only skips ahead while no real I/O is in flight: while a socket
+# waits to write (a connect in progress, a send buffer not yet drained) or saw
+# traffic within REAL_IO_GRACE real seconds (a reply is likely on its way),
+# the loop waits in real time, so connect and read timeouts of the XMPP
+# session or a local HTTP service don't fire early.
+
+MAS_CLOCK = os.getenv("MAS_CLOCK", "wall") # "wall" or "virtual"
+SIMULATION_START = "2025-03-08T00:00:00" # Virtual epoch, the start of the IESO datasets
+REAL_IO_GRACE = 0.25 # Real seconds to wait for a reply after socket traffic before virtual time skips ahead
+
+class WallClock:
+    virtual = False
+
+    def time(self):
+        return _time.time()
+
+    def monotonic(self):
+        return _time.monotonic()
+
+    def now(self):
+        return datetime.now()
+
+    def new_event_loop(self):
+        return asyncio.new_event_loop()
+
+    def warp(self):
+        pass
+
+
+class _VirtualSelector:
+    """Wraps the loop's selector: polls for I/O, and skips the wait by advancing the virtual clock
+    unless real I/O is in flight."""
+    def __init__(self, selector, clock):
+        self._selector = selector
+        self._clock = clock
+        self._last_io = None # Real monotonic time of the last socket event
+
+    def _io_wait(self):
+        """Real seconds to keep waiting on sockets before skipping ahead (0 when no I/O is in flight)."""
+        if any(key.events & selectors.EVENT_WRITE for key in self._selector.get_map().values()):
+            return REAL_IO_GRACE # Connecting or sending; re-checked after every slice
+        if self._last_io is None:
+            return 0
+        return max(self._last_io + REAL_IO_GRACE - _time.monotonic(), 0)
+
+    def _real_select(self, timeout):
+        started = _time.monotonic()
+        events = self._selector.select(timeout)
+        now = _time.monotonic()
+        self._clock.offset += now - started
+        if events:
+            self._last_io = now
+        return events
+
+    def select(self, timeout=None):
+        events = self._selector.select(0)
+        if events:
+            self._last_io = _time.monotonic()
+            return events
+        if timeout == 0:
+            return events
+        if timeout is None or not self._clock.warping:
+            # Nothing scheduled (or still in real-time start-up): wait on real I/O
+            return self._real_select(timeout)
+        io_wait = self._io_wait()
+        if io_wait > 0:
+            # Real I/O in flight: let real time pass (up to the next timer) instead of jumping over it
+            return self._real_select(min(io_wait, timeout))
+        self._clock.offset += timeout
+        return []
+
+    def __getattr__(self, name):
+        return getattr(self._selector, name)
+
+
+class VirtualTimeEventLoop(asyncio.SelectorEventLoop):
+    def __init__(self, clock):
+        super().__init__()
+        self.clock = clock
+        self._selector = _VirtualSelector(self._selector, clock)
+
+    def time(self):
+        return self.clock.offset
+
+
+class VirtualClock:
+    virtual = True
+
+    def __init__(self, start=SIMULATION_START):
+        self.start_timestamp = datetime.fromisoformat(start).timestamp()
+        self.offset = 0.0 # Virtual seconds since start
+        self.warping = False
+
+    def time(self):
+        return self.start_timestamp + self.offset
+
+    def monotonic(self):
+        return self.offset
+
+    def now(self):
+        return datetime.fromtimestamp(self.time())
+
+    def new_event_loop(self):
+        return VirtualTimeEventLoop(self)
+
+    def advance(self, seconds):
+        """Moves virtual time forward directly, for batch runs that drive the clock without an event loop."""
+        self.offset += seconds
+
+    def warp(self):
+        """Starts skipping idle time. Until then the clock follows real time, so connection set-up can finish."""
+        self.warping = True
+
+
+_clock = None
+
+def get_clock():
+    """Process-wide clock selected by MAS_CLOCK."""
+    global _clock
+    if _clock is None:
+        _clock = VirtualClock() if MAS_CLOCK == "virtual" else WallClock()
+    return _clock
+
+def time():
+    return get_clock().time()
+
+def monotonic():
+    return get_clock().monotonic()
+
+def now():
+    return get_clock().now()
+
+async def sleep(seconds):
+    # The event loop keeps the clock's time, so a plain asyncio.sleep is virtual under the virtual clock
+    await asyncio.sleep(seconds)
+
+async def sleep_until(timestamp):
+    await asyncio.sleep(max(timestamp - time(), 0))
+
+def run(coro):
+    """asyncio.run() on an event loop driven by the active clock."""
+    loop = get_clock().new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.run_until_complete(loop.shutdown_asyncgens())
+        asyncio.set_event_loop(None)
+        loop.close()
@@ -0,0 +1,80 @@
+import os
+from datetime import datetime
+import numpy as np
+
+# Precomputed weather and calendar features for a simulation horizon.
+# Temperature, holiday flag, hour-of-week and the time-of-use tariff are
+# generated once as NumPy arrays (with seeded noise) and looked up by step
+# index, so the House agent, the fleet simulator, the tariff logic and batch
+# backtests all see identical values instead of recomputing their own.
+
+BASE_TEMP = 20 # Base temperature in degrees Celsius
+TEMP_AMPLITUDE = 10 # Maximum deviation from the base temp
+TEMP_PERIOD = 24 # Period of temperature cycle (daily)
+TEMP_NOISE = 2 # Uniform noise range (+/-)
+HOURS_PER_WEEK = 168
+DEFAULT_HORIZON = 24 * 365 # One simulated year of hourly steps
+SIMULATION_START = "2025-03-08T00:00:00" # Start of the IESO datasets, step 0
+FEATURE_SEED = int(os.getenv("FEATURE_SEED", "5014"))
+
+def tariff_rate(hour, weekday):
+    """Ontario time-of-use rate in $/kWh for an hour of the day and weekday (Monday = 0)."""
+    # Ultra-low rate: 11 PM to 7 AM
+    if hour >= 23 or hour < 7:
+        return 0.028  # 2.8¢ per kWh
+    # Weekend off-peak: 7 AM to 11 PM on weekends
+    if weekday in [5, 6]:
+        return 0.076  # 7.6¢ per kWh
+    # Weekday on-peak: 4 PM to 9 PM
+    if 16 <= hour < 21:
+        return 0.284  # 28.4¢ per kWh
+    # Weekday mid-peak: 7 AM to 4 PM, 9 PM to 11 PM
+    return 0.122  # 12.2¢ per kWh
+
+# Tariff for every hour of the week, indexed by weekday * 24 + hour
+TARIFF_BY_HOUR_OF_WEEK = np.array([tariff_rate(how % 24, how // 24) for how in range(HOURS_PER_WEEK)])
+
+def hour_of_week(timestamp):
+    current_time = datetime.fromtimestamp(timestamp)
+    return current_time.weekday() * 24 + current_time.hour
+
+
+class FeatureTable:
+    def __init__(self, horizon=DEFAULT_HORIZON, seed=FEATURE_SEED, start=SIMULATION_START):
+        rng = np.random.default_rng(seed)
+        steps = np.arange(horizon)
+        self.horizon = horizon
+        self.start_timestamp = datetime.fromisoformat(start).timestamp()
+
+        # Sinusoidal variation to model day/night cycle, plus seeded real-world noise
+        self.temperature = BASE_TEMP + TEMP_AMPLITUDE * np.sin(2 * np.pi * steps / TEMP_PERIOD)
+        self.temperature += rng.uniform(-TEMP_NOISE, TEMP_NOISE, horizon)
+        self.holiday = steps % 4
+        self.hour_of_week = (hour_of_week(self.start_timestamp) + steps) % HOURS_PER_WEEK
+        self.energy_rate = TARIFF_BY_HOUR_OF_WEEK[self.hour_of_week]
+
+        for array in (self.temperature, self.holiday, self.hour_of_week, self.energy_rate):
+            array.flags.writeable = False
+
+    def index(self, step):
+        """Maps a step (int or array) onto the table; the horizon wraps around."""
+        return np.remainder(step, self.horizon)
+
+    def temperature_at(self, step):
+        return self.temperature[self.index(step)]
+
+    def holiday_at(self, step):
+        return self.holiday[self.index(step)]
+
+    def energy_rate_at(self, step):
+        return self.energy_rate[self.index(step)]
+
+
+_shared_table = None
+
+def get_feature_table():
+    """Process-wide feature table; every process built from the same seed sees the same values."""
+    global _shared_table
+    if _shared_table is None:
+        _shared_table = FeatureTable()
+    return _shared_table
@@ -0,0 +1,90 @@
+import numpy as np
+from simulation.features import get_feature_table
+from communication.appliance_payload import APPLIANCE_NAMES, encode_appliances
+
+# Vectorized simulator for many houses at once.
+# Every house replays the saved test set from its own offset, so one step
+# advances the whole fleet with a handful of NumPy operations instead of a
+# Python loop per house. Weather and calendar features come from the shared
+# feature table and the remaining randomness from one seeded Generator, which
+# makes a fleet run reproducible.
+
+APPLIANCES = APPLIANCE_NAMES
+APPLIANCE_ID_ROW = np.arange(len(APPLIANCES))
+MAX_APPLIANCE_DURATION = 200 # Minutes, inclusive
+
+class HouseFleet:
+    def __init__(self, X_test, Y_test, num_houses, seed=None, features=None):
+        self.X_test = X_test
+        self.Y_test = Y_test
+        self.features = features or get_feature_table()
+        self.num_houses = num_houses
+        self.rng = np.random.default_rng(seed)
+        self.tick = 0
+
+        # Each house starts at its own point in the test set; house 0 matches the single House agent
+        self.offsets = self.rng.integers(0, len(X_test), num_houses)
+        self.offsets[0] = 0
+
+        # Preallocated per-tick buffers, overwritten by every step()
+        num_appliances = len(APPLIANCES)
+        self.idx = np.empty(num_houses, dtype=np.int64)
+        self.feature_idx = np.empty(num_houses, dtype=np.int64)
+        self.temperature = np.empty(num_houses)
+        self.holiday = np.empty(num_houses, dtype=np.int64)
+        self.durations = np.empty((num_houses, num_appliances), dtype=np.int64)
+        self.power = np.empty((num_houses, num_appliances))
+
+    def step(self):
+        """Advances every house by one tick and returns the columnar batch (views of internal buffers)."""
+        np.add(self.offsets, self.tick, out=self.idx)
+        np.remainder(self.idx, len(self.X_test), out=self.idx)
+        self.tick += 1
+
+        values = self.Y_test[self.idx]
+        production = values[:, 0]
+        demand = values[:, 1]
+
+        # Same step index -> same weather as the single House agent and every other reader
+        np.remainder(self.idx, self.features.horizon, out=self.feature_idx)
+        np.take(self.features.temperature, self.feature_idx, out=self.temperature)
+        np.take(self.features.holiday, self.feature_idx, out=self.holiday)
+
+        self.durations[...] = self.rng.integers(0, MAX_APPLIANCE_DURATION + 1, self.durations.shape)
+        # Random split of each house's demand across its appliances (rows sum to the demand)
+        np.multiply(self.rng.dirichlet(np.ones(len(APPLIANCES)), self.num_houses), demand[:, None], out=self.power)
+
+        return {
+            "idx": self.idx,
+            "current_demand": demand,
+            "current_production": production,
+            "temperature": self.temperature,
+            "holiday": self.holiday,
+            "appliance_duration": self.durations,
+            "appliance_power": self.power,
+        }
+
+    def to_message(self, batch, ring=None):
+        """Builds the fleet's message body: one column per field, shared-memory handles when a ring is given."""
+        def column(values):
+            return ring.write(values) if ring is not None else values.tolist()
+
+        house = 0 # Single-house fields kept for agents that only follow one house
+        return {
+            "current_demand": float(batch["current_demand"][house]),
+            "current_production": float(batch["current_production"][house]),
+            "temperature": float(batch["temperature"][house]),
+            "holiday": int(batch["holiday"][house]),
+            "test_sample": self.X_test[batch["idx"][house]].reshape(1, self.X_test.shape[1], 1).tolist(),
+            "appliances": encode_appliances(
+                APPLIANCE_ID_ROW,
+                batch["appliance_duration"][house],
+                batch["appliance_power"][house]
+            ),
+            "fleet": {
+                "size": self.num_houses,
+                "tick": self.tick,
+                "appliance_ids": APPLIANCE_ID_ROW.tolist(), # Columns of the appliance matrices
+                **{key: column(values) for key, values in batch.items()}
+            }
+        }
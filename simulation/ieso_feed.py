@@ -0,0 +1,112 @@
+"""Ingest service for IESO XML exports dropped into a local directory.
+
+Stands in for the live IESO feed: every new or rewritten .xml file in the drop
+directory (demand, HOEP/MCP price, generation by fuel type) is parsed once and
+merged into the columnar SeriesStore that the Grid's replay reads. Files
+already ingested are tracked by size and mtime, so each poll only parses what
+changed, and overlapping intervals are deduplicated by timestamp in the store.
+
+Run from the project root:
+    python -m simulation.ieso_feed --drop-dir feeds/ieso [--store datasets/ieso_store] [--once]
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+import numpy as np
+from simulation.ieso_replay import parse_ieso_xml, SAMPLE_SECONDS
+from simulation.series_store import SeriesStore, DEFAULT_STORE_DIR
+
+IESO_DROP_DIR = os.getenv("IESO_DROP_DIR", os.path.join("feeds", "ieso"))
+POLL_INTERVAL = 10 # Seconds between directory scans
+SETTLE_SECONDS = 2 # Skip files modified more recently than this; they may still be being written
+FIVE_MINUTE_SERIES = {"5_Minute", "MCP"} # Every other IESO series in these exports is hourly
+HOURLY_SECONDS = 3600
+
+def series_interval(name):
+    return SAMPLE_SECONDS if name in FIVE_MINUTE_SERIES else HOURLY_SECONDS
+
+
+class IESOFeedTailer:
+    def __init__(self, drop_dir=IESO_DROP_DIR, store=None):
+        self.drop_dir = drop_dir
+        self.store = store or SeriesStore()
+        self.manifest_path = os.path.join(self.store.path, "ingested.json")
+        self.manifest = {} # filename -> [size, mtime_ns] when last ingested
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path) as manifest_file:
+                self.manifest = json.load(manifest_file)
+
+    def _save_manifest(self):
+        temp = f"{self.manifest_path}.tmp"
+        with open(temp, "w") as manifest_file:
+            json.dump(self.manifest, manifest_file, indent=2)
+        os.replace(temp, self.manifest_path)
+
+    def pending_files(self):
+        """New or changed, settled .xml files in the drop directory, oldest first."""
+        if not os.path.isdir(self.drop_dir):
+            return []
+        settled_before = time.time() - SETTLE_SECONDS
+        pending = []
+        for entry in os.scandir(self.drop_dir):
+            if not entry.is_file() or not entry.name.endswith(".xml"):
+                continue
+            stat = entry.stat()
+            if stat.st_mtime > settled_before:
+                continue
+            if self.manifest.get(entry.name) != [stat.st_size, stat.st_mtime_ns]:
+                pending.append((stat.st_mtime_ns, entry.name, [stat.st_size, stat.st_mtime_ns]))
+        return sorted(pending)
+
+    def ingest_file(self, path):
+        """Merges every series of one export into the store. Returns {series: (added, revised)}."""
+        start, series = parse_ieso_xml(path)
+        start = int(start.timestamp())
+        merged = {}
+        for name, values in series.items():
+            interval = series_interval(name)
+            timestamps = start + np.arange(len(values), dtype=np.int64) * interval
+            merged[name] = self.store.append(name, timestamps, values, interval)
+        return merged
+
+    def poll(self):
+        """Ingests whatever changed since the last poll. Returns the names of the files ingested."""
+        ingested = []
+        for _, filename, signature in self.pending_files():
+            try:
+                merged = self.ingest_file(os.path.join(self.drop_dir, filename))
+            except Exception as e:
+                print(f"[IESOFeed] Failed to ingest {filename}: {e}")
+                continue
+            self.manifest[filename] = signature
+            self._save_manifest()
+            ingested.append(filename)
+            added = sum(counts[0] for counts in merged.values())
+            revised = sum(counts[1] for counts in merged.values())
+            print(f"[IESOFeed] {filename}: {len(merged)} series, {added} rows added, {revised} revised")
+        return ingested
+
+    async def run(self, interval=POLL_INTERVAL):
+        while True:
+            self.poll()
+            await asyncio.sleep(interval)
+
+def main():
+    parser = argparse.ArgumentParser(description="Tail a drop directory of IESO XML exports into the series store.")
+    parser.add_argument("--drop-dir", default=IESO_DROP_DIR)
+    parser.add_argument("--store", default=DEFAULT_STORE_DIR)
+    parser.add_argument("--interval", type=float, default=POLL_INTERVAL, help="Seconds between scans")
+    parser.add_argument("--once", action="store_true", help="Ingest what is there and exit")
+    args = parser.parse_args()
+
+    tailer = IESOFeedTailer(args.drop_dir, SeriesStore(args.store))
+    print(f"[IESOFeed] Watching {os.path.abspath(args.drop_dir)} -> {os.path.abspath(args.store)}")
+    if args.once:
+        tailer.poll()
+    else:
+        asyncio.run(tailer.run(args.interval))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+import asyncio
+import os
+import xml.etree.ElementTree as ET
+from datetime import datetime, timedelta, timezone
+import numpy as np
+from simulation import clock
+from utils.resampler import MultiResolutionResampler
+
+# Accelerated replay of the raw IESO exports in datasets/.
+# Demand and market clearing price come in 5-minute intervals and generation by
+# fuel type hourly. The replay walks the 5-minute timeline at a configurable
+# time-compression factor and folds each hour into the feature row the
+# demand/supply models were trained on, using fixed, preallocated buffers:
+#   [actual_demand, HOEP_price, biofuel, gas, hydro, nuclear, solar, wind, total_supply]
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATASETS_DIR = os.path.join(PROJECT_DIR, "datasets")
+
+SAMPLE_SECONDS = 300 # IESO 5-minute interval
+SAMPLES_PER_HOUR = 3600 // SAMPLE_SECONDS
+LOOKBACK = 24 # Hours per model window
+FUEL_TYPES = ["BIOFUEL", "GAS", "HYDRO", "NUCLEAR", "SOLAR", "WIND"]
+FEATURES = ["actual_demand", "HOEP_price"] + [f"{fuel.lower()}_supply" for fuel in FUEL_TYPES] + ["total_supply"]
+IESO_FILES = ["ontario_demand_multiday.xml", "price_multiday.xml", "generation_fuel_type_multiday.xml"]
+DEMAND_MODEL_FEATURES = slice(1, 9) # HOEP_price .. total_supply
+SUPPLY_MODEL_FEATURES = slice(0, 2) # actual_demand, HOEP_price
+STREAMED_SERIES = ["actual_demand", "mcp_price"] # The 5-minute series, in resampler order
+IESO_TZ = timezone(timedelta(hours=-5)) # Export timestamps are market time, EST all year (no daylight saving)
+
+def forward_fill(values):
+    """Fills NaN gaps with the last valid value along the last axis (leading gaps take the first valid value)."""
+    values = np.array(values, dtype=np.float64)
+    for series in values.reshape(-1, values.shape[-1]):
+        valid = ~np.isnan(series)
+        if not valid.any():
+            series[:] = 0
+            continue
+        last = np.maximum.accumulate(np.where(valid, np.arange(len(series)), -1))
+        last[last < 0] = np.argmax(valid)
+        series[:] = series[last]
+    return values
+
+def parse_ieso_xml(xml_file):
+    """Returns (start datetime, {series name: float array}) with missing values as NaN."""
+    root = ET.parse(xml_file).getroot()
+    start_date = datetime.fromisoformat(root.find("StartDate").text)
+    if start_date.tzinfo is None:
+        start_date = start_date.replace(tzinfo=IESO_TZ) # Not the machine's local zone
+    series = {}
+    for dataset in root.findall("DataSet"):
+        values = []
+        for data in dataset.findall("Data"):
+            value = data.find("Value")
+            values.append(float(value.text) if value is not None and value.text else np.nan)
+        series[dataset.get("Series")] = np.array(values)
+    return start_date, series
+
+
+def load_xml_series(dataset_dir=DATASETS_DIR):
+    """(start timestamp, {series: values}) from the IESO exports, which share one StartDate."""
+    series = {}
+    for filename in IESO_FILES:
+        start, parsed = parse_ieso_xml(os.path.join(dataset_dir, filename))
+        series.update(parsed)
+    return start.timestamp(), series
+
+def load_store_series(store):
+    """(start timestamp, {series: values}) over the span every replayed series covers in a SeriesStore."""
+    names = ["5_Minute", "MCP"] + FUEL_TYPES
+    columns = {name: store.read(name)[0] for name in names}
+    if any(len(timestamps) == 0 for timestamps in columns.values()):
+        raise ValueError(f"Series store {store.path} is missing one of {names}")
+    start = max(int(timestamps[0]) for timestamps in columns.values())
+    start += -start % 3600 # Align to the hour
+    end = min(int(timestamps[-1]) + store.interval(name) for name, timestamps in columns.items())
+    hours = max((end - start) // 3600, 0)
+    series = {name: store.dense(name, start, hours * 3600 // store.interval(name)) for name in names}
+    return start, series
+
+
+class IESOReplay:
+    def __init__(self, compression=1440, dataset_dir=DATASETS_DIR, store=None):
+        """compression: simulated seconds per wall-clock second (1440 = one day per minute).
+        With a SeriesStore the replay reads the ingested feed and picks up rows appended while it runs."""
+        self.store = store
+        self.dataset_dir = dataset_dir
+        self.num_samples = 0
+        self.load()
+
+        # Min/max per feature over the history at start-up, as the models' MinMaxScaler was fit
+        hourly = forward_fill(self.five_minute).reshape(2, self.hours, SAMPLES_PER_HOUR).mean(axis=2)
+        history = np.vstack([hourly, self.fuel_hourly, self.fuel_hourly.sum(axis=0)])
+        self.feature_min = history.min(axis=1)
+        self.feature_range = history.max(axis=1) - self.feature_min
+        self.feature_range[self.feature_range == 0] = 1
+
+        self.compression = compression
+        self.interval = SAMPLE_SECONDS / compression
+        self.position = 0 # Next 5-minute sample to stream
+        self.loop_offset = 0 # Seconds of completed passes over the dataset; keeps simulated time increasing
+        self.started_at = None
+
+        # Streaming 5m/15m/1h/1d aggregates of the 5-minute series, plus a ring of scaled hourly rows
+        self.resampler = MultiResolutionResampler(STREAMED_SERIES)
+        self.window = np.zeros((LOOKBACK, len(FEATURES)))
+        self.window_pos = 0
+        self.hours_filled = 0
+        self.row = np.zeros(len(FEATURES)) # Last completed hour, unscaled
+        self.demand_input = np.empty((1, LOOKBACK, DEMAND_MODEL_FEATURES.stop - DEMAND_MODEL_FEATURES.start))
+        self.supply_input = np.empty((1, LOOKBACK, SUPPLY_MODEL_FEATURES.stop - SUPPLY_MODEL_FEATURES.start))
+
+    def load(self):
+        """(Re)reads the series. Returns True when there are more samples than before."""
+        if self.store is not None:
+            start, series = load_store_series(self.store)
+        else:
+            start, series = load_xml_series(self.dataset_dir)
+        hours = min(len(series[FUEL_TYPES[0]]), len(series["5_Minute"]) // SAMPLES_PER_HOUR)
+        if hours * SAMPLES_PER_HOUR <= self.num_samples:
+            return False
+        self.start_timestamp = start
+        self.hours = hours
+        self.num_samples = hours * SAMPLES_PER_HOUR
+        # 5-minute series, as streamed: demand and market clearing price
+        self.five_minute = np.vstack([series["5_Minute"][:self.num_samples], series["MCP"][:self.num_samples]])
+        self.fuel_hourly = forward_fill([series[name][:hours] for name in FUEL_TYPES])
+        return True
+
+    def simulated_time(self):
+        return self.start_timestamp + self.loop_offset + self.position * SAMPLE_SECONDS
+
+    def step(self):
+        """Streams one 5-minute sample. Returns True when it completes an hour."""
+        self.resampler.update(self.simulated_time(), self.five_minute[:, self.position])
+        self.position += 1
+        completed = self.position % SAMPLES_PER_HOUR == 0
+        if completed:
+            hour = self.position // SAMPLES_PER_HOUR - 1
+            self.close_hour(hour)
+        if self.position >= self.num_samples and not (self.store is not None and self.load()):
+            # Loop the dataset (a store that has grown in the meantime continues instead)
+            self.loop_offset += self.num_samples * SAMPLE_SECONDS
+            self.position = 0
+        return completed
+
+    def close_hour(self, hour):
+        row = self.row
+        # Hourly means of the 5-minute series (the hour's last sample just arrived, so its bucket is
+        # still the current one); an hour with no valid sample keeps the previous hour's value
+        hourly_mean = self.resampler.latest("1h")["mean"]
+        np.copyto(row[:2], hourly_mean, where=~np.isnan(hourly_mean))
+        row[2:8] = self.fuel_hourly[:, hour]
+        row[8] = row[2:8].sum()
+
+        # Scale into the ring
+        np.subtract(row, self.feature_min, out=self.window[self.window_pos])
+        self.window[self.window_pos] /= self.feature_range
+        self.window_pos = (self.window_pos + 1) % LOOKBACK
+        self.hours_filled = min(self.hours_filled + 1, LOOKBACK)
+
+    def model_inputs(self):
+        """Latest LOOKBACK hours in time order as (demand input, supply input), or None until full."""
+        if self.hours_filled < LOOKBACK:
+            return None
+        order = np.arange(self.window_pos, self.window_pos + LOOKBACK) % LOOKBACK
+        np.take(self.window[:, DEMAND_MODEL_FEATURES], order, axis=0, out=self.demand_input[0])
+        np.take(self.window[:, SUPPLY_MODEL_FEATURES], order, axis=0, out=self.supply_input[0])
+        return self.demand_input, self.supply_input
+
+    def latest_hour(self):
+        """Scaled (actual_demand, total_supply) of the last completed hour."""
+        row = self.window[(self.window_pos - 1) % LOOKBACK]
+        return float(row[0]), float(row[8])
+
+    async def next_hour(self):
+        """Streams samples in compressed real time until a full model window is ready for a new hour."""
+        if self.started_at is None:
+            self.started_at = clock.monotonic()
+            self.streamed = 0
+        while True:
+            # Catch up on every sample that is due; at high compression that is many per wake-up
+            due = int((clock.monotonic() - self.started_at) / self.interval)
+            while self.streamed < due:
+                self.streamed += 1
+                if self.step() and self.hours_filled == LOOKBACK:
+                    return self.model_inputs()
+            await asyncio.sleep(max(self.started_at + (self.streamed + 1) * self.interval - clock.monotonic(), 0))
@@ -0,0 +1,147 @@
+"""Headless batch runs of the trading loop over a grid of scenarios.
+
+Each scenario drives a HouseFleet, the time-of-use tariff and the simulated
+Vickrey auction on its own virtual clock in a separate worker process: no
+SPADE, XMPP, Ganache or Streamlit. Scenarios share nothing, so throughput
+scales with the number of cores.
+
+Run from the project root, e.g.:
+    python -m simulation.scenario_runner --strategy aggressive neutral conservative \
+        --fleet-size 10 100 --tariff tou flat --bidding-time 20 60 --hours 168
+"""
+import argparse
+import csv
+import itertools
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from web3 import Web3
+from simulation.auction import SimulatedChain, SimulatedVickreyAuction, SimulatedRevert, ZERO_ADDRESS
+from simulation.clock import VirtualClock
+from simulation.features import TARIFF_BY_HOUR_OF_WEEK, get_feature_table
+from simulation.house_fleet import HouseFleet
+from trading import strategy as strategy_params
+from utils.test_sets import convert_test_set, load_test_set
+
+TARIFFS = ("tou", "flat") # Ontario time-of-use, or its weekly average at every hour
+STEP_SECONDS = 3600 # One fleet step per simulated hour
+DEFAULT_OUTPUT = "scenario_results.csv"
+TEST_SET = "energy_test_set" # Same test set as the House agent
+
+Scenario = namedtuple("Scenario", "strategy fleet_size tariff bidding_time reveal_time hours seed")
+
+def market_price(tariff, step, features):
+    if tariff == "flat":
+        return float(TARIFF_BY_HOUR_OF_WEEK.mean())
+    return float(features.energy_rate_at(step))
+
+def run_scenario(scenario):
+    """Simulates one scenario and returns its summary metrics."""
+    started = time.perf_counter()
+    data = load_test_set(TEST_SET)
+    features = get_feature_table()
+    fleet = HouseFleet(data["X_test"], data["y_test"], scenario.fleet_size, seed=scenario.seed)
+    sim_clock = VirtualClock()
+    chain = SimulatedChain(num_accounts=scenario.fleet_size, sim_clock=sim_clock) # One account per house
+    auction = SimulatedVickreyAuction(chain, scenario.bidding_time, scenario.reveal_time)
+    accounts = chain.accounts
+    start_balance = sum(chain.balances.values())
+
+    auctions = sold = reverts = 0
+    energy_offered = energy_sold = deficit_total = clearing_price_total = 0.0
+    for step in range(scenario.hours):
+        batch = fleet.step()
+        delta = batch["current_production"] - batch["current_demand"]
+        deficit_total += float(-delta[delta < -strategy_params.BUY_THRESHOLD].sum())
+        price = market_price(scenario.tariff, step, features)
+        step_started = sim_clock.time()
+
+        # The contract runs one auction at a time: the house with the largest surplus sells
+        seller = int(np.argmax(delta))
+        amount = strategy_params.sell_amount(float(delta[seller]), scenario.strategy)
+        if delta[seller] > strategy_params.SELL_THRESHOLD and amount > strategy_params.MIN_SELL_AMOUNT:
+            auctions += 1
+            energy_offered += amount
+            auction.functions.startAuction(int(amount)).transact({"from": accounts[seller]})
+
+            buyers = np.flatnonzero(delta < -strategy_params.BUY_THRESHOLD)
+            bids = {}
+            for house in buyers:
+                value = strategy_params.bid_value_wei(price, float(-delta[house]), scenario.strategy)
+                sealed = Web3.solidity_keccak(["uint256", "string"], [value, f"house{house}"])
+                try:
+                    auction.functions.bid(sealed).transact({"from": accounts[house], "value": value})
+                    bids[house] = value
+                except SimulatedRevert:
+                    reverts += 1
+
+            sim_clock.advance(scenario.bidding_time)
+            for house, value in bids.items():
+                try:
+                    auction.functions.reveal(value, f"house{house}").transact({"from": accounts[house]})
+                except SimulatedRevert:
+                    reverts += 1
+
+            sim_clock.advance(scenario.reveal_time)
+            auction.functions.closeAuction().transact({"from": accounts[seller]})
+            if auction.highestBidder() != ZERO_ADDRESS:
+                sold += 1
+                energy_sold += amount
+                clearing_price_total += float(Web3.from_wei(auction.secondHighestBid(), "ether"))
+
+        sim_clock.advance(max(step_started + STEP_SECONDS - sim_clock.time(), 0))
+
+    return {
+        **scenario._asdict(),
+        "auctions": auctions,
+        "auctions_sold": sold,
+        "energy_offered_kwh": round(energy_offered, 6),
+        "energy_sold_kwh": round(energy_sold, 6),
+        "deficit_kwh": round(deficit_total, 6),
+        "mean_clearing_price_eth": round(clearing_price_total / sold, 6) if sold else 0.0,
+        "gas_spent_eth": round(float(Web3.from_wei(start_balance - sum(chain.balances.values()), "ether")), 6),
+        "reverted_tx": reverts,
+        "wall_seconds": round(time.perf_counter() - started, 3),
+    }
+
+def scenario_grid(args):
+    return [Scenario(*values, args.hours, args.seed) for values in itertools.product(
+        args.strategy, args.fleet_size, args.tariff, args.bidding_time, args.reveal_time)]
+
+def main():
+    parser = argparse.ArgumentParser(description="Run trading scenarios headless, one worker process per scenario.")
+    parser.add_argument("--strategy", nargs="+", choices=strategy_params.STRATEGIES, default=list(strategy_params.STRATEGIES))
+    parser.add_argument("--fleet-size", nargs="+", type=int, default=[10])
+    parser.add_argument("--tariff", nargs="+", choices=TARIFFS, default=["tou"])
+    parser.add_argument("--bidding-time", nargs="+", type=int, default=[20], help="Seconds")
+    parser.add_argument("--reveal-time", nargs="+", type=int, default=[10], help="Seconds")
+    parser.add_argument("--hours", type=int, default=168, help="Simulated hours per scenario")
+    parser.add_argument("--seed", type=int, default=5014)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    args = parser.parse_args()
+
+    scenarios = scenario_grid(args)
+    convert_test_set(TEST_SET) # Once, before the workers map it
+    print(f"Running {len(scenarios)} scenarios on {args.workers} workers...")
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        results = list(pool.map(run_scenario, scenarios))
+
+    with open(args.output, "w", newline="") as results_file:
+        writer = csv.DictWriter(results_file, fieldnames=list(results[0]))
+        writer.writeheader()
+        writer.writerows(results)
+
+    columns = ["strategy", "fleet_size", "tariff", "bidding_time", "reveal_time",
+               "auctions_sold", "energy_sold_kwh", "mean_clearing_price_eth", "gas_spent_eth"]
+    widths = [max(len(column), 12) + 2 for column in columns]
+    print("".join(f"{column:>{width}}" for column, width in zip(columns, widths)))
+    for row in results:
+        print("".join(f"{row[column]:>{width}}" for column, width in zip(columns, widths)))
+    print(f"Done in {time.perf_counter() - started:.1f} s, results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
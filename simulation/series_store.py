@@ -0,0 +1,151 @@
+import json
+import os
+import numpy as np
+
+# Append-only columnar store for IESO time series.
+# Each series is two flat files, <series>.ts (int64 Unix seconds, strictly
+# increasing) and <series>.val (float64, NaN = missing), so appending costs
+# only the new rows and readers in other processes map the columns
+# read-only. Rows that overlap the stored tail are updated in place: a newer
+# export revises values, but never replaces a known value with a missing one.
+# Rows at or before the tail that are not stored yet (a late or backfilled
+# export, or one filling a gap) are merged in by rewriting the columns from
+# the earliest incoming row on; the files never shrink, so open readers keep
+# a valid mapping.
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_STORE_DIR = os.path.join(PROJECT_DIR, "datasets", "ieso_store")
+TS_DTYPE = np.dtype("<i8")
+VALUE_DTYPE = np.dtype("<f8")
+
+class SeriesStore:
+    def __init__(self, path=DEFAULT_STORE_DIR):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self.meta_path = os.path.join(path, "series.json")
+        self.meta = self._load_meta() # series -> {"interval": seconds}
+
+    def _load_meta(self):
+        if not os.path.exists(self.meta_path):
+            return {}
+        with open(self.meta_path) as meta_file:
+            return json.load(meta_file)
+
+    def _save_meta(self):
+        temp = f"{self.meta_path}.tmp"
+        with open(temp, "w") as meta_file:
+            json.dump(self.meta, meta_file, indent=2)
+        os.replace(temp, self.meta_path)
+
+    def _files(self, series):
+        base = os.path.join(self.path, series)
+        return f"{base}.ts", f"{base}.val"
+
+    def series_names(self):
+        self.meta = self._load_meta()
+        return sorted(self.meta)
+
+    def interval(self, series):
+        return self.meta[series]["interval"]
+
+    def length(self, series):
+        ts_file, value_file = self._files(series)
+        if not os.path.exists(ts_file):
+            return 0
+        # Values are written before timestamps, so the timestamp column bounds what is complete
+        return min(os.path.getsize(ts_file) // TS_DTYPE.itemsize, os.path.getsize(value_file) // VALUE_DTYPE.itemsize)
+
+    def last_timestamp(self, series):
+        n = self.length(series)
+        if n == 0:
+            return None
+        with open(self._files(series)[0], "rb") as ts_file:
+            ts_file.seek((n - 1) * TS_DTYPE.itemsize)
+            return int(np.frombuffer(ts_file.read(TS_DTYPE.itemsize), dtype=TS_DTYPE)[0])
+
+    def read(self, series):
+        """(timestamps, values) as read-only memmaps of the rows stored so far."""
+        n = self.length(series)
+        if n == 0:
+            return np.empty(0, dtype=TS_DTYPE), np.empty(0, dtype=VALUE_DTYPE)
+        ts_file, value_file = self._files(series)
+        return (np.memmap(ts_file, dtype=TS_DTYPE, mode="r", shape=(n,)),
+                np.memmap(value_file, dtype=VALUE_DTYPE, mode="r", shape=(n,)))
+
+    def append(self, series, timestamps, values, interval):
+        """Merges rows into a series. Returns (rows added, rows revised). Cost grows with the new rows,
+        plus the stored tail from the earliest incoming row on when that row is older than the tail."""
+        timestamps = np.asarray(timestamps, dtype=TS_DTYPE)
+        values = np.asarray(values, dtype=VALUE_DTYPE)
+        order = np.argsort(timestamps, kind="stable")
+        timestamps, values = timestamps[order], values[order]
+        if series not in self.meta:
+            self.meta[series] = {"interval": int(interval)}
+            self._save_meta()
+
+        last = self.last_timestamp(series)
+        revised = inserted = 0
+        ts_file, value_file = self._files(series)
+        if last is not None:
+            overlap = timestamps <= last
+            if overlap.any():
+                revised, inserted = self._merge(series, timestamps[overlap], values[overlap])
+            timestamps, values = timestamps[~overlap], values[~overlap]
+        if len(timestamps):
+            with open(value_file, "ab") as value_out:
+                value_out.write(values.tobytes())
+            with open(ts_file, "ab") as ts_out:
+                ts_out.write(timestamps.tobytes())
+        return len(timestamps) + inserted, revised
+
+    def _merge(self, series, timestamps, values):
+        """Merges rows no later than the stored tail. Known timestamps are revised in place; new ones are
+        inserted by rewriting the columns from the first incoming row on. Returns (rows revised, rows inserted)."""
+        n = self.length(series)
+        ts_file, value_file = self._files(series)
+        stored_ts = np.memmap(ts_file, dtype=TS_DTYPE, mode="r", shape=(n,))
+        first = int(np.searchsorted(stored_ts, timestamps.min()))
+        tail_ts = np.array(stored_ts[first:])
+        del stored_ts
+
+        positions = np.searchsorted(tail_ts, timestamps)
+        found = positions < len(tail_ts)
+        found[found] = tail_ts[positions[found]] == timestamps[found]
+        update = found & ~np.isnan(values) # Never overwrite a known value with a missing one
+        new = ~found
+        _, unique = np.unique(timestamps[new], return_index=True) # Keep one row per new timestamp
+        new_ts, new_values = timestamps[new][unique], values[new][unique]
+
+        if not len(new_ts):
+            if not update.any():
+                return 0, 0
+            stored_values = np.memmap(value_file, dtype=VALUE_DTYPE, mode="r+", shape=(n,))
+            stored_values[first + positions[update]] = values[update]
+            stored_values.flush()
+            del stored_values
+            return int(update.sum()), 0
+
+        stored_values = np.memmap(value_file, dtype=VALUE_DTYPE, mode="r", shape=(n,))
+        tail_values = np.array(stored_values[first:])
+        del stored_values
+        tail_values[positions[update]] = values[update]
+        merged_ts = np.concatenate([tail_ts, new_ts])
+        order = np.argsort(merged_ts, kind="stable")
+        # Values are written before timestamps, as for an append
+        for path, column in ((value_file, np.concatenate([tail_values, new_values])[order]), (ts_file, merged_ts[order])):
+            with open(path, "r+b") as out:
+                out.seek(first * column.itemsize)
+                out.write(column.tobytes())
+        return int(update.sum()), len(new_ts)
+
+    def dense(self, series, start, count, interval=None):
+        """Values on a regular grid of `count` steps from `start`, NaN where nothing is stored."""
+        interval = interval or self.interval(series)
+        out = np.full(count, np.nan)
+        timestamps, values = self.read(series)
+        first = int(np.searchsorted(timestamps, start))
+        last = int(np.searchsorted(timestamps, start + count * interval))
+        steps = (timestamps[first:last] - start) // interval
+        on_grid = (timestamps[first:last] - start) % interval == 0
+        out[steps[on_grid]] = values[first:last][on_grid]
+        return out
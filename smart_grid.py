@@ -1,18 +1,17 @@
 from web3 import Web3
-import json
 import time
 import hashlib
 import os
 from datetime import datetime
-from dotenv import load_dotenv
 from math import sin
+from trading.auction_tracker import AuctionTracker
+from trading.rpc_batch import BatchReads
+from trading.tx_manager import TransactionManager
+from trading.phase_scheduler import PhaseScheduler
+from trading.client import get_client, load_env
 
-# Load contract address dynamically
-project_dir = os.path.dirname(os.path.dirname(__file__))  # Correct path logic
-
-env_path = os.path.join(project_dir, "5014-Project", "blockchain", ".env")
-
-load_dotenv(env_path)  # Ensure .env is loaded from the correct location
+# CONTRACT_ADDRESS, BIDDING_TIME and REVEAL_TIME from blockchain/.env
+load_env()
 
 # Function to create a sealed bid hash
 def create_sealed_bid(value, nonce):
@@ -20,69 +19,53 @@ def create_sealed_bid(value, nonce):
     encoded = Web3.solidity_keccak(['uint256', 'string'], [int(value), str(nonce)])
     return encoded
 
-def start_auction(auctioneer, auction_contract, web3, energy_amount=5):
-    # Wait for the last auction to end and then start a new one
-    try: 
-        auction_started = auction_contract.functions.biddingStart().call()
-    except Exception as e:
-        print(e)
-        input("Press Enter to Exit...")
-    
-    while auction_started != 0:
-        auction_started = auction_contract.functions.biddingStart().call()
-    
-    # Once auction_started is 0 start the auction
+def start_auction(auctioneer, auction_contract, web3, tracker, tx_manager, energy_amount=5):
+    # Wait for the last auction to end (AuctionClosed/AuctionReset logs) and then start a new one
+    tracker.wait_for(lambda: tracker.state() == -1)
+
+    # Once no auction is running start the auction
     bidding_duration = int(os.getenv("BIDDING_TIME")) 
     reveal_duration = int(os.getenv("REVEAL_TIME"))  
-    tx = auction_contract.functions.startAuction(int(energy_amount)).transact({
+    tx = tx_manager.submit_blocking(auction_contract.functions.startAuction(int(energy_amount)), {
         'from': auctioneer,
-        'gas': 3000000,
         'gasPrice': web3.to_wei('20', 'gwei')
-    })
-    web3.eth.wait_for_transaction_receipt(tx)
+    }, cache_gas=False) # Clears the previous round's bidders, so the cost varies
+    tracker.apply_receipt(tx_manager.wait_blocking([tx])[0])
     print(f"Auction started with bidding duration {bidding_duration} and reveal duration {reveal_duration}!")
 
-def wait_until(end_timestamp):
-    end_datetime = datetime.fromtimestamp(end_timestamp)
-    
-    diff = (end_datetime - datetime.now()).total_seconds()
-    print(f"Wait time of: {diff}")
-    while diff > 1:
-        
-        diff = (end_datetime - datetime.now()).total_seconds()
-        print(f'Time Until Continue: {diff}')
-        time.sleep(diff / 2)
-
-def wait_until_timeout(end_timestamp, auction_contract):
-    countdown = 3
-    while countdown > 0 and end_timestamp == 0:
-        print(f"Countdown: {countdown}")
-        if end_timestamp == 0:
-            time.sleep(3)
-            end_timestamp = auction_contract.functions.biddingStart().call()
-        countdown -= 1
-
-    if countdown == end_timestamp:
+def submit_all(tx_manager, transactions, action):
+    # Sends (sender, function, params) transactions without waiting for receipts; returns {sender: tx hash}
+    sent = {}
+    for sender, function, params in transactions:
+        try:
+            sent[sender] = tx_manager.submit_blocking(function, params)
+        except Exception as e:
+            print(f"Failed to {action} for {sender}: {e}")
+    return sent
+
+def wait_until_timeout(tracker, scheduler, timeout=9):
+    # Returns True if no auction was started within the timeout
+    if not tracker.wait_for(lambda: tracker.bidding_start != 0, timeout=timeout):
         return True
 
-    wait_until(end_timestamp)
-    
+    scheduler.wait_blocking("bid")
+
     return False
-    
+
 
 # Function to run a full auction round
-def run_auction_round(bidders, auction_contract, auctioneer, web3, auction_holder=True, energy_amount=5):
+def run_auction_round(bidders, auction_contract, auctioneer, web3, tracker, tx_manager, scheduler, auction_holder=True, energy_amount=5):
     print("Running new auction round...")
 
     if auction_holder:
         # Start the auction (if not started)
-        start_auction(auctioneer, auction_contract, web3, energy_amount)
+        start_auction(auctioneer, auction_contract, web3, tracker, tx_manager, energy_amount)
 
     # Step 2: Wait for the bidding phase to open
-    bidding_start = auction_contract.functions.biddingStart().call()
-    flag = wait_until_timeout(bidding_start, auction_contract)
+    flag = wait_until_timeout(tracker, scheduler)
     if flag:
-        start_auction(auctioneer, auction_contract, web3, energy_amount)
+        start_auction(auctioneer, auction_contract, web3, tracker, tx_manager, energy_amount)
+    bidding_start = tracker.bidding_start
     print(f"Bidding phase starts at block time: {datetime.fromtimestamp(bidding_start)}")
 
     # Step 3: Bidders place sealed bids
@@ -91,58 +74,54 @@ def run_auction_round(bidders, auction_contract, auctioneer, web3, auction_holde
 
     sealed_bids = [create_sealed_bid(bid_values[i], nonces[i]) for i in range(len(bid_values))]
 
-    bid_delay = int(os.getenv("NEXT_ROUND_DELAY"))  # Configurable delay, default to 5 seconds
-
-    for i, bidder in enumerate(bidders):
-        try:
-            tx = auction_contract.functions.bid(sealed_bids[i]).transact({
-                "from": bidder,
-                "value": bid_values[i],
-                "gas": 3000000
-            })
-            web3.eth.wait_for_transaction_receipt(tx)
-            print(f"Bid placed by {bidder}")
-        except Exception as e:
-            print(f"Failed to place bid for {bidder}: {e}")
-
-        # Delay between bids
-        time.sleep(bid_delay)
+    # All bids go out back to back and are confirmed together
+    sent = submit_all(tx_manager, [
+        (bidder, auction_contract.functions.bid(sealed_bids[i]), {"from": bidder, "value": bid_values[i]})
+        for i, bidder in enumerate(bidders)
+    ], "place bid")
+    for bidder, receipt in zip(sent, tx_manager.wait_blocking(list(sent.values()))):
+        print(f"Bid placed by {bidder}" if receipt.status == 1 else f"Failed to place bid for {bidder}: reverted")
 
     print("Bids submitted! Moving to reveal phase...")
 
     # Step 4: Wait for the reveal phase to open
-    reveal_start = auction_contract.functions.biddingEnd().call()
+    reveal_start = tracker.bidding_end
     print(f"Reveal phase starts at block time: {datetime.fromtimestamp(reveal_start)}")
-    wait_until(reveal_start)
-    time.sleep(4)  # Additional delay to ensure all bids are submitted
+    scheduler.wait_blocking("reveal")
     
-    for i, bidder in enumerate(bidders):
-        try:
-            tx = auction_contract.functions.reveal(bid_values[i], nonces[i]).transact({
-                'from': bidder,
-                "gas": 3000000
-            })
-            receipt = web3.eth.wait_for_transaction_receipt(tx)
-            print(f"Bid revealed by {bidder}!")
-        except Exception as e:
-            print(f"Failed to reveal bid for {bidder}: {e}")
+    sent = submit_all(tx_manager, [
+        (bidder, auction_contract.functions.reveal(bid_values[i], nonces[i]), {'from': bidder})
+        for i, bidder in enumerate(bidders)
+    ], "reveal bid")
+    for bidder, receipt in zip(sent, tx_manager.wait_blocking(list(sent.values()))):
+        print(f"Bid revealed by {bidder}!" if receipt.status == 1 else f"Failed to reveal bid for {bidder}: reverted")
     
-    # Calculate winner to display locally
-    winner = auction_contract.functions.highestBidder().call()
-    final_price_wei = auction_contract.functions.secondHighestBid().call()
-    final_price_eth = web3.from_wei(final_price_wei, "ether")
-    energy = auction_contract.functions.energyAmount().call()
     print("Bids revealed!")
-    reveal_end = auction_contract.functions.revealEnd().call()
+    reveal_end = tracker.reveal_end
     print(f"Reveal ends at block time: {datetime.fromtimestamp(reveal_end)}")
-    wait_until(reveal_end)
+    scheduler.wait_blocking("close")
+
+    # Calculate winner to display locally; every read below is pinned to one block
+    block = web3.eth.block_number
+    outcome = BatchReads(web3, block)
+    outcome.call("winner", auction_contract.functions.highestBidder())
+    outcome.call("price", auction_contract.functions.secondHighestBid())
+    outcome.call("energy", auction_contract.functions.energyAmount())
+    outcome.call("bidders", auction_contract.functions.getBidders())
+    outcome = outcome.execute_blocking()
+    winner, final_price_wei, energy = outcome["winner"], outcome["price"], outcome["energy"]
+    final_price_eth = web3.from_wei(final_price_wei, "ether")
 
-    # Fetch and display all revealed bids
+    # Fetch and display all revealed bids in one batch
     print("Fetching all revealed bids...")
-    contract_bidders = auction_contract.functions.getBidders().call()
+    contract_bidders = outcome["bidders"]
+    bids = BatchReads(web3, block)
+    for contract_bidder in contract_bidders:
+        bids.call(contract_bidder, auction_contract.functions.bids(contract_bidder))
+    bids = bids.execute_blocking()
     for contract_bidder in contract_bidders:
         # Access the bid information for each bidder
-        bid_info = auction_contract.functions.bids(contract_bidder).call()
+        bid_info = bids[contract_bidder]
         bid_amount_wei = bid_info[1]  # Assuming the deposit is the second element in the returned tuple
         bid_amount_eth = web3.from_wei(bid_amount_wei, 'ether')
         print(f"Bidder: {contract_bidder}, Bid: {bid_amount_eth} ETH")
@@ -150,20 +129,17 @@ def run_auction_round(bidders, auction_contract, auctioneer, web3, auction_holde
     # Step 6: Close the auction
     print("Close auction...")
     try:
-        
-        time.sleep(1)  # Additional delay to ensure all bids are submitted
-        tx = auction_contract.functions.closeAuction().transact({
-            "from": auctioneer,
-            "gas": 3000000
-        })
-        web3.eth.wait_for_transaction_receipt(tx)
+        tx = tx_manager.submit_blocking(auction_contract.functions.closeAuction(), {
+            "from": auctioneer
+        }, cache_gas=False) # Refunds every bidder, so the cost varies
+        tracker.apply_receipt(tx_manager.wait_blocking([tx])[0])
         
         print(f"Auction Winner: {winner} \n Energy: {energy} kWh \n Price: {final_price_eth} ETH")
     except Exception as e:
         print(f"Failed to close auction: {e}")
 
 
-def reset_auction(auctioneer, auction_contract, web3):
+def reset_auction(auctioneer, auction_contract, web3, tracker, tx_manager):
     print("Resetting the auction for the next round...")
 
     # Get the current time (in seconds) to print when the new auction will end
@@ -175,11 +151,10 @@ def reset_auction(auctioneer, auction_contract, web3):
 
     try:
         # Call the resetAuction function with the bidding and reveal time
-        tx_reset = auction_contract.functions.resetAuction(bidding_time, reveal_time).transact({
-            "from": auctioneer,  # Auctioneer resets
-            "gas": 3000000
-        })
-        web3.eth.wait_for_transaction_receipt(tx_reset)
+        tx_reset = tx_manager.submit_blocking(auction_contract.functions.resetAuction(bidding_time, reveal_time), {
+            "from": auctioneer  # Auctioneer resets
+        }, cache_gas=False)
+        tracker.apply_receipt(tx_manager.wait_blocking([tx_reset])[0])
         print("Auction reset successfully!")
 
         # Get the new auction times after resetting
@@ -200,32 +175,22 @@ def reset_auction(auctioneer, auction_contract, web3):
 
 # Main loop for running and resetting auctions on schedule
 def main():
-    # Connect to local blockchain (Ganache)
-    web3 = Web3(Web3.HTTPProvider("http://127.0.0.1:8545"))
+    # Connect to local blockchain (Ganache) over the shared client's pooled session
+    client = get_client()
+    web3 = client.web3()
     assert web3.is_connected(), "Failed to connect to the blockchain"
-
-    contract_address = os.getenv("CONTRACT_ADDRESS")
-    assert contract_address, "Contract address not found in .env file."
-
-    # Ensure the contract is deployed
-    code = web3.eth.get_code(contract_address)
-    assert code != b'0x', "Contract address is invalid or the contract is not deployed."
-
-    # Load the contract ABI dynamically
-    contract_path = os.path.join(project_dir, "5014-Project", "blockchain", "build", "contracts", "EnergyVickreyAuction.json")
-
-    with open(contract_path, "r") as abi_file:
-        contract_data = json.load(abi_file)
-
-    # Validate ABI structure
-    if 'abi' not in contract_data or not isinstance(contract_data['abi'], list):
-        raise ValueError("ABI is missing or invalid in the contract JSON file.")
-
-    contract_abi = contract_data['abi']
     print(f"Ganache connected: {web3.is_connected()}")
 
-    # Initialize the contract
-    auction_contract = web3.eth.contract(address=contract_address, abi=contract_abi)
+    # Address, ABI and deployment check come from the client (raises ContractError)
+    auction_contract = client.contract()
+
+    # Auction phase from the contract's event logs instead of polling biddingStart()
+    tracker = AuctionTracker(web3, auction_contract, abi=client.abi)
+    tracker.refresh_blocking()
+    # Local nonces and cached gas estimates, so a round's bids need not wait for each other
+    tx_manager = TransactionManager(web3)
+    # Bids, reveals and the close go out right as their phase opens in block time
+    scheduler = PhaseScheduler(tracker)
 
     # Define bidder accounts (from Ganache)
     accounts = web3.eth.accounts
@@ -244,13 +209,13 @@ def main():
             x += 0.1
 
             # Run auction round
-            run_auction_round(bidders, auction_contract, auctioneer, web3, auction_holder, energy_amount)
+            run_auction_round(bidders, auction_contract, auctioneer, web3, tracker, tx_manager, scheduler, auction_holder, energy_amount)
             
             # Flip the status of auction holder and await the next auction.
             auction_holder = not auction_holder
 
             # Call the reset auction function
-            reset_auction(auctioneer, auction_contract, web3)
+            reset_auction(auctioneer, auction_contract, web3, tracker, tx_manager)
 
             # Wait for the next auction to start
             print("Waiting for the next auction round...")
@@ -8,6 +8,8 @@ import datetime as dt
 DB_NAME = "energy_data.db"
 REFRESH_INTERVAL_SECONDS = 10
 DEFAULT_HISTORY_MINUTES = 60
+GRID_AGGREGATE_RESOLUTIONS = ["5m", "15m", "1h", "1d"] # Written by the Grid agent's resampler
+GRID_AGGREGATE_BUCKETS = 200
 
 # --- NEW: GUIAgent Web Endpoint ---
 GUI_AGENT_URL = f"http://localhost:{9099}" # Match port in GUIAgent
@@ -55,6 +57,21 @@ def fetch_recent_data(_conn, table_name, minutes_back, parse_dates_col=None, ind
         st.error(f"An unexpected error occurred fetching {table_name}: {e}")
         return pd.DataFrame()
 
+def fetch_grid_aggregates(_conn, resolution, limit=GRID_AGGREGATE_BUCKETS):
+    """Latest closed buckets of one resolution (bucket time, not wall time: replayed data is from the past)."""
+    if _conn is None: return pd.DataFrame()
+    try:
+        query = """SELECT * FROM (
+                       SELECT * FROM grid_aggregates WHERE resolution = ? ORDER BY timestamp DESC LIMIT ?
+                   ) ORDER BY timestamp ASC"""
+        df = pd.read_sql_query(query, _conn, params=(resolution, limit))
+        if not df.empty:
+            df['datetime'] = pd.to_datetime(df['timestamp'], unit='s').dt.tz_localize(None)
+        return df
+    except (pd.errors.DatabaseError, sqlite3.OperationalError) as e:
+        st.warning(f"Could not fetch grid aggregates. The Grid agent may not have written any yet. Error: {e}")
+        return pd.DataFrame()
+
 # --- Streamlit UI ---
 st.set_page_config(layout="wide", page_title="Smart Home Energy Dashboard")
 st.title("⚡ Smart Home Energy & Blockchain Dashboard")
@@ -230,6 +247,23 @@ if conn:
 
     st.markdown("---")
 
+    # --- Grid Aggregates ---
+    st.header("📐 Grid Aggregates")
+    agg_col1, agg_col2 = st.columns([1, 3])
+    with agg_col1:
+        resolution = st.selectbox("Resolution", GRID_AGGREGATE_RESOLUTIONS, index=2, key="grid_aggregate_resolution")
+    df_aggregates = fetch_grid_aggregates(conn, resolution)
+    if not df_aggregates.empty:
+        with agg_col1:
+            series = st.selectbox("Series", sorted(df_aggregates['series'].unique()), key="grid_aggregate_series")
+        with agg_col2:
+            series_df = df_aggregates[df_aggregates['series'] == series].set_index('datetime')[['mean', 'min', 'max']]
+            st.line_chart(series_df, use_container_width=True)
+    else:
+        st.info("No grid aggregates logged yet.")
+
+    st.markdown("---")
+
     # --- Blockchain Activity --- (Keep this section as is)
     st.header("🔗 Blockchain Auction Activity")
     if not df_blockchain.empty:
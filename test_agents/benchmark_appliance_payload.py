@@ -0,0 +1,49 @@
+"""Payload size and parse cost of row-style vs. columnar appliance data.
+
+Run from the project root:
+    python -m test_agents.benchmark_appliance_payload
+"""
+import json
+import time
+import numpy as np
+from communication.appliance_payload import APPLIANCE_NAMES, decode_appliances
+
+HOUSE_COUNTS = [1, 100, 1000]
+REPEATS = 20
+
+def row_payload(durations, powers):
+    # The previous format: one dict per appliance per house
+    return [[{"item": name, "duration": int(durations[h, i]), "power_consumption": float(powers[h, i])}
+             for i, name in enumerate(APPLIANCE_NAMES)] for h in range(len(durations))]
+
+def columnar_payload(durations, powers):
+    return {"appliance_ids": list(range(len(APPLIANCE_NAMES))),
+            "appliance_duration": durations.tolist(), "appliance_power": powers.tolist()}
+
+def parse_rows(body):
+    houses = json.loads(body)
+    return [decode_appliances(rows) for rows in houses]
+
+def parse_columns(body):
+    data = json.loads(body)
+    return np.asarray(data["appliance_duration"]), np.asarray(data["appliance_power"])
+
+def timed(function, body):
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        function(body)
+    return (time.perf_counter() - start) / REPEATS * 1000
+
+def main():
+    rng = np.random.default_rng(0)
+    print(f"{'houses':>8}{'rows (kB)':>12}{'columns (kB)':>14}{'rows parse (ms)':>17}{'columns parse (ms)':>20}")
+    for houses in HOUSE_COUNTS:
+        durations = rng.integers(0, 201, (houses, len(APPLIANCE_NAMES)))
+        powers = rng.random((houses, len(APPLIANCE_NAMES)))
+        rows = json.dumps(row_payload(durations, powers))
+        columns = json.dumps(columnar_payload(durations, powers))
+        print(f"{houses:>8}{len(rows) / 1024:>12.1f}{len(columns) / 1024:>14.1f}"
+              f"{timed(parse_rows, rows):>17.3f}{timed(parse_columns, columns):>20.3f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+"""Per-tick cost of the vectorized HouseFleet.
+
+Run from the project root:
+    python -m test_agents.benchmark_house_fleet
+Uses models/energy_test_set.npz when present, otherwise a synthetic test set of the same layout.
+"""
+import os
+import time
+import numpy as np
+from simulation.house_fleet import HouseFleet
+from utils.test_sets import MODELS_DIR, load_test_set
+
+FLEET_SIZES = [1, 100, 1000, 10000]
+TICKS = 50
+
+def test_set():
+    if os.path.exists(os.path.join(MODELS_DIR, "energy_test_set.npz")):
+        data = load_test_set("energy_test_set")
+        return data["X_test"], data["y_test"]
+    rng = np.random.default_rng(0)
+    return rng.random((2000, 18)), rng.random((2000, 2)) * 3
+
+def main():
+    X_test, Y_test = test_set()
+    print(f"{'houses':>8}{'step (ms)':>12}{'message (ms)':>15}")
+    for size in FLEET_SIZES:
+        fleet = HouseFleet(X_test, Y_test, size, seed=1)
+        start = time.perf_counter()
+        for _ in range(TICKS):
+            batch = fleet.step()
+        step_ms = (time.perf_counter() - start) / TICKS * 1000
+
+        start = time.perf_counter()
+        for _ in range(TICKS):
+            fleet.to_message(batch)
+        message_ms = (time.perf_counter() - start) / TICKS * 1000
+        print(f"{size:>8}{step_ms:>12.3f}{message_ms:>15.3f}")
+
+if __name__ == "__main__":
+    main()
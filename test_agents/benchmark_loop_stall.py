@@ -0,0 +1,66 @@
+"""Event-loop stall caused by blocking vs. async web3 calls.
+
+Runs the same RPC workload (balance reads plus a value transfer awaited to its
+receipt) from a coroutine twice: once with the synchronous Web3(HTTPProvider)
+the TradingBehaviour used to call, once with AsyncWeb3 over a pooled aiohttp
+session. A LoopLagMonitor measures how long the event loop shared by the
+agents is held. Needs Ganache (or any node) on RPC_URL.
+
+Run from the project root:
+    python -m test_agents.benchmark_loop_stall
+"""
+import asyncio
+import os
+import time
+import aiohttp
+from web3 import Web3, AsyncWeb3, AsyncHTTPProvider
+from utils.loop_monitor import LoopLagMonitor
+
+RPC_URL = os.getenv("RPC_URL", "http://127.0.0.1:8545")
+ROUNDS = 10
+BALANCE_READS = 5
+
+async def blocking_workload(web3, accounts):
+    for _ in range(ROUNDS):
+        for _ in range(BALANCE_READS):
+            web3.eth.get_balance(accounts[0])
+        tx = web3.eth.send_transaction({"from": accounts[0], "to": accounts[1], "value": 1})
+        web3.eth.wait_for_transaction_receipt(tx)
+        await asyncio.sleep(0) # End of a behaviour cycle: the other agents get the loop back
+
+async def async_workload(web3, accounts):
+    for _ in range(ROUNDS):
+        await asyncio.gather(*(web3.eth.get_balance(accounts[0]) for _ in range(BALANCE_READS)))
+        tx = await web3.eth.send_transaction({"from": accounts[0], "to": accounts[1], "value": 1})
+        await web3.eth.wait_for_transaction_receipt(tx, poll_latency=0.5)
+
+async def measure(name, workload, *args):
+    monitor = LoopLagMonitor(interval=0.01)
+    monitor.start()
+    await asyncio.sleep(0.1) # Let the probe settle
+    monitor.reset()
+    start = time.perf_counter()
+    await workload(*args)
+    elapsed = time.perf_counter() - start
+    await asyncio.sleep(monitor.interval * 2) # The probe records a lag only once it wakes up
+    monitor.stop()
+    r = monitor.report()
+    print(f"{name:>10}{elapsed:>12.2f}{r['max_lag_ms']:>14.1f}{r['p99_lag_ms']:>14.1f}{r['stall_seconds']:>14.2f}")
+
+async def main():
+    sync_web3 = Web3(Web3.HTTPProvider(RPC_URL))
+    if not sync_web3.is_connected():
+        print(f"No node at {RPC_URL}; start Ganache first.")
+        return
+    accounts = sync_web3.eth.accounts
+
+    async_web3 = AsyncWeb3(AsyncHTTPProvider(RPC_URL))
+    await async_web3.provider.cache_async_session(aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=8)))
+
+    print(f"{'provider':>10}{'total (s)':>12}{'max lag (ms)':>14}{'p99 lag (ms)':>14}{'stalled (s)':>14}")
+    await measure("sync", blocking_workload, sync_web3, accounts)
+    await measure("async", async_workload, async_web3, accounts)
+    await async_web3.provider.disconnect()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,69 @@
+"""Resident memory of N simulated houses loading the test set privately vs. memory-mapped.
+
+Run from the project root:
+    python -m test_agents.benchmark_test_set_rss [test_set_name]
+Each configuration runs in a fresh interpreter so the numbers do not bleed into each other.
+"""
+import os
+import subprocess
+import sys
+
+HOUSE_COUNTS = [1, 10, 100]
+TICKS = 200 # Simulated ticks per house, each reads one 24-step window
+DEFAULT_TEST_SET = "energy_X_test_demand_set" # energy_test_set.npz is not checked in
+
+def read_rss_kb():
+    """VmRSS plus its anonymous (private) and file-backed (page cache) parts, in kB."""
+    fields = {}
+    with open("/proc/self/status") as status:
+        for line in status:
+            key, _, value = line.partition(":")
+            if key in ("VmRSS", "RssAnon", "RssFile"):
+                fields[key] = int(value.split()[0])
+    return fields
+
+def simulate(mode, houses, name):
+    import numpy as np
+    from utils.test_sets import load_test_set, MODELS_DIR
+
+    instances = []
+    for _ in range(houses):
+        if mode == "npz":
+            # What House/Grid did before: every instance inflates its own copy
+            with np.load(os.path.join(MODELS_DIR, f"{name}.npz")) as archive:
+                instances.append({key: archive[key] for key in archive.files})
+        else:
+            instances.append(load_test_set(name))
+
+    checksum = 0.0
+    for house, arrays in enumerate(instances):
+        X_test = arrays["X_test"]
+        for tick in range(TICKS):
+            idx = 24 + (house * 7 + tick) % (len(X_test) - 24)
+            checksum += float(X_test[idx - 24:idx].sum())
+    return read_rss_kb(), checksum
+
+def main():
+    name = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_TEST_SET
+    if len(sys.argv) > 3:
+        # Child process: python -m ... <name> <mode> <houses>
+        rss, _ = simulate(sys.argv[2], int(sys.argv[3]), name)
+        print(rss["VmRSS"], rss["RssAnon"], rss["RssFile"])
+        return
+
+    from utils.test_sets import convert_test_set
+    convert_test_set(name)  # Conversion is a one-off, keep it out of the measurement
+
+    print(f"Test set: {name}")
+    print(f"{'houses':>8}{'mode':>8}{'RSS (MB)':>12}{'private (MB)':>14}{'file (MB)':>12}")
+    for houses in HOUSE_COUNTS:
+        for mode in ("npz", "mmap"):
+            output = subprocess.check_output(
+                [sys.executable, "-m", "test_agents.benchmark_test_set_rss", name, mode, str(houses)],
+                text=True
+            )
+            vm_rss, rss_anon, rss_file = (int(value) / 1024 for value in output.split())
+            print(f"{houses:>8}{mode:>8}{vm_rss:>12.1f}{rss_anon:>14.1f}{rss_file:>12.1f}")
+
+if __name__ == "__main__":
+    main()
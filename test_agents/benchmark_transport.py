@@ -0,0 +1,81 @@
+"""Latency and throughput comparison of the in-process bus and XMPP transports.
+
+Run from the project root with the SPADE server up (`spade run`):
+    python -m test_agents.benchmark_transport
+"""
+import asyncio
+import json
+import statistics
+import time
+from spade.agent import Agent
+from spade.message import Message
+from communication.transport import TransportBehaviour, attach_transport
+
+NUM_ROUND_TRIPS = 500 # Sequential ping/pong pairs for latency
+NUM_BURST = 2000 # Messages fired back to back for throughput
+PAYLOAD = json.dumps({"current_demand": 1.2, "current_production": 0.8, "test_sample": [[[0.5]] * 18]})
+
+class EchoAgent(Agent):
+    class EchoBehaviour(TransportBehaviour):
+        async def run(self):
+            msg = await self.receive(timeout=10)
+            if msg:
+                await self.send(Message(to=str(msg.sender), body=msg.body))
+
+    async def setup(self):
+        self.add_behaviour(self.EchoBehaviour())
+
+class PingAgent(Agent):
+    class CollectBehaviour(TransportBehaviour):
+        async def run(self):
+            msg = await self.receive(timeout=10)
+            if msg:
+                await self.agent.replies.put(time.perf_counter())
+
+    async def setup(self):
+        self.replies = asyncio.Queue()
+        self.collector = self.CollectBehaviour()
+        self.add_behaviour(self.collector)
+
+async def measure(mode):
+    echo = EchoAgent("echo@localhost", "password")
+    ping = PingAgent("ping@localhost", "password")
+    transport = attach_transport([echo, ping], mode=mode)
+    await echo.start()
+    await ping.start()
+
+    # --- Latency: one message in flight at a time ---
+    latencies = []
+    for _ in range(NUM_ROUND_TRIPS):
+        sent = time.perf_counter()
+        await ping.collector.send(Message(to="echo@localhost", body=PAYLOAD))
+        received = await ping.replies.get()
+        latencies.append((received - sent) * 1000)
+
+    # --- Throughput: fire a burst and wait for every echo ---
+    start = time.perf_counter()
+    for _ in range(NUM_BURST):
+        await ping.collector.send(Message(to="echo@localhost", body=PAYLOAD))
+    for _ in range(NUM_BURST):
+        await ping.replies.get()
+    elapsed = time.perf_counter() - start
+
+    await ping.stop()
+    await echo.stop()
+
+    latencies.sort()
+    return {
+        "transport": transport.name,
+        "p50_ms": statistics.median(latencies),
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1],
+        "round_trips_per_s": NUM_BURST / elapsed,
+    }
+
+async def main():
+    results = [await measure("xmpp"), await measure("inprocess")]
+    print(f"{'transport':<12}{'p50 (ms)':>12}{'p99 (ms)':>12}{'round trips/s':>16}")
+    for result in results:
+        print(f"{result['transport']:<12}{result['p50_ms']:>12.3f}{result['p99_ms']:>12.3f}{result['round_trips_per_s']:>16.0f}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
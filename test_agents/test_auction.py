@@ -1,11 +1,13 @@
 from web3 import Web3
-import json
 import time
 import hashlib # Not used in current code, but keep if needed elsewhere
 import os
+import sys
 import subprocess # Import subprocess
 from datetime import datetime
-from dotenv import load_dotenv
+# Runs as a standalone script (python test_agents/test_auction.py): the project root holds trading/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from trading.client import ARTIFACT_PATH, ENV_PATH, ContractError, get_client, load_env
 
 # --- Functions copied and adapted from main.py ---
 
@@ -394,7 +396,8 @@ if __name__ == "__main__":
 
         # 3. Initialize Web3 and Contract (AFTER Ganache start and deployment initiation)
         print("🟡 Initializing Web3 connection...")
-        web3 = Web3(Web3.HTTPProvider("http://127.0.0.1:8545"))
+        client = get_client()
+        web3 = client.web3()
         if not web3.is_connected():
              print("❌ Failed to connect to Ganache after starting it. Check Ganache window.")
              raise ConnectionError("Failed to connect to Web3 provider.")
@@ -407,58 +410,17 @@ if __name__ == "__main__":
         print(f"   Found {len(accounts)} accounts.")
 
         print("🟡 Loading contract...")
-        # Load environment variables from the .env file (needs to be updated by deployment)
-        load_dotenv() # Load default .env first
-        project_dir = os.path.dirname(os.path.abspath(__file__)) # Get dir of this script
-        # Assuming blockchain folder is relative to this script's location
-        blockchain_parent_dir = os.path.dirname(project_dir) # Go up one level from script dir if needed
-        env_path = os.path.join(blockchain_parent_dir, "blockchain", ".env")
-        print(f"   Looking for .env at: {env_path}")
-        if load_dotenv(dotenv_path=env_path, override=True): # Load specific .env, override others
-             print("   Loaded .env file from blockchain directory.")
-        else:
-             print("   Warning: blockchain/.env file not found or failed to load.")
-             # Attempt to load CONTRACT_ADDRESS anyway in case it's in default .env
-        contract_address = os.getenv("CONTRACT_ADDRESS")
-        if not contract_address:
-            print("❌ CONTRACT_ADDRESS not found in environment variables after deployment.")
-            print("   Ensure the Truffle migration script correctly writes to blockchain/.env")
-            raise ValueError("Contract address missing.")
-        print(f"   Using Contract Address: {contract_address}")
-
-        # Ensure the contract bytecode exists at the address
-        try:
-             code = web3.eth.get_code(contract_address)
-             if code == b'0x' or code == b'':
-                  print(f"❌ No contract bytecode found at address {contract_address} on network.")
-                  print(f"   Deployment likely failed or address in .env is incorrect.")
-                  raise ValueError("Contract not deployed at address.")
-             print("   Contract bytecode found at address.")
-        except Exception as e:
-             print(f"❌ Error checking contract code: {e}")
-             raise
-
-        # Load the contract ABI
-        contract_build_path = os.path.join(blockchain_parent_dir, "blockchain", "build", "contracts", "EnergyVickreyAuction.json")
-        print(f"   Loading ABI from: {contract_build_path}")
+        # The deployment has just rewritten blockchain/.env, so its values override the environment
+        print(f"   Loading {ENV_PATH} and the ABI from {ARTIFACT_PATH}")
+        load_env(override=True)
         try:
-            with open(contract_build_path, "r") as abi_file:
-                contract_data = json.load(abi_file)
-            if 'abi' not in contract_data or not isinstance(contract_data['abi'], list):
-                raise ValueError("ABI is missing or invalid in the contract JSON file.")
-            contract_abi = contract_data['abi']
-            print("   Contract ABI loaded.")
-        except FileNotFoundError:
-             print(f"❌ ABI file not found at {contract_build_path}.")
-             print(f"   Ensure contract compiled successfully.")
-             raise
-        except Exception as e:
-             print(f"❌ Error loading ABI: {e}")
+             auction_contract = client.contract()
+        except ContractError as e:
+             print(f"❌ {e}")
+             print("   Ensure the Truffle migration compiled the contract and wrote CONTRACT_ADDRESS to blockchain/.env")
              raise
-
-
-        # Initialize the contract object
-        auction_contract = web3.eth.contract(address=contract_address, abi=contract_abi)
+        contract_address = auction_contract.address
+        print(f"   Using Contract Address: {contract_address}")
         print("✅ Contract object initialized.")
 
 
@@ -0,0 +1,59 @@
+"""Tests for the log-driven AuctionTracker and the chain-time PhaseScheduler.
+
+Run from the project root:
+    python -m pytest test_agents/test_auction_tracker.py
+"""
+from simulation import clock
+from trading.auction_tracker import AuctionTracker
+from trading.phase import PHASE_BIDDING, PHASE_IDLE, PhaseFeed
+from trading.phase_scheduler import PhaseScheduler
+
+def log(event, block, index=0, **args):
+    return {"event": event, "args": args, "blockNumber": block, "logIndex": index}
+
+def tracker_with_round(bidding_end, reveal_end, block=2):
+    tracker = AuctionTracker(None, object(), PhaseFeed())
+    tracker.apply_logs([
+        log("AuctionReset", 1, newBiddingDuration=20, newRevealDuration=10),
+        log("AuctionStarted", block, seller="0xseller", energyAmount=5, biddingEnd=bidding_end, revealEnd=reveal_end),
+    ])
+    return tracker
+
+def test_states_follow_round_logs():
+    tracker = tracker_with_round(1020, 1030)
+    assert tracker.bidding_start == 1000
+    assert [tracker.state(now) for now in (999, 1000, 1020, 1025, 1031)] == [0, 1, 1, 2, 3]
+    tracker.apply_logs([log("BidPlaced", 3, bidder="0xa", deposit=7)])
+    assert tracker.deposits == {"0xa": 7}
+    tracker.apply_logs([log("AuctionClosed", 4, winner="0xa", winningPrice=5, energyAmount=5)])
+    assert tracker.state(1025) == -1
+    assert tracker.last_result == ("0xa", 5, 5)
+
+def test_stale_round_log_is_ignored():
+    tracker = tracker_with_round(1020, 1030, block=5)
+    tracker.apply_logs([log("AuctionClosed", 4, winner="0xa", winningPrice=5, energyAmount=5)])
+    assert tracker.bidding_start == 1000 and not tracker.ended
+
+def test_tracker_judges_phases_on_chain_time():
+    now = clock.time()
+    # A round that, on the chain's clock, started 5 s ago; the chain runs 100 s ahead of this machine
+    tracker = tracker_with_round(now + 100 + 15, now + 100 + 25)
+    assert tracker.state() == 0
+    scheduler = PhaseScheduler(tracker)
+    scheduler.observe(now + 100, now)
+    assert tracker.state() == 1
+    assert scheduler.state() == tracker.state()
+    assert tracker.publish() == 1
+    assert tracker.feed.phase == PHASE_BIDDING
+    assert 14 < tracker.feed.time_to_boundary() <= 15
+    assert 14 < tracker.time_to_boundary() <= 15
+
+def test_scheduler_windows():
+    tracker = tracker_with_round(1020, 1030)
+    scheduler = PhaseScheduler(tracker, bid_margin=0, reveal_margin=0.5, close_margin=0.5, deadline_margin=1)
+    assert scheduler.window("bid") == (1000, 1019)
+    assert scheduler.window("reveal") == (1020.5, 1029)
+    assert scheduler.window("close") == (1030.5, None)
+    tracker.apply_logs([log("AuctionClosed", 3, winner="0xa", winningPrice=5, energyAmount=5)])
+    assert scheduler.window("bid") is None
+    assert tracker.feed.phase == PHASE_IDLE
@@ -0,0 +1,77 @@
+"""Tests for the strategy backtester on a small fixture database.
+
+Run from the project root:
+    python -m pytest test_agents/test_backtester.py
+"""
+import csv
+import sqlite3
+import sys
+import numpy as np
+import pytest
+from simulation import backtester
+from simulation.backtester import backtest, load_rounds, strategy_grid
+
+ACCOUNT = "0xhouse"
+
+# (timestamp, event, energy kWh, price ETH, status): three closed rounds and a bid of an unfinished one
+LOG = [
+    (5, "Auction Start", 5, None, "Success"),
+    (10, "Bid", None, 0.6, "Success"),
+    (30, "Auction Buy", 5, 0.4, "Success"), # Won, paid the second price
+    (40, "Bid", None, 0.5, "Success"),
+    (45, "Bid", None, 0.9, "Failed"),
+    (60, "Auction Sell", 5, 0.7, "Success"), # Another bidder won at 0.7
+    (90, "Auction End (No Winner)", 5, 0, "Success"),
+    (100, "Bid", None, 0.8, "Success"),
+]
+PREDICTIONS = [(0, 1.0, 4.0), (35, 5.0, 1.0)] # (timestamp, demand, production)
+
+@pytest.fixture
+def db(tmp_path):
+    path = str(tmp_path / "energy_data.db")
+    conn = sqlite3.connect(path)
+    conn.execute("""CREATE TABLE blockchain_log (id INTEGER PRIMARY KEY AUTOINCREMENT, timestamp REAL, agent_account TEXT,
+                    event_type TEXT, energy_kwh REAL, price_eth REAL, balance_eth REAL, counterparty_address TEXT,
+                    status TEXT, auction_id INTEGER)""")
+    conn.execute("CREATE TABLE predictions (timestamp REAL, predicted_demand REAL, predicted_production REAL)")
+    conn.executemany("INSERT INTO blockchain_log (timestamp, agent_account, event_type, energy_kwh, price_eth, status) VALUES (?, ?, ?, ?, ?, ?)",
+                     [(t, ACCOUNT, event, energy, price, status) for t, event, energy, price, status in LOG])
+    conn.execute("INSERT INTO blockchain_log (timestamp, agent_account, event_type, price_eth, status) VALUES (50, '0xother', 'Bid', 5.0, 'Success')")
+    conn.executemany("INSERT INTO predictions VALUES (?, ?, ?)", PREDICTIONS)
+    conn.commit()
+    conn.close()
+    return path
+
+def test_load_rounds(db):
+    rounds = load_rounds(db, ACCOUNT)
+    assert rounds.start.tolist() == [5, 30, 60]
+    assert rounds.end.tolist() == [30, 60, 90]
+    assert np.allclose(rounds.bid[:2], [0.6, 0.5]) and np.isnan(rounds.bid[2])
+    assert rounds.clearing.tolist() == [0.4, 0.7, 0.0]
+    assert rounds.rival.tolist() == [0.4, 0.7, 0.0]
+    assert rounds.surplus.tolist() == [3.0, 3.0, -4.0]
+
+def test_logged_strategy_reproduces_the_log(db):
+    result = {row["strategy"]: row for row in backtest(load_rounds(db, ACCOUNT), strategy_grid())}["neutral"]
+    assert (result["rounds"], result["rounds_bid"], result["wins"]) == (3, 2, 1)
+    assert result["cost_eth"] == 0.4 and result["energy_bought_kwh"] == 5
+    # Round one was bought, so half the 3 kWh surplus is sold only in round two, at 0.14 ETH/kWh
+    assert result["rounds_sold"] == 1 and result["energy_sold_kwh"] == 1.5
+    assert result["revenue_eth"] == pytest.approx(0.21)
+    assert result["net_eth"] == pytest.approx(-0.19)
+
+def test_higher_multiplier_wins_the_lost_round(db):
+    high, = backtest(load_rounds(db, ACCOUNT), strategy_grid([2.0], [0.5]))
+    # Round two's bid rescaled: 0.1 + (0.5 - 0.1) * 2.0 = 0.9 beats the 0.7 winner
+    assert high["wins"] == 2 and high["cost_eth"] == pytest.approx(1.1)
+    assert high["rounds_sold"] == 0 # Bought in both rounds with a winner: nothing left to sell
+
+def test_main_writes_every_grid_point(db, tmp_path, monkeypatch):
+    output = str(tmp_path / "results.csv")
+    monkeypatch.setattr(sys, "argv", ["backtester", "--db", db, "--account", ACCOUNT, "--output", output,
+                                      "--multiplier", "0.9", "1.0", "--sell-fraction", "0.25", "0.5", "0.75"])
+    backtester.main()
+    with open(output, newline="") as results_file:
+        rows = list(csv.DictReader(results_file))
+    assert len(rows) == 6
+    assert rows[0]["strategy"] == "x0.9/sell0.25"
@@ -0,0 +1,53 @@
+"""Tests for the streaming multi-resolution resampler.
+
+Run from the project root:
+    python -m pytest test_agents/test_resampler.py
+"""
+from datetime import datetime, timedelta, timezone
+import numpy as np
+from utils.resampler import MultiResolutionResampler
+
+EST = timezone(timedelta(hours=-5))
+
+def est(*args):
+    return datetime(*args, tzinfo=EST).timestamp()
+
+def test_daily_bucket_rolls_over_at_local_midnight():
+    resampler = MultiResolutionResampler(["demand"], utc_offset=-5 * 3600)
+    start = est(2025, 3, 8, 0, 0)
+    rolled = [resampler.update(start + i * 300, [1.0]) for i in range(2 * 288)]
+    # 19:00 EST is midnight UTC: no daily rollover there
+    assert "1d" not in rolled[19 * 12]
+    assert "1d" in rolled[288]
+    day = resampler.latest("1d", offset=1)
+    assert day["start"] == start
+    assert day["count"][0] == 288
+
+def test_utc_alignment_without_offset():
+    resampler = MultiResolutionResampler(["demand"], utc_offset=0)
+    resampler.update(est(2025, 3, 8, 18, 55), [1.0])
+    assert resampler.update(est(2025, 3, 8, 19, 0), [1.0]) == ("5m", "15m", "1h", "1d")
+
+def test_nan_leaves_series_bucket_untouched():
+    resampler = MultiResolutionResampler(["demand", "price"], utc_offset=0)
+    resampler.update(0, [2.0, np.nan])
+    resampler.update(60, [4.0, np.nan])
+    stats = resampler.latest("5m")
+    assert stats["count"].tolist() == [2, 0]
+    assert stats["mean"][0] == 3.0 and np.isnan(stats["mean"][1])
+    assert stats["min"][0] == 2.0 and stats["max"][0] == 4.0
+    assert resampler.summary()["5m"]["price"] == {"mean": None, "min": None, "max": None, "sum": 0.0, "count": 0}
+
+def test_out_of_order_sample_is_ignored():
+    resampler = MultiResolutionResampler(["demand"], utc_offset=0)
+    resampler.update(600, [1.0])
+    assert resampler.update(0, [5.0]) == ()
+    assert resampler.latest("5m")["sum"][0] == 1.0
+
+def test_closed_since_skips_open_bucket():
+    resampler = MultiResolutionResampler(["demand"], utc_offset=0)
+    for i in range(3):
+        resampler.update(i * 300, [float(i)])
+    rows = resampler.closed_since("5m", -1)
+    assert [row[0] for row in rows] == [0, 300]
+    assert rows[1][1:] == ("demand", 1.0, 1.0, 1.0, 1.0, 1)
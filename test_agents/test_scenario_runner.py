@@ -0,0 +1,40 @@
+"""Tests for the headless scenario runner, on a synthetic test set.
+
+Run from the project root:
+    python -m pytest test_agents/test_scenario_runner.py
+"""
+import numpy as np
+import pytest
+from simulation import scenario_runner
+from simulation.scenario_runner import Scenario, run_scenario
+
+@pytest.fixture(autouse=True)
+def test_set(monkeypatch):
+    # energy_test_set.npz is not checked in: houses alternate between a surplus and a deficit hour
+    rng = np.random.default_rng(0)
+    production = np.tile([4.0, 0.5], 24) + rng.random(48)
+    demand = np.tile([1.0, 3.0], 24) + rng.random(48)
+    arrays = {"X_test": rng.random((48, 24)), "y_test": np.column_stack([production, demand])}
+    monkeypatch.setattr(scenario_runner, "load_test_set", lambda name: arrays)
+
+def scenario(**overrides):
+    values = dict(strategy="neutral", fleet_size=6, tariff="tou", bidding_time=20, reveal_time=10, hours=24, seed=1)
+    values.update(overrides)
+    return Scenario(**values)
+
+def test_rounds_settle():
+    result = run_scenario(scenario())
+    assert result["auctions"] > 0 and result["reverted_tx"] == 0
+    assert 0 < result["auctions_sold"] <= result["auctions"]
+    assert 0 < result["energy_sold_kwh"] <= result["energy_offered_kwh"]
+    assert result["mean_clearing_price_eth"] > 0
+    assert result["gas_spent_eth"] > 0
+
+def test_same_seed_same_result():
+    first, second = run_scenario(scenario()), run_scenario(scenario())
+    first.pop("wall_seconds"), second.pop("wall_seconds")
+    assert first == second
+
+def test_single_house_has_no_counterparty():
+    result = run_scenario(scenario(fleet_size=1))
+    assert result["auctions_sold"] == 0 and result["energy_sold_kwh"] == 0
@@ -0,0 +1,58 @@
+"""Tests for the columnar IESO series store.
+
+Run from the project root:
+    python -m pytest test_agents/test_series_store.py
+"""
+import numpy as np
+from simulation.series_store import SeriesStore
+
+def rows(start, stop, step=300, value=None):
+    timestamps = np.arange(start, stop, step)
+    values = timestamps / 100.0 if value is None else np.full(len(timestamps), value)
+    return timestamps, values
+
+def test_append_after_tail(tmp_path):
+    store = SeriesStore(str(tmp_path))
+    assert store.append("demand", *rows(0, 3000), 300) == (10, 0)
+    assert store.append("demand", *rows(3000, 6000), 300) == (10, 0)
+    timestamps, values = store.read("demand")
+    assert timestamps.tolist() == list(range(0, 6000, 300))
+    assert values[-1] == 57.0
+
+def test_overlap_revises_but_keeps_known_values(tmp_path):
+    store = SeriesStore(str(tmp_path))
+    store.append("demand", *rows(0, 3000), 300)
+    values = np.full(4, 1.0)
+    values[1] = np.nan
+    assert store.append("demand", np.arange(2400, 3600, 300), values, 300) == (2, 1)
+    assert store.read("demand")[1].tolist()[-4:] == [1.0, 27.0, 1.0, 1.0]
+    assert store.length("demand") == 12
+
+def test_older_export_arriving_late_is_merged(tmp_path):
+    store = SeriesStore(str(tmp_path))
+    store.append("demand", *rows(3000, 6000), 300)
+    assert store.append("demand", *rows(0, 3000), 300) == (10, 0)
+    timestamps, values = store.read("demand")
+    assert timestamps.tolist() == list(range(0, 6000, 300))
+    assert values.tolist() == (np.arange(0, 6000, 300) / 100.0).tolist()
+
+def test_export_filling_a_gap(tmp_path):
+    store = SeriesStore(str(tmp_path))
+    store.append("demand", *rows(0, 1500), 300)
+    store.append("demand", *rows(3000, 4500), 300)
+    # Covers the gap, revises one stored row and extends the tail
+    timestamps, values = rows(1200, 4800, value=7.0)
+    assert store.append("demand", timestamps, values, 300) == (6, 6)
+    stored_ts, stored_values = store.read("demand")
+    assert stored_ts.tolist() == list(range(0, 4800, 300))
+    assert np.all(np.diff(stored_ts) > 0)
+    assert stored_values[:4].tolist() == [0.0, 3.0, 6.0, 9.0]
+    assert np.all(stored_values[4:] == 7.0)
+
+def test_dense_grid_after_backfill(tmp_path):
+    store = SeriesStore(str(tmp_path))
+    store.append("demand", *rows(1800, 3000), 300)
+    store.append("demand", np.array([0, 600]), np.array([1.0, 2.0]), 300)
+    dense = store.dense("demand", 0, 10)
+    assert dense[0] == 1.0 and np.isnan(dense[1]) and dense[2] == 2.0
+    assert dense[6:].tolist() == [18.0, 21.0, 24.0, 27.0]
@@ -0,0 +1,36 @@
+"""Tests for the in-process message transport.
+
+Run from the project root:
+    python -m pytest test_agents/test_transport.py
+"""
+import asyncio
+from types import SimpleNamespace
+from spade.message import Message
+from communication.transport import InProcessTransport, MessageBus
+
+class FakeAgent:
+    """Just what the bus and the transport use of a SPADE agent."""
+    def __init__(self, jid):
+        self.jid = jid
+        self.inbox = []
+        self.traces = SimpleNamespace(append=lambda msg, category=None: None)
+
+    def dispatch(self, msg):
+        self.inbox.append(msg)
+
+def send(msg, sender="house@localhost/agent"):
+    bus = MessageBus()
+    receiver = FakeAgent("facilitator@localhost")
+    bus.register(receiver)
+    transport = InProcessTransport(bus)
+    asyncio.run(transport.send(SimpleNamespace(agent=FakeAgent(sender)), msg))
+    return receiver.inbox, transport
+
+def test_receiver_sees_the_sending_agent():
+    inbox, transport = send(Message(to="facilitator@localhost", body="{}"))
+    assert len(inbox) == 1 and transport.sent["local"] == 1
+    assert str(inbox[0].sender).split("@")[0] == "house" # How the FacilitatingAgent routes bundles
+
+def test_explicit_sender_is_kept():
+    inbox, _ = send(Message(to="facilitator@localhost", sender="grid@localhost", body="{}"))
+    assert str(inbox[0].sender) == "grid@localhost"
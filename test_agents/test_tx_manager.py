@@ -0,0 +1,102 @@
+"""Tests for the TransactionManager's local nonces and gas cache, on the simulated chain.
+
+Run from the project root:
+    python -m pytest test_agents/test_tx_manager.py
+"""
+import asyncio
+import math
+from types import SimpleNamespace
+from simulation.auction import GAS_USED, AsyncSimulatedAuction, AsyncSimulatedChain, SimulatedChain, SimulatedVickreyAuction
+from trading.bid_prep import sealed_bid
+from trading.tx_manager import FALLBACK_GAS, GAS_MARGIN, TransactionManager
+
+class Recorded:
+    """Wraps a simulated contract call, recording what the manager sends and estimates."""
+    def __init__(self, call, log, revert_estimate=False):
+        self.call = call
+        self.log = log
+        self.revert_estimate = revert_estimate
+        self.fn_name = call.fn_name
+        self.address = call.address
+
+    async def estimate_gas(self, transaction=None):
+        self.log.append(("estimate", self.fn_name))
+        if self.revert_estimate:
+            raise ValueError("execution reverted")
+        return await self.call.estimate_gas(transaction)
+
+    async def transact(self, transaction):
+        self.log.append(("send", self.fn_name, transaction["nonce"], transaction["gas"]))
+        return await self.call.transact(transaction)
+
+def setup():
+    chain = SimulatedChain(num_accounts=2, sim_clock=SimpleNamespace(time=lambda: 1000))
+    auction = AsyncSimulatedAuction(SimulatedVickreyAuction(chain))
+    manager = TransactionManager(AsyncSimulatedChain(chain), poll_interval=0.01)
+    log = []
+    return chain, auction, manager, log, lambda call, **kwargs: Recorded(call, log, **kwargs)
+
+def test_pipelined_sends_use_consecutive_nonces():
+    chain, auction, manager, log, record = setup()
+    account = chain.accounts[0]
+    async def run():
+        start = await manager.submit(record(auction.functions.startAuction(5)), {"from": account})
+        bid = await manager.submit(record(auction.functions.bid(sealed_bid(10, "s"))), {"from": account, "value": 10})
+        receipts = await asyncio.gather(start, bid)
+        await manager.stop()
+        return receipts
+    receipts = asyncio.run(run())
+    assert [entry[2] for entry in log if entry[0] == "send"] == [0, 1]
+    assert [receipt.status for receipt in receipts] == [1, 1]
+    assert manager.nonces[account] == 2
+
+def test_failed_send_reuses_its_nonce():
+    chain, auction, manager, log, record = setup()
+    account = chain.accounts[0]
+    async def run():
+        try:
+            # No auction is running: the bid reverts and its nonce is never used on chain
+            await manager.submit(record(auction.functions.bid(sealed_bid(10, "s"))), {"from": account, "value": 10, "gas": 1})
+        except Exception:
+            pass
+        assert account not in manager.nonces
+        receipt = await manager.transact(record(auction.functions.startAuction(5)), {"from": account})
+        await manager.stop()
+        return receipt
+    receipt = asyncio.run(run())
+    assert [entry[2] for entry in log if entry[0] == "send"] == [0, 0]
+    assert receipt.status == 1 and chain.nonces[account] == 1
+
+def test_gas_is_estimated_once_and_grows_with_use():
+    chain, auction, manager, log, record = setup()
+    account = chain.accounts[0]
+    async def run():
+        for energy in (5, 6):
+            await manager.fill(record(auction.functions.startAuction(energy)), {"from": account})
+        await manager.fill(record(auction.functions.startAuction(7)), {"from": account}, cache_gas=False)
+        await manager.transact(record(auction.functions.startAuction(8)), {"from": account})
+        await manager.stop()
+    asyncio.run(run())
+    assert log.count(("estimate", "startAuction")) == 2 # The cached fill does not estimate, cache_gas=False does
+    assert manager.cached_gas(auction.functions.startAuction(9)) == math.ceil(GAS_USED * GAS_MARGIN)
+
+def test_failed_estimate_is_not_cached():
+    chain, auction, manager, log, record = setup()
+    async def run():
+        params = await manager.fill(record(auction.functions.reveal(10, "s"), revert_estimate=True), {"from": chain.accounts[0]})
+        await manager.stop()
+        return params
+    assert asyncio.run(run())["gas"] == FALLBACK_GAS
+    assert manager.cached_gas(auction.functions.reveal(10, "s")) is None
+
+def test_send_raw_refuses_a_taken_nonce():
+    chain, auction, manager, log, record = setup()
+    account = chain.accounts[0]
+    async def run():
+        nonce = await manager.next_nonce(account)
+        await manager.transact(record(auction.functions.startAuction(5)), {"from": account})
+        # Signed for the nonce the startAuction just used
+        future = await manager.send_raw(SimpleNamespace(raw_transaction=b""), account, nonce, auction.functions.bid(b""))
+        await manager.stop()
+        return future
+    assert asyncio.run(run()) is None
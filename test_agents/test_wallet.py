@@ -0,0 +1,78 @@
+"""Tests for the WalletLedger against the simulated auction's payouts and refunds.
+
+Run from the project root:
+    python -m pytest test_agents/test_wallet.py
+"""
+import asyncio
+from types import SimpleNamespace
+from web3 import Web3
+from simulation.auction import AsyncSimulatedAuction, AsyncSimulatedChain, SimulatedChain, SimulatedVickreyAuction
+from trading.auction_tracker import AuctionTracker
+from trading.bid_prep import sealed_bid
+from trading.phase import PhaseFeed
+from trading.wallet import WalletLedger
+
+ETH = Web3.to_wei(1, "ether")
+
+class Market:
+    """A simulated chain and auction with one ledger per account, fed the way the NegotiationAgent feeds its own."""
+    def __init__(self, accounts=4):
+        self.now = [1000.0]
+        chain = SimulatedChain(num_accounts=accounts, sim_clock=SimpleNamespace(time=lambda: self.now[0]))
+        self.accounts = chain.accounts
+        self.web3 = AsyncSimulatedChain(chain)
+        self.auction = AsyncSimulatedAuction(SimulatedVickreyAuction(chain))
+        self.tracker = AuctionTracker(self.web3, self.auction, PhaseFeed())
+        self.ledgers = {account: WalletLedger(self.web3, account, self.tracker) for account in self.accounts}
+
+    async def transact(self, account, function, value=0):
+        tx_hash = await function.transact({"from": account, "value": value})
+        receipt = await self.web3.eth.get_transaction_receipt(tx_hash)
+        self.ledgers[account].apply_receipt(receipt, value)
+        self.tracker.apply_receipt(receipt)
+        return receipt
+
+    async def round(self, bids, reveals):
+        """Runs one auction sold by account 0: bids is {account index: (value, deposit)}, reveals the indexes that reveal."""
+        for ledger in self.ledgers.values():
+            await ledger.reconcile()
+        functions = self.auction.functions
+        await self.transact(self.accounts[0], functions.startAuction(5))
+        for index, (value, deposit) in bids.items():
+            await self.transact(self.accounts[index], functions.bid(sealed_bid(value, f"house{index}")), deposit)
+        self.now[0] += 20
+        for index in reveals:
+            await self.transact(self.accounts[index], functions.reveal(bids[index][0], f"house{index}"))
+        self.now[0] += 10
+        await self.transact(self.accounts[1], functions.closeAuction())
+        # The ledgers followed receipts and the AuctionClosed log only; the chain has to agree
+        return [await self.ledgers[account].reconcile() for account in self.accounts]
+
+def test_ledgers_match_vickrey_payouts():
+    market = Market()
+    drifts = asyncio.run(market.round({1: (3 * ETH, 4 * ETH), 2: (2 * ETH, 2 * ETH), 3: (ETH, 2 * ETH)}, reveals=(1, 2, 3)))
+    assert drifts == [0, 0, 0, 0]
+    assert market.tracker.last_result[:2] == (market.accounts[1], 2 * ETH)
+    assert all(ledger.drift_alarms == 0 for ledger in market.ledgers.values())
+
+def test_unrevealed_bid_is_refunded():
+    market = Market()
+    drifts = asyncio.run(market.round({1: (3 * ETH, 3 * ETH), 2: (2 * ETH, 2 * ETH)}, reveals=(2,)))
+    assert drifts == [0, 0, 0, 0]
+    # Only one reveal: the winner pays the second price, which is 0
+    assert market.tracker.last_result[:2] == (market.accounts[2], 0)
+
+def test_no_reveals_refunds_every_deposit():
+    market = Market()
+    drifts = asyncio.run(market.round({1: (ETH, ETH), 3: (ETH, 2 * ETH)}, reveals=()))
+    assert drifts == [0, 0, 0, 0]
+    assert market.tracker.last_result[0] == "0x0000000000000000000000000000000000000000"
+
+def test_missed_payout_raises_drift_alarm():
+    market = Market()
+    async def round_without_log():
+        market.tracker.listeners.remove(market.ledgers[market.accounts[2]].apply_log)
+        return await market.round({2: (ETH, 2 * ETH)}, reveals=(2,))
+    drifts = asyncio.run(round_without_log())
+    assert drifts[2] == 2 * ETH # The winner's whole deposit came back at price 0
+    assert market.ledgers[market.accounts[2]].drift_alarms == 1
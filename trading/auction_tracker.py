@@ -0,0 +1,207 @@
+import time
+from web3 import Web3
+from simulation import clock
+from trading.phase import get_phase_feed
+from trading.rpc_batch import BatchReads
+
+# Auction state mirrored from the contract's event logs.
+# One batched read at start-up loads the current round; after that the
+# tracker only follows AuctionStarted / BidPlaced / BidRevealed /
+# AuctionClosed / AuctionReset through a log filter (one eth_getFilterChanges
+# per poll) and computes the phase locally from the cached deadlines, so the
+# phase costs no RPC at all. Logs from a receipt the caller already holds can
+# be applied directly, which makes its own transactions visible at once.
+#
+# Auction states as used by the NegotiationAgent (see trading.phase.STATE_PHASES):
+# -1 no auction, 0 pre-bidding, 1 bidding, 2 reveal, 3 reveal over / closing pending
+
+AUCTION_EVENTS = ["AuctionStarted", "BidPlaced", "BidRevealed", "AuctionClosed", "AuctionReset"]
+LOG_POLL_INTERVAL = 2 # Seconds between filter polls
+# Events that move the round between phases; logs older than the last one applied are stale
+ROUND_EVENTS = {"AuctionStarted", "AuctionClosed", "AuctionReset"}
+
+class AuctionTracker:
+    def __init__(self, web3, contract, feed=None, abi=None):
+        self.web3 = web3
+        self.contract = contract
+        self.feed = feed or get_phase_feed()
+        self.log_filter = None
+        self.last_round_log = (-1, -1) # (blockNumber, logIndex) of the last round event applied
+        self.listeners = [] # listener(decoded log), called after each log is applied
+        self.time = clock.time # Time the phases are judged on; a PhaseScheduler swaps in its chain time
+
+        # Cached contract state
+        self.bidding_start = 0
+        self.bidding_end = 0
+        self.reveal_end = 0
+        self.bidding_duration = 0
+        self.reveal_duration = 0
+        self.ended = True
+        self.seller = None
+        self.energy_amount = 0
+        self.deposits = {} # bidder -> deposit (Wei) this round
+        self.revealed = {} # bidder -> revealed value (Wei) this round
+        self.last_result = None # (winner, winning price Wei, energy) from the last AuctionClosed
+
+        # topic0 -> contract event, to decode raw logs (the simulated chain delivers them decoded).
+        # The topics come precomputed with the client's ABI (trading.client.ContractABI) when given
+        self.events_by_topic = {}
+        events = getattr(contract, "events", None)
+        if events is not None:
+            for name in AUCTION_EVENTS:
+                event = getattr(events, name)
+                self.events_by_topic[abi.topics[name] if abi else event.topic] = event
+
+    # --- Local state ---
+    def timings(self):
+        return self.bidding_start, self.bidding_end, self.reveal_end
+
+    def state(self, now=None):
+        if self.bidding_start == 0:
+            return -1
+        now = self.time() if now is None else now
+        if now < self.bidding_start:
+            return 0
+        if now <= self.bidding_end:
+            return 1
+        if now <= self.reveal_end:
+            return 2
+        return 3
+
+    def time_to_boundary(self, now=None):
+        """Seconds until the state next changes by the clock alone, or None outside a round."""
+        now = self.time() if now is None else now
+        upcoming = [t for t in self.timings() if t and t > now]
+        return min(upcoming) - now if upcoming else None
+
+    def _decode(self, log):
+        if "event" in log:
+            return log
+        event = self.events_by_topic.get(Web3.to_hex(log["topics"][0])) if log["topics"] else None
+        return event.process_log(log) if event is not None else None
+
+    def apply(self, log):
+        """Updates the cached state from one contract log (raw or decoded)."""
+        log = self._decode(log)
+        if log is None:
+            return
+        name, args = log["event"], log["args"]
+        if name in ROUND_EVENTS:
+            position = (log["blockNumber"], log["logIndex"])
+            if position <= self.last_round_log:
+                return
+            self.last_round_log = position
+
+        if name == "AuctionStarted":
+            self.seller = args["seller"]
+            self.energy_amount = args["energyAmount"]
+            self.bidding_end = args["biddingEnd"]
+            self.reveal_end = args["revealEnd"]
+            # The event carries no start time; biddingEnd = biddingStart + biddingDuration on chain
+            self.bidding_start = self.bidding_end - self.bidding_duration
+            self.ended = False
+            self.deposits, self.revealed = {}, {}
+        elif name == "BidPlaced":
+            self.deposits[args["bidder"]] = args["deposit"]
+        elif name == "BidRevealed":
+            self.revealed[args["bidder"]] = args["value"]
+        elif name == "AuctionClosed":
+            self.ended = True
+            self.bidding_start = 0
+            self.last_result = (args["winner"], args["winningPrice"], args["energyAmount"])
+        elif name == "AuctionReset":
+            self.bidding_duration = args["newBiddingDuration"]
+            self.reveal_duration = args["newRevealDuration"]
+            self.bidding_start = 0
+            self.deposits, self.revealed = {}, {}
+
+        for listener in self.listeners:
+            listener(log)
+
+    def apply_logs(self, logs):
+        for log in logs:
+            self.apply(log)
+        self.publish()
+
+    def apply_receipt(self, receipt):
+        """Applies the contract's logs from a receipt of our own transaction without waiting for the filter."""
+        self.apply_logs(log for log in receipt.logs if log["address"] == self.contract.address)
+
+    def publish(self):
+        """Pushes the state to the phase feed, which wakes every subscriber when the phase changed."""
+        state = self.state()
+        self.feed.publish_state(state, *self.timings())
+        return state
+
+    def _reads(self, block):
+        reads = BatchReads(self.web3, block)
+        for name in ("biddingStart", "biddingEnd", "revealEnd", "biddingDuration", "revealDuration", "ended"):
+            reads.call(name, getattr(self.contract.functions, name)())
+        return reads
+
+    def _load(self, state):
+        self.bidding_start, self.bidding_end, self.reveal_end = state["biddingStart"], state["biddingEnd"], state["revealEnd"]
+        self.bidding_duration, self.reveal_duration = state["biddingDuration"], state["revealDuration"]
+        self.ended = state["ended"]
+
+    # --- AsyncWeb3 ---
+    async def refresh(self):
+        """Reads the current round once and (re)installs the log filter from the next block."""
+        block = await self.web3.eth.block_number
+        self._load(await self._reads(block).execute())
+        self.log_filter = await self.web3.eth.filter({"address": self.contract.address, "fromBlock": block + 1})
+        self.publish()
+
+    async def poll(self):
+        """Applies the logs emitted since the last poll: one RPC."""
+        if self.log_filter is None:
+            await self.refresh()
+            return
+        try:
+            logs = await self.web3.eth.get_filter_changes(self.log_filter.filter_id)
+        except Exception as e:
+            # Filters expire on the node (restart, inactivity); start over from a fresh read
+            print(f"[AuctionTracker] Log filter lost ({e}), re-reading auction state")
+            await self.refresh()
+            return
+        self.apply_logs(logs)
+
+    async def run(self, interval=LOG_POLL_INTERVAL):
+        """Polls the filter and publishes the state, waking at phase deadlines as well."""
+        while True:
+            try:
+                await self.poll()
+            except Exception as e:
+                print(f"[AuctionTracker] Poll failed: {e}")
+            boundary = self.time_to_boundary()
+            await clock.sleep(interval if boundary is None else min(interval, boundary))
+
+    # --- Blocking Web3 (smart_grid.py) ---
+    def refresh_blocking(self):
+        block = self.web3.eth.block_number
+        self._load(self._reads(block).execute_blocking())
+        self.log_filter = self.web3.eth.filter({"address": self.contract.address, "fromBlock": block + 1})
+        self.publish()
+
+    def poll_blocking(self):
+        if self.log_filter is None:
+            self.refresh_blocking()
+            return
+        try:
+            logs = self.web3.eth.get_filter_changes(self.log_filter.filter_id)
+        except Exception as e:
+            print(f"[AuctionTracker] Log filter lost ({e}), re-reading auction state")
+            self.refresh_blocking()
+            return
+        self.apply_logs(logs)
+
+    def wait_for(self, predicate, timeout=None, interval=LOG_POLL_INTERVAL):
+        """Polls every `interval` seconds until predicate() holds. Returns False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        self.poll_blocking()
+        while not predicate():
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(interval)
+            self.poll_blocking()
+        return True
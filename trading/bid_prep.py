@@ -0,0 +1,115 @@
+from eth_account import Account
+from web3 import Web3
+
+# Bids and reveals signed before they are needed.
+# While the house expects to buy, the sealed-bid hash and a locally signed
+# bid transaction (eth_account key, no node-managed unlocked account) are
+# prepared for a few candidate prices on the bid grid (strategy.BID_STEP_WEI),
+# so once bidding opens placing the bid is a single eth_sendRawTransaction.
+# The reveal is signed right after the bid is mined, well ahead of biddingEnd.
+# Gas and gas price come from the TransactionManager caches; a prepared
+# transaction whose nonce was taken by another send meanwhile is signed again
+# on the spot (no RPC). bid() and reveal() revert outside their phase, so
+# nothing is prepared until a live send in the open phase has estimated and
+# cached the function's gas; from the next round on both are pre-signed.
+# Other transactions of the key's account (startAuction, closeAuction) are
+# signed on the spot through send().
+#
+#     await preparer.prepare_bids([value_a, value_b])
+#     receipt = await (await preparer.send_bid(value_a))
+#     await preparer.prepare_reveal(value_a)
+#     ...
+#     receipt = await (await preparer.send_reveal(value_a))
+
+MAX_CANDIDATES = 5 # Bid prices kept signed at once
+
+def sealed_bid(value_wei, secret):
+    # Matches the contract's keccak256(abi.encodePacked(value, secret))
+    return Web3.solidity_keccak(['uint256', 'string'], [value_wei, secret])
+
+class BidPreparer:
+    def __init__(self, web3, contract, tx_manager, private_key, secret):
+        self.web3 = web3
+        self.contract = contract
+        self.tx_manager = tx_manager
+        self.signer = Account.from_key(private_key)
+        self.address = self.signer.address
+        self.secret = secret
+        self.chain_id = None
+        self.bids = {} # bid value (Wei) -> (nonce, signed transaction)
+        self.reveal = None # (bid value, nonce, signed transaction)
+
+    async def _sign(self, function, params, nonce, cache_gas=True):
+        """The signed transaction and the gas limit it carries."""
+        if self.chain_id is None:
+            self.chain_id = await self.web3.eth.chain_id
+        params = await self.tx_manager.fill(function, {"from": self.address, **params}, cache_gas)
+        # Every field is given, so building the transaction needs no RPC
+        tx = await function.build_transaction({**params, "nonce": nonce, "chainId": self.chain_id})
+        return self.signer.sign_transaction(tx), tx["gas"]
+
+    def _bid_call(self, value_wei):
+        return self.contract.functions.bid(sealed_bid(value_wei, self.secret)), {"value": value_wei}
+
+    def _reveal_call(self, value_wei):
+        return self.contract.functions.reveal(value_wei, self.secret), {}
+
+    async def _send(self, prepared, function, params, cache_gas=True):
+        while True:
+            if prepared is None:
+                nonce = await self.tx_manager.next_nonce(self.address)
+                prepared = (nonce, (await self._sign(function, params, nonce, cache_gas))[0])
+            future = await self.tx_manager.send_raw(prepared[1], self.address, prepared[0], function)
+            if future is not None:
+                return future
+            prepared = None # Signed for a nonce used meanwhile
+
+    async def send(self, function, params, cache_gas=True):
+        """Signs and sends any contract transaction from the key's account. Returns a future for the receipt."""
+        return await self._send(None, function, params, cache_gas)
+
+    async def prepare_bids(self, values_wei):
+        """Signs bids for the candidate values at the next nonce; already prepared ones are kept.
+        Returns False while the bid's gas is unknown (no bid has gone through yet)."""
+        values = list(dict.fromkeys(values_wei))[:MAX_CANDIDATES]
+        gas = self.tx_manager.cached_gas(self._bid_call(values[0])[0]) if values else None
+        if gas is None:
+            return False
+        nonce = await self.tx_manager.next_nonce(self.address)
+        bids = {}
+        for value in values:
+            prepared = self.bids.get(value)
+            if prepared is None or prepared[0] != nonce:
+                function, params = self._bid_call(value)
+                params["gas"] = gas # The bid costs the same whatever the value
+                prepared = (nonce, (await self._sign(function, params, nonce))[0])
+            bids[value] = prepared
+        self.bids = bids
+        return True
+
+    async def send_bid(self, value_wei):
+        """Sends the bid, pre-signed if value_wei was a candidate. Returns a future for the receipt."""
+        function, params = self._bid_call(value_wei)
+        future = await self._send(self.bids.get(value_wei), function, params)
+        self.bids = {}
+        return future
+
+    async def prepare_reveal(self, value_wei):
+        """Signs the reveal of a placed bid for the next nonce. Returns False while the reveal's gas is unknown."""
+        function, params = self._reveal_call(value_wei)
+        gas = self.tx_manager.cached_gas(function)
+        if gas is None:
+            return False # The reveal reverts until the reveal phase; the first one is estimated and sent live
+        nonce = await self.tx_manager.next_nonce(self.address)
+        self.reveal = (value_wei, nonce, (await self._sign(function, {**params, "gas": gas}, nonce))[0])
+        return True
+
+    async def send_reveal(self, value_wei):
+        """Sends the reveal, pre-signed if prepare_reveal ran for value_wei. Returns a future for the receipt."""
+        prepared = None
+        if self.reveal is not None and self.reveal[0] == value_wei:
+            prepared = self.reveal[1:]
+        function, params = self._reveal_call(value_wei)
+        future = await self._send(prepared, function, params)
+        self.reveal = None
+        return future
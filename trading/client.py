@@ -0,0 +1,169 @@
+import json
+import os
+import aiohttp
+import requests
+from dotenv import load_dotenv # pip install python-dotenv
+from eth_utils import abi_to_signature, event_abi_to_log_topic, function_abi_to_4byte_selector
+from web3 import Web3, AsyncWeb3, AsyncHTTPProvider
+
+# One blockchain client per process.
+# The contract address (blockchain/.env), the EnergyVickreyAuction artifact
+# and the node connection used to be loaded separately by the NegotiationAgent,
+# smart_grid.py and test_agents/test_auction.py. Here the .env is read once,
+# the ABI is parsed once together with its function selectors and event
+# topics, and the providers keep one pooled keep-alive session (aiohttp for
+# AsyncWeb3, requests for the blocking Web3). A contract handle costs no RPC
+# to build; the deployment check (eth_getCode) runs on the first use of the
+# handle for an address and is not repeated afterwards.
+#
+#     client = get_client()
+#     web3 = client.web3()                      # smart_grid.py
+#     contract = client.contract()              # raises ContractError
+#
+#     web3 = await client.async_web3()          # NegotiationAgent
+#     contract = await client.async_contract()
+
+RPC_URL = os.getenv("RPC_URL", "http://127.0.0.1:8545")
+RPC_POOL_SIZE = 8 # Keep-alive connections shared by every RPC call of the process
+RPC_TIMEOUT = 30 # Seconds per request
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BLOCKCHAIN_DIR = os.path.join(PROJECT_DIR, "blockchain")
+ENV_PATH = os.path.join(BLOCKCHAIN_DIR, ".env") # Written by the Truffle migration
+CONTRACT_NAME = "EnergyVickreyAuction"
+ARTIFACT_PATH = os.path.join(BLOCKCHAIN_DIR, "build", "contracts", f"{CONTRACT_NAME}.json")
+
+class ContractError(Exception):
+    """The auction contract cannot be used: no address, no artifact, or nothing deployed at the address."""
+
+class ContractABI:
+    def __init__(self, abi):
+        self.abi = abi
+        self.signatures = {} # function or event name -> canonical signature, e.g. "bid(bytes32)"
+        self.selectors = {} # function name -> 4-byte selector (hex), the first bytes of its calldata
+        self.topics = {} # event name -> topic0 (hex) of its logs
+        for entry in abi:
+            if entry.get("type") == "function":
+                self.signatures[entry["name"]] = abi_to_signature(entry)
+                self.selectors[entry["name"]] = "0x" + function_abi_to_4byte_selector(entry).hex()
+            elif entry.get("type") == "event":
+                self.signatures[entry["name"]] = abi_to_signature(entry)
+                self.topics[entry["name"]] = "0x" + event_abi_to_log_topic(entry).hex()
+        self.functions_by_selector = {selector: name for name, selector in self.selectors.items()}
+
+def load_abi(path=ARTIFACT_PATH):
+    """Parses a Truffle artifact's ABI."""
+    try:
+        with open(path, "r") as artifact_file:
+            artifact = json.load(artifact_file)
+    except FileNotFoundError:
+        raise ContractError(f"Contract ABI file not found at {path}; has the contract been compiled?")
+    except json.JSONDecodeError:
+        raise ContractError(f"Could not decode JSON from ABI file {path}")
+    if not isinstance(artifact.get("abi"), list):
+        raise ContractError(f"ABI is missing or invalid in {path}")
+    return ContractABI(artifact["abi"])
+
+_env_loaded = False
+
+def load_env(override=False):
+    """Loads the working directory's .env and blockchain/.env into os.environ, once per process
+    unless override is set (after a deployment has rewritten blockchain/.env)."""
+    global _env_loaded
+    if _env_loaded and not override:
+        return
+    load_dotenv()
+    load_dotenv(dotenv_path=ENV_PATH, override=override)
+    _env_loaded = True
+
+class BlockchainClient:
+    def __init__(self, rpc_url=RPC_URL, artifact_path=ARTIFACT_PATH):
+        self.rpc_url = rpc_url
+        self.artifact_path = artifact_path
+        self._abi = None
+        self._web3 = None # Blocking Web3
+        self._session = None # Its requests session
+        self._async_web3 = None
+        self.contracts = {} # (async?, address) -> contract handle
+        self.validated = set() # Addresses whose deployed code has been checked
+
+    @property
+    def abi(self):
+        if self._abi is None:
+            self._abi = load_abi(self.artifact_path)
+        return self._abi
+
+    def contract_address(self):
+        load_env()
+        address = os.getenv("CONTRACT_ADDRESS")
+        if not address:
+            raise ContractError(f"Contract address not found in {ENV_PATH}")
+        return Web3.to_checksum_address(address)
+
+    def _check_code(self, address, code):
+        if not code:
+            raise ContractError(f"Contract address {address} is invalid or the contract is not deployed")
+        self.validated.add(address)
+
+    # --- Blocking Web3 (smart_grid.py, test scripts) ---
+    def web3(self):
+        if self._web3 is None:
+            self._session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=RPC_POOL_SIZE)
+            self._session.mount("http://", adapter)
+            self._session.mount("https://", adapter)
+            self._web3 = Web3(Web3.HTTPProvider(self.rpc_url, session=self._session, request_kwargs={"timeout": RPC_TIMEOUT}))
+        return self._web3
+
+    def contract(self, address=None):
+        """The auction contract on the blocking Web3, checked to be deployed on first use."""
+        address = address or self.contract_address()
+        web3 = self.web3()
+        if address not in self.validated:
+            self._check_code(address, web3.eth.get_code(address))
+        key = (False, address)
+        if key not in self.contracts:
+            self.contracts[key] = web3.eth.contract(address=address, abi=self.abi.abi)
+        return self.contracts[key]
+
+    # --- AsyncWeb3 (agents) ---
+    async def async_web3(self):
+        if self._async_web3 is None:
+            web3 = AsyncWeb3(AsyncHTTPProvider(self.rpc_url))
+            await web3.provider.cache_async_session(aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=RPC_POOL_SIZE),
+                timeout=aiohttp.ClientTimeout(total=RPC_TIMEOUT)
+            ))
+            self._async_web3 = web3
+        return self._async_web3
+
+    async def async_contract(self, address=None):
+        """The auction contract on the AsyncWeb3, checked to be deployed on first use."""
+        address = address or self.contract_address()
+        web3 = await self.async_web3()
+        if address not in self.validated:
+            self._check_code(address, await web3.eth.get_code(address))
+        key = (True, address)
+        if key not in self.contracts:
+            self.contracts[key] = web3.eth.contract(address=address, abi=self.abi.abi)
+        return self.contracts[key]
+
+    async def close(self):
+        """Closes the pooled sessions."""
+        if self._async_web3 is not None:
+            await self._async_web3.provider.disconnect()
+            self._async_web3 = None
+            self.contracts = {key: contract for key, contract in self.contracts.items() if not key[0]}
+        if self._web3 is not None:
+            self._session.close()
+            self._web3 = self._session = None
+            self.contracts = {key: contract for key, contract in self.contracts.items() if key[0]}
+
+_client = None
+
+def get_client():
+    """The process-wide BlockchainClient."""
+    global _client
+    if _client is None:
+        _client = BlockchainClient()
+    return _client
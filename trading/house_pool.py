@@ -0,0 +1,179 @@
+import asyncio
+import os
+from eth_account import Account
+from eth_utils import keccak
+from communication.shared_payload import StalePayloadError, is_current, is_handle, resolve_array
+from trading import strategy as strategy_params
+from trading.bid_prep import BidPreparer, sealed_bid
+
+# Trading for many houses from one NegotiationAgent.
+# The House agent's fleet message carries every house's production and demand
+# as columns; the pool keeps one account per fleet house (house 0 is the
+# agent's own house and account) with its own surplus/deficit, sealed-bid
+# secret and bid/reveal state for the current round. Bids and reveals of all
+# houses are fanned out concurrently through the shared TransactionManager;
+# a semaphore bounds how many submissions are in flight at once, and the
+# receipts are awaited together (usually one block).
+#
+# The houses' keys are derived from a secret seed (HOUSE_KEY_SEED in the
+# environment or blockchain/.env, required when signing), not taken from the node's
+# unlocked accounts: smart_grid.py trades from those with its own nonces, and
+# Ganache only has ten. Transactions are signed locally (trading.bid_prep) and
+# fund() tops every house up to HOUSE_FUNDING_ETH from the agent's account at
+# startup. The simulated chain cannot check signatures, so under the virtual
+# clock the pool sends from the same addresses without signing.
+
+MAX_CONCURRENT_SUBMITS = 8 # Pool transactions being sent to the node at once
+SIMULATED_KEY_SEED = "simulated" # Unsigned pool on the in-memory chain only; its keys guard nothing
+HOUSE_FUNDING_ETH = float(os.getenv("HOUSE_FUNDING_ETH", "1")) # Balance each house is topped up to
+TRANSFER_GAS = 21000 # Plain ETH transfer
+
+def house_key(house, seed):
+    """Private key of a fleet house, derived from the seed."""
+    return "0x" + keccak(text=f"{seed}/house{house}").hex()
+
+class HouseAccount:
+    def __init__(self, house, key):
+        self.house = house # Column in the fleet message
+        self.key = key
+        self.account = Account.from_key(key).address
+        self.secret = f"house{house}" # Sealed-bid nonce, distinct for every house
+        self.signer = None # BidPreparer for the house's key, when transactions are signed locally
+        self.delta = 0.0 # kWh production minus demand at the last fleet update
+        self.bid_amount = 0 # Wei bid this round, 0 when no bid is placed
+        self.revealed = False
+
+class HousePool:
+    def __init__(self, web3, contract, tx_manager, size, tracker, concurrency=MAX_CONCURRENT_SUBMITS, sign=True, seed=None):
+        if seed is None:
+            if sign:
+                # Anyone who knows the seed holds every house's key and the ETH fund() sends them
+                raise ValueError("HOUSE_KEY_SEED is not set; a secret seed is required to derive the house keys")
+            seed = SIMULATED_KEY_SEED
+        self.web3 = web3
+        self.contract = contract
+        self.tx_manager = tx_manager
+        self.tracker = tracker
+        # House 0 is traded by the agent itself
+        self.houses = [HouseAccount(house, house_key(house, seed)) for house in range(1, size)]
+        if sign:
+            for house in self.houses:
+                house.signer = BidPreparer(web3, contract, tx_manager, house.key, house.secret)
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.market_price = None # ETH per kWh from the last message
+        self.strategy = strategy_params.DEFAULT_STRATEGY
+        tracker.listeners.append(self.apply_log)
+
+    def __len__(self):
+        return len(self.houses)
+
+    def apply_log(self, log):
+        # A new round (or the end of one) clears every house's bid
+        if log["event"] in ("AuctionStarted", "AuctionClosed", "AuctionReset"):
+            for house in self.houses:
+                house.bid_amount = 0
+                house.revealed = False
+
+    def update(self, fleet, market_price, strategy):
+        """Takes the houses' production and demand from a fleet message (inline or shared-memory columns)."""
+        delta = resolve_array(fleet["current_production"]) - resolve_array(fleet["current_demand"])
+        if not all(is_current(fleet[key]) for key in ("current_production", "current_demand") if is_handle(fleet[key])):
+            raise StalePayloadError("Fleet columns were overwritten while being read")
+        for house in self.houses:
+            if house.house < len(delta):
+                house.delta = float(delta[house.house])
+        self.market_price = market_price
+        self.strategy = strategy
+
+    async def fund(self, funder, private_key=None):
+        """Tops every house up to HOUSE_FUNDING_ETH from the funder's account (signed with private_key
+        when given, else sent by the node) and waits for the transfers. Returns the number of houses funded."""
+        target = self.web3.to_wei(HOUSE_FUNDING_ETH, "ether")
+        balances = await asyncio.gather(*(self.web3.eth.get_balance(house.account) for house in self.houses))
+        short = [(house, target - balance) for house, balance in zip(self.houses, balances) if balance < target]
+        if not short:
+            return 0
+        available = await self.web3.eth.get_balance(funder) - target # Keep as much for the agent's own trading
+        if private_key:
+            signer = Account.from_key(private_key)
+            nonce = await self.web3.eth.get_transaction_count(funder, "pending")
+            chain_id = await self.web3.eth.chain_id
+            gas_price = await self.web3.eth.gas_price
+        tx_hashes = []
+        for house, amount in short:
+            if amount > available:
+                print(f"[HousePool] WARNING: {self.web3.from_wei(available, 'ether')} ETH left in {funder}, funded {len(tx_hashes)} of {len(short)} houses")
+                break
+            transfer = {"from": funder, "to": house.account, "value": amount}
+            if private_key:
+                transfer.update(nonce=nonce + len(tx_hashes), gas=TRANSFER_GAS, gasPrice=gas_price, chainId=chain_id)
+                tx_hashes.append(await self.web3.eth.send_raw_transaction(signer.sign_transaction(transfer).raw_transaction))
+            else:
+                tx_hashes.append(await self.web3.eth.send_transaction(transfer))
+            available -= amount
+        await asyncio.gather(*(self.web3.eth.wait_for_transaction_receipt(tx_hash) for tx_hash in tx_hashes))
+        print(f"[HousePool] Funded {len(tx_hashes)} houses with up to {HOUSE_FUNDING_ETH} ETH each")
+        return len(tx_hashes)
+
+    async def _submit(self, house, function, params, cache_gas=True):
+        async with self.semaphore:
+            if house.signer is not None:
+                return await house.signer.send(function, params, cache_gas)
+            return await self.tx_manager.submit(function, {"from": house.account, **params}, cache_gas)
+
+    async def _fan_out(self, action, houses, calls):
+        """Submits one transaction per house with bounded concurrency; returns the houses whose transaction succeeded."""
+        futures = await asyncio.gather(*(self._submit(house, *call) for house, call in zip(houses, calls)), return_exceptions=True)
+        pending = [(house, future) for house, future in zip(houses, futures) if not isinstance(future, BaseException)]
+        receipts = await asyncio.gather(*(future for _, future in pending), return_exceptions=True)
+        done = []
+        for (house, _), receipt in zip(pending, receipts):
+            if isinstance(receipt, BaseException) or receipt.status != 1:
+                continue
+            self.tracker.apply_receipt(receipt)
+            done.append(house)
+        failed = len(houses) - len(done)
+        print(f"[HousePool] {action}: {len(done)}/{len(houses)} houses" + (f", {failed} failed" if failed else ""))
+        return done
+
+    async def bid_all(self):
+        """Places a bid for every house in deficit that has not bid this round."""
+        if self.market_price is None:
+            return
+        buyers = [house for house in self.houses if house.delta < -strategy_params.BUY_THRESHOLD and house.bid_amount == 0]
+        if not buyers:
+            return
+        values = {house: strategy_params.bid_value_wei(self.market_price, -house.delta, self.strategy) for house in buyers}
+        calls = [(self.contract.functions.bid(sealed_bid(values[house], house.secret)), {"value": values[house]}) for house in buyers]
+        for house in await self._fan_out("Bids", buyers, calls):
+            house.bid_amount = values[house]
+
+    async def reveal_all(self):
+        """Reveals every bid placed this round that is not revealed yet."""
+        bidders = [house for house in self.houses if house.bid_amount > 0 and not house.revealed]
+        if not bidders:
+            return
+        calls = [(self.contract.functions.reveal(house.bid_amount, house.secret), {}) for house in bidders]
+        for house in await self._fan_out("Reveals", bidders, calls):
+            house.revealed = True
+
+    async def start_auction(self):
+        """Auctions the surplus of the house with the largest one. Returns True when an auction was started."""
+        if self.market_price is None or not self.houses:
+            return False
+        seller = max(self.houses, key=lambda house: house.delta)
+        amount = strategy_params.sell_amount(seller.delta, self.strategy)
+        if seller.delta <= strategy_params.SELL_THRESHOLD or amount <= strategy_params.MIN_SELL_AMOUNT:
+            return False
+        # Gas is estimated each time: startAuction clears the previous round's bidders
+        started = await self._fan_out("Auction start", [seller], [(self.contract.functions.startAuction(int(amount)), {}, False)])
+        return bool(started)
+
+    async def step(self, state):
+        """Acts for every house in the given auction state (-1 no auction, 1 bidding, 2 reveal)."""
+        if state == 1:
+            await self.bid_all()
+        elif state == 2:
+            await self.reveal_all()
+        elif state == -1:
+            await self.start_auction()
@@ -0,0 +1,89 @@
+import asyncio
+from simulation import clock
+
+# Auction phase feed shared by the agents in this process.
+# The NegotiationAgent publishes the phase it reads from the contract; other
+# behaviours subscribe through a Cadence, which runs them slowly while the
+# market is idle, quickly while an auction is live, and wakes them early on
+# a phase change or right at the next phase boundary.
+
+PHASE_IDLE = "idle"
+PHASE_BIDDING = "bidding"
+PHASE_REVEAL = "reveal"
+PHASE_CLOSING = "closing"
+ACTIVE_PHASES = (PHASE_BIDDING, PHASE_REVEAL, PHASE_CLOSING)
+
+# NegotiationAgent.current_auction_state index -> phase
+STATE_PHASES = {-1: PHASE_IDLE, 0: PHASE_IDLE, 1: PHASE_BIDDING, 2: PHASE_REVEAL, 3: PHASE_CLOSING}
+
+class PhaseFeed:
+    def __init__(self):
+        self.phase = PHASE_IDLE
+        self.bidding_start = 0
+        self.bidding_end = 0
+        self.reveal_end = 0
+        self.version = 0 # Bumped on every phase change
+        self.time = clock.time # Clock the published deadlines are on (the PhaseScheduler's chain time once one runs)
+        self._changed = asyncio.Event()
+
+    def publish(self, phase, bidding_start=0, bidding_end=0, reveal_end=0):
+        """Records the current phase and timings; wakes every subscriber when the phase changes."""
+        self.bidding_start, self.bidding_end, self.reveal_end = bidding_start, bidding_end, reveal_end
+        if phase == self.phase:
+            return False
+        self.phase = phase
+        self.version += 1
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+        return True
+
+    def publish_state(self, state, bidding_start=0, bidding_end=0, reveal_end=0):
+        return self.publish(STATE_PHASES.get(state, PHASE_IDLE), bidding_start, bidding_end, reveal_end)
+
+    def is_active(self):
+        return self.phase in ACTIVE_PHASES
+
+    def time_to_boundary(self):
+        """Seconds until the next bidding/reveal deadline, or None when no auction is running."""
+        now = self.time()
+        upcoming = [t for t in (self.bidding_start, self.bidding_end, self.reveal_end) if t and t > now]
+        return min(upcoming) - now if upcoming else None
+
+    async def wait_for_change(self, timeout):
+        """Returns True if the phase changed within timeout seconds."""
+        changed = self._changed
+        try:
+            await asyncio.wait_for(changed.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+
+class Cadence:
+    def __init__(self, idle_interval, active_interval, feed=None):
+        self.idle_interval = idle_interval
+        self.active_interval = active_interval
+        self.feed = feed or get_phase_feed()
+
+    def interval(self, limit=None):
+        """Current period: idle or active, cut short so the behaviour runs right at the next phase boundary
+        (or at `limit` seconds, the caller's own next deadline)."""
+        interval = self.active_interval if self.feed.is_active() else self.idle_interval
+        for deadline in (self.feed.time_to_boundary(), limit):
+            if deadline is not None:
+                interval = min(interval, deadline)
+        return interval
+
+    async def sleep(self, limit=None):
+        """Waits one period, or less if the phase changes. Returns True when woken by a phase change."""
+        return await self.feed.wait_for_change(self.interval(limit))
+
+
+_feed = None
+
+def get_phase_feed():
+    """Process-wide phase feed."""
+    global _feed
+    if _feed is None:
+        _feed = PhaseFeed()
+    return _feed
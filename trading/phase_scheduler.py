@@ -0,0 +1,134 @@
+import os
+import time
+from collections import deque
+from simulation import clock
+
+# Auction actions timed on chain time.
+# The contract checks every phase against block.timestamp, not the local
+# clock. The scheduler estimates chain time as the local clock plus an offset
+# learned from block timestamps: a block's timestamp can only lag the chain
+# clock at the moment we see the block, so timestamp - local time is a lower
+# bound on the offset, and the largest of the recent samples is the estimate.
+# Samples come from blocks that mined our own transactions and from the
+# AuctionStarted log (biddingStart is its block's timestamp); the latest block
+# alone is not used, as Ganache mines only on transactions and its timestamp
+# can be arbitrarily old. Until a sample arrives the clocks are assumed equal.
+# The scheduler installs this chain time as the tracker's and the phase
+# feed's clock, so the phase they report agrees with the action windows.
+#
+# Each action then has a window in chain time:
+#     bid     biddingStart + BID_MARGIN   .. biddingEnd - DEADLINE_MARGIN
+#     reveal  biddingEnd + REVEAL_MARGIN  .. revealEnd - DEADLINE_MARGIN
+#     close   revealEnd + CLOSE_MARGIN    .. (no deadline)
+# and callers sleep exactly until a window opens instead of padding with
+# fixed sleeps.
+
+BID_MARGIN = float(os.getenv("BID_MARGIN", "0")) # Seconds after biddingStart before bidding
+REVEAL_MARGIN = float(os.getenv("REVEAL_MARGIN", "0.5")) # Seconds after biddingEnd before revealing (covers the clocks until the first sample)
+CLOSE_MARGIN = float(os.getenv("CLOSE_MARGIN", "0.5")) # Seconds after revealEnd before closing
+DEADLINE_MARGIN = float(os.getenv("DEADLINE_MARGIN", "1")) # A bid or reveal is not sent later than this before its phase ends
+OFFSET_SAMPLES = 16 # Recent chain-minus-local samples kept
+
+ACTIONS = ("bid", "reveal", "close")
+ACTION_STATES = {"bid": 1, "reveal": 2, "close": 3} # Auction state in which each action is taken
+
+class PhaseScheduler:
+    def __init__(self, tracker, bid_margin=BID_MARGIN, reveal_margin=REVEAL_MARGIN, close_margin=CLOSE_MARGIN,
+                 deadline_margin=DEADLINE_MARGIN):
+        self.tracker = tracker
+        self.bid_margin = bid_margin
+        self.reveal_margin = reveal_margin
+        self.close_margin = close_margin
+        self.deadline_margin = deadline_margin
+        self.samples = deque(maxlen=OFFSET_SAMPLES)
+        tracker.listeners.append(self.apply_log)
+        # The tracker's phase and the deadlines it publishes are judged on the same chain time as the actions
+        tracker.time = self.chain_time
+        tracker.feed.time = self.chain_time
+
+    # --- Chain clock ---
+    def observe(self, block_timestamp, local_time=None):
+        """Adds a sample from a block timestamp seen at local_time (default: now)."""
+        local_time = clock.time() if local_time is None else local_time
+        self.samples.append(block_timestamp - local_time)
+
+    def observe_block(self, block):
+        self.observe(block["timestamp"])
+
+    def apply_log(self, log):
+        if log["event"] == "AuctionStarted":
+            self.observe(self.tracker.bidding_start)
+
+    def offset(self):
+        """Estimated chain time minus local time (seconds)."""
+        return max(self.samples) if self.samples else 0
+
+    def chain_time(self):
+        return clock.time() + self.offset()
+
+    def state(self):
+        """Auction state (-1..3, see AuctionTracker) at the estimated chain time."""
+        return self.tracker.state()
+
+    # --- Action windows ---
+    def window(self, action):
+        """(opens, closes) in chain time for the current round, closes None for no deadline; None outside a round."""
+        tracker = self.tracker
+        if tracker.bidding_start == 0:
+            return None
+        if action == "bid":
+            return tracker.bidding_start + self.bid_margin, tracker.bidding_end - self.deadline_margin
+        if action == "reveal":
+            return tracker.bidding_end + self.reveal_margin, tracker.reveal_end - self.deadline_margin
+        return tracker.reveal_end + self.close_margin, None
+
+    def due(self, action):
+        """True while the action's window is open."""
+        window = self.window(action)
+        if window is None:
+            return False
+        now = self.chain_time()
+        return window[0] <= now and (window[1] is None or now < window[1])
+
+    def time_until(self, action):
+        """Local seconds until the action's window opens (0 if open), or None if it has closed or no round runs."""
+        window = self.window(action)
+        if window is None:
+            return None
+        now = self.chain_time()
+        if window[1] is not None and now >= window[1]:
+            return None
+        return max(window[0] - now, 0)
+
+    def next_action_delay(self):
+        """Local seconds until the next action window of the round opens (open ones don't count), or None."""
+        delays = [delay for delay in (self.time_until(action) for action in ACTIONS) if delay]
+        return min(delays) if delays else None
+
+    def due_state(self):
+        """The auction state if its action may be taken now, else None. -1 (no auction) is always actionable."""
+        state = self.state()
+        if state == -1:
+            return state
+        for action, action_state in ACTION_STATES.items():
+            if state == action_state and self.due(action):
+                return state
+        return None
+
+    async def wait(self, action):
+        """Sleeps until the action's window opens. Returns False if it has closed or no round runs."""
+        delay = self.time_until(action)
+        if delay is None:
+            return False
+        await clock.sleep(delay)
+        return True
+
+    def wait_blocking(self, action):
+        """wait() for the synchronous smart_grid.py (wall clock)."""
+        delay = self.time_until(action)
+        if delay is None:
+            return False
+        if delay > 0:
+            print(f"Waiting {delay:.2f} s to {action} (chain time offset {self.offset():+.2f} s)")
+            time.sleep(delay)
+        return True
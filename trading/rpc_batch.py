@@ -0,0 +1,55 @@
+# Contract reads and balances sent as one JSON-RPC batch, all pinned to the same block.
+# Reading an auction's outcome or a list of bids call by call costs one round
+# trip each, and a block mined in between can mix state from two blocks. Here
+# every read names the block explicitly and the whole set goes out in a single
+# HTTP request:
+#
+#     reads = BatchReads(web3, receipt.blockNumber)
+#     reads.call("winner", contract.functions.highestBidder())
+#     reads.balance("balance", account)
+#     results = await reads.execute() # {"winner": ..., "balance": ...}
+#
+# Providers without batching (the simulated chain) get the reads one by one.
+
+class BatchReads:
+    def __init__(self, web3, block_identifier="latest"):
+        self.web3 = web3
+        self.block_identifier = block_identifier
+        self.reads = [] # (key, request factory)
+
+    def call(self, key, function):
+        """Queues a contract function call, e.g. contract.functions.bids(bidder)."""
+        self.reads.append((key, lambda: function.call(block_identifier=self.block_identifier)))
+        return self
+
+    def balance(self, key, account):
+        self.reads.append((key, lambda: self.web3.eth.get_balance(account, self.block_identifier)))
+        return self
+
+    def __len__(self):
+        return len(self.reads)
+
+    def _batching(self):
+        return hasattr(self.web3, "batch_requests") and len(self.reads) > 1
+
+    async def execute(self):
+        """Runs the queued reads (AsyncWeb3). Returns {key: result}."""
+        keys = [key for key, _ in self.reads]
+        if not self._batching():
+            return {key: await request() for key, request in self.reads}
+        async with self.web3.batch_requests() as batch:
+            for _, request in self.reads:
+                batch.add(request())
+            results = await batch.async_execute()
+        return dict(zip(keys, results))
+
+    def execute_blocking(self):
+        """Runs the queued reads (Web3). Returns {key: result}."""
+        keys = [key for key, _ in self.reads]
+        if not self._batching():
+            return {key: request() for key, request in self.reads}
+        with self.web3.batch_requests() as batch:
+            for _, request in self.reads:
+                batch.add(request())
+            results = batch.execute()
+        return dict(zip(keys, results))
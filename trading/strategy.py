@@ -0,0 +1,30 @@
+# Trading strategy parameters shared by the NegotiationAgent and the headless
+# scenario runner, so a batch run trades exactly like the live agent.
+import math
+
+STRATEGIES = ("aggressive", "neutral", "conservative")
+BID_MULTIPLIER = {"aggressive": 1.05, "neutral": 1.0, "conservative": 0.90} # Bid relative to the market price
+SELL_FRACTION = {"aggressive": 0.75, "neutral": 0.5, "conservative": 0.25} # Share of the surplus put up for auction
+DEFAULT_STRATEGY = "neutral"
+
+BUY_THRESHOLD = 0.1 # kWh deficit before the house looks to buy
+SELL_THRESHOLD = 0.1 # kWh surplus before the house considers selling
+MIN_SELL_AMOUNT = 0.01 # Smallest amount worth auctioning (kWh)
+BID_DEPOSIT_MARGIN = 0.1 # ETH added on top of the bid value
+BID_STEP_WEI = 10**16 # 0.01 ETH grid bids are rounded up to, so a bid signed ahead of time matches the live one
+
+def bid_price(market_price, strategy):
+    """Price per kWh the strategy bids for a given market price."""
+    return market_price * BID_MULTIPLIER.get(strategy, BID_MULTIPLIER[DEFAULT_STRATEGY])
+
+def bid_value(market_price, amount_kwh, strategy):
+    """Total ETH value bid (and deposited) for amount_kwh."""
+    return bid_price(market_price, strategy) * amount_kwh + BID_DEPOSIT_MARGIN
+
+def sell_amount(surplus_kwh, strategy):
+    return surplus_kwh * SELL_FRACTION.get(strategy, SELL_FRACTION[DEFAULT_STRATEGY])
+
+def bid_value_wei(market_price, amount_kwh, strategy):
+    """bid_value in Wei, rounded up to the BID_STEP_WEI grid."""
+    steps = math.ceil(round(bid_value(market_price, amount_kwh, strategy) * 10**18 / BID_STEP_WEI, 6))
+    return steps * BID_STEP_WEI
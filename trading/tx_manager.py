@@ -0,0 +1,255 @@
+import asyncio
+import math
+from simulation import clock
+
+# Pipelined transaction submission.
+# Nonces are allocated locally per account, so transactions go out back to
+# back without waiting for the previous receipt; a single new-block watcher
+# (one eth_blockNumber per poll while anything is pending) scans each new
+# block for our pending transactions and resolves their futures. Gas is
+# estimated once per contract function and cached with a margin instead of
+# sending a fixed 3,000,000, and the cache grows with the gas actually used.
+# The gas price is cached as well (GAS_PRICE_TTL), so sends don't each ask
+# the node for it.
+#
+#     future = await manager.submit(contract.functions.bid(sealed), {"from": account, "value": deposit})
+#     ...submit more...
+#     receipt = await future
+#
+# Transactions signed locally ahead of time (trading.bid_prep) go through
+# send_raw, which checks that the nonce they were signed for is still next.
+# A blocking variant for the synchronous smart_grid.py shares the nonce and gas caches.
+
+BLOCK_POLL_INTERVAL = 0.5 # Seconds between new-block checks while transactions are pending
+TX_TIMEOUT = 120 # Seconds before a pending transaction's future fails
+GAS_MARGIN = 1.5 # Headroom over the estimate or the largest gas used seen
+FALLBACK_GAS = 3000000 # When estimation fails (e.g. the call would revert right now)
+GAS_PRICE_TTL = 60 # Seconds a cached gas price is reused
+
+class TransactionManager:
+    def __init__(self, web3, poll_interval=BLOCK_POLL_INTERVAL, timeout=TX_TIMEOUT):
+        self.web3 = web3
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self.nonces = {} # account -> next nonce to use
+        self.nonce_locks = {} # account -> asyncio.Lock serialising allocation and send
+        self.gas_limits = {} # (contract address, function name) -> gas limit
+        self.gas_price = None # (price in Wei, clock.monotonic() when read)
+        self.pending = {} # tx hash -> (future, gas cache key, deadline)
+        self.sending = 0 # Submissions between allocating a nonce and registering their hash
+        self.last_block = None # Last block scanned for pending transactions
+        self.watcher = None
+        self.block_listeners = [] # listener(block), called for each block that mined one of our transactions
+        self.sent_blocking = {} # tx hash -> gas cache key, for submit_blocking
+
+    # --- Gas cache ---
+    @staticmethod
+    def _gas_key(function):
+        return function.address, function.fn_name
+
+    def _remember_gas(self, key, gas):
+        limit = math.ceil(gas * GAS_MARGIN)
+        self.gas_limits[key] = max(self.gas_limits.get(key, 0), limit)
+        return self.gas_limits[key]
+
+    def cached_gas(self, function):
+        """The gas limit cached for a contract function, or None before a successful estimate or receipt."""
+        return self.gas_limits.get(self._gas_key(function))
+
+    def _observe(self, key, receipt):
+        if receipt.status == 1:
+            self._remember_gas(key, receipt.gasUsed)
+
+    @staticmethod
+    def _estimate_params(params):
+        return {k: v for k, v in params.items() if k not in ("gas", "nonce")}
+
+    @staticmethod
+    def _has_fee(params):
+        return any(k in params for k in ("gasPrice", "maxFeePerGas"))
+
+    def _cached_gas_price(self):
+        if self.gas_price is not None and clock.monotonic() - self.gas_price[1] < GAS_PRICE_TTL:
+            return self.gas_price[0]
+        return None
+
+    # --- AsyncWeb3 ---
+    async def _gas(self, function, params, cache_gas):
+        key = self._gas_key(function)
+        if cache_gas and key in self.gas_limits:
+            return self.gas_limits[key]
+        try:
+            return self._remember_gas(key, await function.estimate_gas(self._estimate_params(params)))
+        except Exception as e:
+            print(f"[TxManager] Gas estimate for {function.fn_name} failed ({e}), using {FALLBACK_GAS}")
+            return FALLBACK_GAS
+
+    async def _fee(self, params):
+        if self._has_fee(params):
+            return {}
+        price = self._cached_gas_price()
+        if price is None:
+            price = await self.web3.eth.gas_price
+            self.gas_price = (price, clock.monotonic())
+        return {"gasPrice": price}
+
+    async def stop(self):
+        if self.watcher is not None:
+            self.watcher.cancel()
+            self.watcher = None
+        for future, _, _ in self.pending.values():
+            future.cancel()
+        self.pending.clear()
+
+    def _nonce_lock(self, account):
+        return self.nonce_locks.setdefault(account, asyncio.Lock())
+
+    async def _track(self):
+        # Called with self.sending already counted for the caller
+        if self.last_block is None or (self.sending == 1 and not self.pending):
+            # Nothing in flight: the watcher only needs to scan blocks from here on
+            self.last_block = await self.web3.eth.block_number
+        if self.watcher is None or self.watcher.done():
+            self.watcher = asyncio.create_task(self._watch())
+
+    def _register(self, tx_hash, function):
+        future = asyncio.get_running_loop().create_future()
+        self.pending[tx_hash] = (future, self._gas_key(function), clock.monotonic() + self.timeout)
+        return future
+
+    async def submit(self, function, params, cache_gas=True):
+        """Sends a contract transaction without waiting for it to be mined. Returns a future for the receipt.
+
+        cache_gas=False re-estimates every time, for functions whose cost grows with contract state.
+        """
+        self.sending += 1
+        try:
+            await self._track()
+            account = params["from"]
+            params = await self.fill(function, params, cache_gas)
+            async with self._nonce_lock(account):
+                if account not in self.nonces:
+                    self.nonces[account] = await self.web3.eth.get_transaction_count(account, "pending")
+                nonce = self.nonces[account]
+                try:
+                    tx_hash = await function.transact({**params, "nonce": nonce})
+                except Exception:
+                    self.nonces.pop(account, None) # Resynchronise from the node on the next send
+                    raise
+                self.nonces[account] = nonce + 1
+            return self._register(tx_hash, function)
+        finally:
+            self.sending -= 1
+
+    async def transact(self, function, params, cache_gas=True):
+        """Sends a transaction and waits for its receipt."""
+        return await (await self.submit(function, params, cache_gas))
+
+    # --- Locally signed transactions (trading.bid_prep) ---
+    async def fill(self, function, params, cache_gas=True):
+        """params with the gas limit and gas price filled in where missing, from the caches when possible."""
+        gas = params["gas"] if "gas" in params else await self._gas(function, params, cache_gas)
+        return {**params, "gas": gas, **await self._fee(params)}
+
+    async def next_nonce(self, account):
+        """The nonce the next transaction from account will use, without reserving it."""
+        async with self._nonce_lock(account):
+            if account not in self.nonces:
+                self.nonces[account] = await self.web3.eth.get_transaction_count(account, "pending")
+            return self.nonces[account]
+
+    async def send_raw(self, signed, account, nonce, function):
+        """Sends a transaction signed for `nonce`. Returns a future for the receipt, or None when
+        another transaction has taken that nonce meanwhile and this one must be signed again."""
+        self.sending += 1
+        try:
+            await self._track()
+            async with self._nonce_lock(account):
+                if self.nonces.get(account) != nonce:
+                    return None
+                try:
+                    tx_hash = await self.web3.eth.send_raw_transaction(signed.raw_transaction)
+                except Exception:
+                    self.nonces.pop(account, None)
+                    raise
+                self.nonces[account] = nonce + 1
+            return self._register(tx_hash, function)
+        finally:
+            self.sending -= 1
+
+    def _resolve(self, tx_hash, receipt):
+        future, key, _ = self.pending.pop(tx_hash)
+        self._observe(key, receipt)
+        if not future.done():
+            future.set_result(receipt)
+
+    def _expire(self):
+        now = clock.monotonic()
+        for tx_hash, (future, _, deadline) in list(self.pending.items()):
+            if now >= deadline:
+                del self.pending[tx_hash]
+                self.nonces.clear() # A dropped transaction leaves a nonce gap; re-read them all
+                if not future.done():
+                    future.set_exception(asyncio.TimeoutError(f"Transaction {tx_hash.hex()} not mined in {self.timeout} s"))
+
+    async def _watch(self):
+        while True:
+            await clock.sleep(self.poll_interval)
+            if not self.pending:
+                continue
+            try:
+                head = await self.web3.eth.block_number
+                while self.last_block < head and self.pending:
+                    block = await self.web3.eth.get_block(self.last_block + 1)
+                    mined = [tx_hash for tx_hash in block["transactions"] if tx_hash in self.pending]
+                    receipts = await asyncio.gather(*(self.web3.eth.get_transaction_receipt(tx_hash) for tx_hash in mined))
+                    for tx_hash, receipt in zip(mined, receipts):
+                        self._resolve(tx_hash, receipt)
+                    if mined:
+                        for listener in self.block_listeners:
+                            listener(block)
+                    self.last_block += 1
+            except Exception as e:
+                print(f"[TxManager] Block watcher error: {e}")
+            self._expire()
+
+    # --- Blocking Web3 (smart_grid.py) ---
+    def submit_blocking(self, function, params, cache_gas=True):
+        """Sends a transaction without waiting for it to be mined. Returns the transaction hash."""
+        key = self._gas_key(function)
+        gas = self.gas_limits.get(key) if cache_gas else None
+        if gas is None:
+            try:
+                gas = self._remember_gas(key, function.estimate_gas(self._estimate_params(params)))
+            except Exception as e:
+                print(f"[TxManager] Gas estimate for {function.fn_name} failed ({e}), using {FALLBACK_GAS}")
+                gas = FALLBACK_GAS
+        if not self._has_fee(params):
+            price = self._cached_gas_price()
+            if price is None:
+                price = self.web3.eth.gas_price
+                self.gas_price = (price, clock.monotonic())
+            params = {**params, "gasPrice": price}
+        account = params["from"]
+        if account not in self.nonces:
+            self.nonces[account] = self.web3.eth.get_transaction_count(account, "pending")
+        nonce = self.nonces[account]
+        try:
+            tx_hash = function.transact({**params, "gas": gas, "nonce": nonce})
+        except Exception:
+            self.nonces.pop(account, None)
+            raise
+        self.nonces[account] = nonce + 1
+        self.sent_blocking[tx_hash] = key
+        return tx_hash
+
+    def wait_blocking(self, tx_hashes):
+        """Receipts of transactions sent with submit_blocking, in order."""
+        receipts = []
+        for tx_hash in tx_hashes:
+            receipt = self.web3.eth.wait_for_transaction_receipt(tx_hash, timeout=self.timeout, poll_latency=self.poll_interval)
+            key = self.sent_blocking.pop(tx_hash, None)
+            if key is not None:
+                self._observe(key, receipt)
+            receipts.append(receipt)
+        return receipts
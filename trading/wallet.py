@@ -0,0 +1,72 @@
+from web3 import Web3
+from simulation import clock
+
+# Local ETH balance of one trading account.
+# Instead of calling eth_getBalance around every transaction, the ledger
+# follows what changes the balance: our own receipts (gas used times the
+# effective gas price, plus the value sent when the transaction succeeded) and
+# the auction's AuctionClosed log, which pays the seller and refunds deposits.
+# It reconciles with the chain every RECONCILE_INTERVAL seconds, or on the next
+# read after a transaction whose outcome is unknown, and raises a drift alarm
+# when the two disagree by more than DRIFT_TOLERANCE (e.g. a transfer from
+# outside the auction, or a payout the ledger missed).
+
+RECONCILE_INTERVAL = 300 # Seconds between balance checks against the chain
+DRIFT_TOLERANCE = Web3.to_wei(0.0001, "ether") # Larger differences are reported
+ZERO_ADDRESS = "0x0000000000000000000000000000000000000000"
+
+class WalletLedger:
+    def __init__(self, web3, account, tracker=None):
+        self.web3 = web3
+        self.account = account
+        self.balance = None # Wei; None until the first reconcile
+        self.last_reconcile = None # clock.monotonic() of the last chain read
+        self.stale = True # Set when a transaction failed in a way the receipts don't show
+        self.drift_alarms = 0
+        self.tracker = tracker
+        if tracker is not None:
+            tracker.listeners.append(self.apply_log)
+
+    def apply_receipt(self, receipt, value=0):
+        """Charges one of our transactions: gas always, the value only if it succeeded."""
+        if self.balance is None:
+            return
+        self.balance -= receipt.gasUsed * receipt.effectiveGasPrice
+        if receipt.status == 1:
+            self.balance -= value
+
+    def apply_log(self, log):
+        """Credits AuctionClosed payouts: the price to the seller, the unused deposits back to the bidders."""
+        if self.balance is None or log["event"] != "AuctionClosed" or self.tracker is None:
+            return
+        winner, price = log["args"]["winner"], log["args"]["winningPrice"]
+        deposit = self.tracker.deposits.get(self.account, 0)
+        if winner != ZERO_ADDRESS and self.tracker.seller == self.account:
+            self.balance += price
+        if winner == self.account:
+            self.balance += deposit - price
+        else:
+            self.balance += deposit
+
+    def invalidate(self):
+        """Forces a reconcile on the next read, e.g. after a transaction that raised before its receipt."""
+        self.stale = True
+
+    async def reconcile(self):
+        """Reads the chain balance and reports drift. Returns the drift in Wei (0 on the first read)."""
+        chain_balance = await self.web3.eth.get_balance(self.account)
+        drift = 0 if self.balance is None else chain_balance - self.balance
+        if abs(drift) > DRIFT_TOLERANCE:
+            self.drift_alarms += 1
+            print(f"[WalletLedger] WARNING: balance drift of {Web3.from_wei(drift, 'ether')} ETH for {self.account} "
+                  f"(ledger {Web3.from_wei(self.balance, 'ether')}, chain {Web3.from_wei(chain_balance, 'ether')})")
+        self.balance = chain_balance
+        self.last_reconcile = clock.monotonic()
+        self.stale = False
+        return drift
+
+    async def balance_eth(self):
+        """Current balance in ETH from the ledger; reads the chain only when a reconcile is due."""
+        if self.stale or clock.monotonic() - self.last_reconcile >= RECONCILE_INTERVAL:
+            await self.reconcile()
+        return float(Web3.from_wei(self.balance, "ether"))
@@ -0,0 +1,72 @@
+import asyncio
+import time
+from collections import deque
+import numpy as np
+
+# Event-loop stall monitor.
+# A task sleeps for a short interval in a loop and measures how late it wakes
+# up (in real time). Any lateness is time during which a callback held the
+# loop, i.e. every agent sharing it was stalled.
+
+SAMPLE_INTERVAL = 0.05 # Seconds between probes
+STALL_THRESHOLD = 0.1 # Lag above this counts as a stall
+HISTORY = 4096 # Lag samples kept for percentiles
+
+class LoopLagMonitor:
+    def __init__(self, interval=SAMPLE_INTERVAL, stall_threshold=STALL_THRESHOLD, report_interval=None):
+        self.interval = interval
+        self.stall_threshold = stall_threshold
+        self.report_interval = report_interval
+        self.task = None
+        self.reset()
+
+    def reset(self):
+        self.lags = deque(maxlen=HISTORY)
+        self.samples = 0
+        self.max_lag = 0.0
+        self.stalls = 0
+        self.stall_time = 0.0
+        self.started = time.perf_counter()
+
+    async def run(self):
+        last_report = time.perf_counter()
+        while True:
+            expected = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.perf_counter()
+            lag = max(now - expected, 0.0)
+            self.lags.append(lag)
+            self.samples += 1
+            self.max_lag = max(self.max_lag, lag)
+            if lag > self.stall_threshold:
+                self.stalls += 1
+                self.stall_time += lag
+            if self.report_interval and now - last_report >= self.report_interval:
+                print(f"[LoopMonitor] {self.format_report()}")
+                last_report = now
+
+    def start(self):
+        self.task = asyncio.get_running_loop().create_task(self.run())
+        return self.task
+
+    def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+
+    def report(self):
+        lags = np.array(self.lags) if self.lags else np.zeros(1)
+        return {
+            "samples": self.samples,
+            "p50_lag_ms": float(np.percentile(lags, 50) * 1000),
+            "p99_lag_ms": float(np.percentile(lags, 99) * 1000),
+            "max_lag_ms": self.max_lag * 1000,
+            "stalls": self.stalls,
+            "stall_seconds": self.stall_time,
+            "elapsed_seconds": time.perf_counter() - self.started,
+        }
+
+    def format_report(self):
+        r = self.report()
+        return (f"lag p50 {r['p50_lag_ms']:.1f} ms, p99 {r['p99_lag_ms']:.1f} ms, max {r['max_lag_ms']:.1f} ms, "
+                f"{r['stalls']} stalls totalling {r['stall_seconds']:.2f} s over {r['elapsed_seconds']:.0f} s")
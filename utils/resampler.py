@@ -0,0 +1,130 @@
+import os
+import numpy as np
+
+# Streaming multi-resolution aggregates for grid time series.
+# Every resolution keeps a fixed-size ring of buckets holding sum/count/min/max
+# for all series at once. A new sample updates the current bucket of each
+# resolution in place (or rolls over to a fresh one), so ingestion and "latest
+# bucket" queries are O(1) per sample regardless of history length. NaN values
+# are treated as missing and leave the series' bucket untouched.
+# Bucket boundaries are aligned on local time (utc_offset), so the daily bucket
+# is the IESO delivery day, midnight to midnight Eastern Standard Time, rather
+# than a UTC day that rolls over in the Ontario evening.
+
+RESOLUTIONS = {"5m": 300, "15m": 900, "1h": 3600, "1d": 86400} # Bucket width in seconds
+DEFAULT_CAPACITY = {"5m": 288, "15m": 192, "1h": 168, "1d": 90} # One day, two days, one week, ~three months
+STATS = ("mean", "min", "max", "sum", "count")
+UTC_OFFSET = int(os.getenv("RESAMPLER_UTC_OFFSET", str(-5 * 3600))) # Seconds east of UTC buckets align to; IESO market time is EST all year
+
+def _json_value(stat, value):
+    if stat == "count":
+        return int(value)
+    return None if np.isnan(value) else float(value)
+
+
+class _Ring:
+    def __init__(self, width, capacity, num_series):
+        self.width = width
+        self.capacity = capacity
+        self.start = np.full(capacity, -1, dtype=np.int64) # Bucket start timestamp, -1 = empty
+        self.sum = np.zeros((capacity, num_series))
+        self.count = np.zeros((capacity, num_series), dtype=np.int64)
+        self.min = np.full((capacity, num_series), np.inf)
+        self.max = np.full((capacity, num_series), -np.inf)
+        self.pos = -1 # Slot of the current bucket
+        self.buckets = 0 # Buckets opened so far
+
+    def open(self, start):
+        self.pos = (self.pos + 1) % self.capacity
+        self.start[self.pos] = start
+        self.sum[self.pos] = 0
+        self.count[self.pos] = 0
+        self.min[self.pos] = np.inf
+        self.max[self.pos] = -np.inf
+        self.buckets += 1
+
+    def order(self, n):
+        """Slots of the last n buckets, oldest first."""
+        n = min(n, self.buckets, self.capacity)
+        return np.arange(self.pos - n + 1, self.pos + 1) % self.capacity
+
+
+class MultiResolutionResampler:
+    def __init__(self, series, resolutions=RESOLUTIONS, capacity=DEFAULT_CAPACITY, utc_offset=UTC_OFFSET):
+        self.series = list(series)
+        self.utc_offset = utc_offset
+        self.series_index = {name: i for i, name in enumerate(self.series)}
+        self.rings = {name: _Ring(width, capacity[name], len(self.series)) for name, width in resolutions.items()}
+        self.last_timestamp = None
+
+    def update(self, timestamp, values):
+        """Adds one sample per series (array in self.series order). Returns the resolutions whose bucket rolled over."""
+        values = np.asarray(values, dtype=np.float64)
+        valid = ~np.isnan(values)
+        if self.last_timestamp is not None and timestamp < self.last_timestamp:
+            return () # Out-of-order samples would reopen closed buckets
+        self.last_timestamp = timestamp
+
+        rolled = []
+        for name, ring in self.rings.items():
+            start = int((timestamp + self.utc_offset) // ring.width * ring.width) - self.utc_offset # Epoch seconds of the local bucket start
+            if ring.pos < 0 or start != ring.start[ring.pos]:
+                if ring.pos >= 0:
+                    rolled.append(name)
+                ring.open(start)
+            pos = ring.pos
+            np.add(ring.sum[pos], values, out=ring.sum[pos], where=valid)
+            np.add(ring.count[pos], valid, out=ring.count[pos])
+            np.fmin(ring.min[pos], values, out=ring.min[pos]) # fmin/fmax skip NaN
+            np.fmax(ring.max[pos], values, out=ring.max[pos])
+        return tuple(rolled)
+
+    def _stats(self, ring, slots):
+        count = ring.count[slots]
+        has_data = count > 0
+        mean = np.divide(ring.sum[slots], count, out=np.full(count.shape, np.nan), where=has_data)
+        return {
+            "start": ring.start[slots],
+            "mean": mean,
+            "min": np.where(has_data, ring.min[slots], np.nan),
+            "max": np.where(has_data, ring.max[slots], np.nan),
+            "sum": ring.sum[slots],
+            "count": count,
+        }
+
+    def latest(self, resolution, offset=0):
+        """Stats of the current bucket (offset=1 for the last closed one): {stat: array over series}."""
+        ring = self.rings[resolution]
+        if ring.pos < 0 or offset >= min(ring.buckets, ring.capacity):
+            return None
+        return self._stats(ring, (ring.pos - offset) % ring.capacity)
+
+    def window(self, resolution, n):
+        """Stats of the last n buckets, oldest first: {stat: (buckets x series) array}."""
+        ring = self.rings[resolution]
+        return self._stats(ring, ring.order(n))
+
+    def closed_since(self, resolution, since):
+        """Closed buckets that started after `since`, oldest first, as (start, series, mean, min, max, sum, count) rows."""
+        ring = self.rings[resolution]
+        slots = ring.order(ring.capacity)[:-1] # The current bucket is still open
+        slots = slots[ring.start[slots] > since]
+        stats = self._stats(ring, slots)
+        return [
+            (int(stats["start"][b]), name, *(float(stats[stat][b, i]) for stat in ("mean", "min", "max", "sum")), int(stats["count"][b, i]))
+            for b in range(len(slots)) for i, name in enumerate(self.series)
+            if stats["count"][b, i] > 0
+        ]
+
+    def summary(self, offset=0):
+        """Latest bucket of every resolution as plain JSON: {resolution: {series: {stat: value}}}."""
+        summary = {}
+        for resolution in self.rings:
+            stats = self.latest(resolution, offset)
+            if stats is None:
+                continue
+            summary[resolution] = {
+                name: {stat: _json_value(stat, stats[stat][i]) for stat in STATS}
+                for i, name in enumerate(self.series)
+            }
+        return summary
@@ -0,0 +1,50 @@
+import os
+import sys
+import numpy as np
+
+# Memory-mapped access to the saved test sets in models/.
+# The .npz archives are compressed, so np.load has to inflate every array into
+# private memory for each agent that opens them. Converting them once into
+# plain .npy files lets every agent instance map the same file read-only: the
+# OS page cache holds a single copy and per-tick windows are just views.
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODELS_DIR = os.path.join(PROJECT_DIR, "models")
+
+# One set of memmaps per process, shared by every agent instance in it
+_loaded = {}
+
+def npy_dir(name):
+    return os.path.join(MODELS_DIR, f"{name}_npy")
+
+def convert_test_set(name, overwrite=False):
+    """Unpacks models/<name>.npz into one uncompressed .npy file per array. Returns the directory."""
+    source = os.path.join(MODELS_DIR, f"{name}.npz")
+    target_dir = npy_dir(name)
+    os.makedirs(target_dir, exist_ok=True)
+    with np.load(source) as archive:
+        for key in archive.files:
+            target = os.path.join(target_dir, f"{key}.npy")
+            if not overwrite and os.path.exists(target) and os.path.getmtime(target) >= os.path.getmtime(source):
+                continue  # Already converted from this archive
+            temp = os.path.join(target_dir, f"{key}.{os.getpid()}.tmp.npy") # Per process: parallel workers may convert at once
+            np.save(temp, archive[key])
+            os.replace(temp, target)  # Other agents never see a half-written file
+    return target_dir
+
+def load_test_set(name):
+    """Returns {array name: read-only memmap} for models/<name>.npz, converting it on first use."""
+    if name not in _loaded:
+        target_dir = convert_test_set(name)
+        _loaded[name] = {
+            filename[:-len(".npy")]: np.load(os.path.join(target_dir, filename), mmap_mode="r")
+            for filename in sorted(os.listdir(target_dir))
+            if filename.endswith(".npy") and not filename.endswith(".tmp.npy")
+        }
+    return _loaded[name]
+
+if __name__ == "__main__":
+    # python -m utils.test_sets [name ...] converts the given (or all) test set archives
+    names = sys.argv[1:] or [f[:-len(".npz")] for f in os.listdir(MODELS_DIR) if f.endswith("_set.npz")]
+    for name in names:
+        print(f"Converted {name} -> {convert_test_set(name, overwrite=True)}")
@@ -0,0 +1,87 @@
+import math
+import time
+
+# Hashed timer wheel on the monotonic clock.
+# Timers are hashed into a fixed ring of slots by their expiry tick, so
+# scheduling and cancelling are O(1) and advancing only visits the slots
+# that elapsed since the last call instead of scanning every timer.
+
+class Timer:
+    __slots__ = ("tick", "deadline", "callback", "args", "cancelled")
+
+    def __init__(self, tick, deadline, callback, args):
+        self.tick = tick
+        self.deadline = deadline
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+    def cancel(self):
+        """Marks the timer as cancelled; it is dropped when its slot is visited."""
+        self.cancelled = True
+
+
+class TimerWheel:
+    def __init__(self, tick=0.25, slots=256, clock=time.monotonic):
+        self.tick = tick
+        self.clock = clock
+        self.slots = [[] for _ in range(slots)]
+        self.current_tick = int(clock() / tick)
+        self.pending = 0
+
+    def schedule(self, delay, callback, *args):
+        """Schedules callback(*args) to run `delay` seconds from now and returns its Timer."""
+        deadline = self.clock() + max(delay, 0)
+        tick = max(math.ceil(deadline / self.tick), self.current_tick + 1)
+        timer = Timer(tick, deadline, callback, args)
+        self.slots[tick % len(self.slots)].append(timer)
+        self.pending += 1
+        return timer
+
+    def cancel(self, timer):
+        if timer is not None and not timer.cancelled:
+            timer.cancel()
+            self.pending -= 1
+
+    def advance(self, now=None):
+        """Fires every timer that expired up to `now`. Returns the number of callbacks run."""
+        now = self.clock() if now is None else now
+        target_tick = int(now / self.tick)
+        if target_tick <= self.current_tick:
+            return 0
+
+        # A gap longer than one revolution only needs each slot visited once
+        steps = min(target_tick - self.current_tick, len(self.slots))
+        expired = []
+        for step in range(1, steps + 1):
+            slot = self.slots[(self.current_tick + step) % len(self.slots)]
+            keep = []
+            for timer in slot:
+                if timer.cancelled:
+                    continue
+                if timer.tick <= target_tick:
+                    expired.append(timer)
+                else:
+                    keep.append(timer)  # Belongs to a later revolution
+            slot[:] = keep
+        self.current_tick = target_tick
+
+        expired.sort(key=lambda timer: timer.deadline)
+        for timer in expired:
+            self.pending -= 1
+            timer.cancelled = True
+            timer.callback(*timer.args)
+        return len(expired)
+
+    def time_until_next(self, limit=None):
+        """Seconds until the earliest live timer expires, or `limit` if nothing is pending."""
+        if self.pending == 0:
+            return limit
+        for step in range(1, len(self.slots) + 1):
+            tick = self.current_tick + step
+            slot = self.slots[tick % len(self.slots)]
+            if any(timer.tick == tick and not timer.cancelled for timer in slot):
+                wait = max(tick * self.tick - self.clock(), 0)
+                return wait if limit is None else min(wait, limit)
+        # Every live timer is more than one revolution away
+        return self.tick * len(self.slots) if limit is None else min(self.tick * len(self.slots), limit)